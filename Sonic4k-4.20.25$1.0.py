@@ -5,7 +5,28 @@ from ursina import *
 from ursina.shaders import basic_lighting_shader
 import random
 import math
-from collections import deque
+import sys
+import atexit
+from collections import deque, defaultdict
+import numpy as np
+import asset_cache
+import dynamic_resolution
+import telemetry
+from effects_budget import EffectsBudget
+from threaded_sim import ThreadedSimulation
+from badnik_ai import BadnikScheduler
+import fangame_level
+import heightfield
+import ring_train
+from ring_magnet import RingMagnet
+from rewind_buffer import RewindBuffer
+from fixed_step import FixedStep, Interpolation
+from ghost_run import GhostRecorder, GhostReader, Ghosts
+from scene_snapshot import SceneSnapshot
+import scene_optimizer
+from fangame_state import CharacterStats, CharacterState, forward_attributes
+from fangame_kinematics import Kinematics
+from input_replay import InputRecorder, InputReplay, ReplayPlayer, pack_input, hash_state
 
 # --- CATSDK Patch: Added a placeholder Audio System ---
 # Purrrfect! This will pretend to play sounds so the game doesn't get sad.
@@ -25,13 +46,23 @@ class FangameAudioSystem:
         pass # Keeps the game running smoothly!
 
 class SonicFangameWorld:
-    def __init__(self):
-        self.app = Ursina()
-        window.title = 'Sonic Fangame World Demo - Patched by CATSDK! Meow!'
-        window.borderless = False
-        window.fullscreen = False
-        window.exit_button.visible = False
-        window.fps_counter.enabled = True
+    def __init__(self, headless=False, threaded_sim=False, tick_rate=60):
+        # Headless worlds have no window at all, handy for replays and benchmarks, nya!
+        self.headless = headless
+        if headless:
+            self.app = Ursina(window_type='none')
+        else:
+            self.app = Ursina()
+            window.title = 'Sonic Fangame World Demo - Patched by CATSDK! Meow!'
+            window.borderless = False
+            window.fullscreen = False
+            window.exit_button.visible = False
+            window.fps_counter.enabled = True
+        asset_cache.install() # Load models/textures from the startup cache, nya!
+        # Render the 3D scene at whatever resolution keeps us at 60fps, UI stays crisp, purrr!
+        self.resolution = None if headless else dynamic_resolution.install(target_fps=60, min_scale=0.5)
+        # Frame telemetry, always on, written out on hitches and at exit (telemetry.py), purrr
+        self.telemetry = None if headless else telemetry.install(self._telemetry_counts, path='fangame_telemetry.tlm')
 
         # Visual setup inspired by various fangames
         window.color = color.rgb(100, 150, 255)  # Bright blue sky, nya!
@@ -39,9 +70,12 @@ class SonicFangameWorld:
 
         # Core systems
         self.entities = []
-        self.rings = []
+        self.racers = []
         self.enemies = []
         self.checkpoints = []
+        self.monitors = []
+        self.terrain_chunks = []
+        self.dropped_rings = []
         self.ring_count = 0
         self.score = 0
         self.lives = 3
@@ -50,6 +84,11 @@ class SonicFangameWorld:
 
         # --- CATSDK Patch: Instantiated the placeholder Audio System ---
         self.audio = FangameAudioSystem() # Yay! Now we have our pretend audio player.
+
+        # Effects share a frame-time budget, speed lines are the first to go when we lag, nya!
+        self.effects = EffectsBudget(target_fps=60)
+        self.effects.register('speed_lines', cap=1)
+        self.effects.register('explosion_quads', cap=16, floor=0.25)
         # self.physics = FangamePhysicsSystem() # Physics seems handled inside character, purrfect!
 
         # Camera setup with smoothing
@@ -58,15 +97,72 @@ class SonicFangameWorld:
         camera.position = (0, 15, -20)
         camera.rotation_x = 30
 
-        # Create the world, meow!
-        self._create_fangame_world()
+        # The ground is a heightfield, the kitty samples it instead of raycasting, purrr!
+        self.terrain = heightfield.Heightfield(fangame_level.terrain_heights(),
+                                               size=(fangame_level.GROUND_SIZE, fangame_level.GROUND_SIZE),
+                                               position=(0, fangame_level.GROUND_Y, 0))
+
+        # Create the world, meow! Warm starts load the last build from a snapshot.
+        snapshot = SceneSnapshot('fangame_world', sources=(SonicFangameWorld._create_fangame_world, fangame_level, heightfield),
+                                 lists=('entities', 'enemies', 'checkpoints', 'monitors', 'terrain_chunks'))
+        if not snapshot.restore(self):
+            self._create_fangame_world()
+            snapshot.capture(self)
+        # Springs, platforms, the ramp, checkpoints and monitors are what the kitty raycasts for, right above the terrain
+        self.terrain.add_props(self.entities + self.checkpoints + self.monitors)
+        # Springs, platforms and the ramp never move, so draw them as merged batches, purrr.
+        # Rings, enemies and checkpoints stay separate since they get collected, squished or recolored!
+        # Terrain chunks stay separate too, so the ones behind the camera get culled.
+        self.static_batch, before, after = scene_optimizer.optimize(scene, list(self.entities))
+        print(f"Static scene: {before['draw_calls']} -> {after['draw_calls']} draw calls, "
+              f"{before['state_changes']} -> {after['state_changes']} state changes, nya!")
+        # Rings ride on trains, a collected bit each instead of an entity, all drawn in one instanced batch! Nya!
+        self.ring_trains = [ring_train.RingTrain.from_data(data) for data in fangame_level.RING_TRAINS]
+        self.ring_pickup_radius = 0.65 # Kitty's sphere (0.4) plus a ring's (0.25)
+        ring = Entity(model='torus', color=color.yellow,
+                      scale=(0.5,0.5,0.5), # Let's make the torus a bit thicker!
+                      rotation=(90,0,0), # Rotate it correctly!
+                      double_sided=True) # So we can see it from both sides!
+        self.ring_batch = ring_train.build_batch(self.ring_trains, ring)
+        destroy(ring)
+        # The lightning shield's magnet finds nearby rings in a spatial hash, so it's cheap however many rings there are!
+        self.ring_magnet = RingMagnet(self.ring_trains, pickup_radius=self.ring_pickup_radius)
+        self._create_character()
+        self.shield = Entity(parent=self.character, model='sphere', scale=1.6, color=color.rgba(80, 200, 255, 90),
+                             double_sided=True, enabled=False) # See-through bubble around kitty, nya!
         self._setup_controls()
 
+        # Badniks patrol and chase! A budgeted scheduler ticks the far ones less often, hiss!
+        self.badniks = BadnikScheduler()
+        for enemy in self.enemies:
+            self.badniks.add(enemy)
+
         # Input buffer for advanced input combos
         self.input_buffer = deque(maxlen=10)
 
-        # Bind game loop
-        self.app.update = self._game_update
+        # Dropped rings can fall on a worker thread; the kitty stays here since she raycasts the scene, nya!
+        self.sim = ThreadedSimulation().start() if threaded_sim else None
+
+        # Input recording / playback, purrr
+        self.recorder = None
+        self.replay_player = None
+
+        # Rewind, the last few seconds of gameplay in a compact snapshot per tick! Hold backspace, nya!
+        self._setup_rewind()
+
+        # Gameplay ticks at a fixed rate whatever the frame rate, the kitty, camera and badniks are drawn
+        # blended between their last two ticks so fast screens stay smooth, purrr! (fixed_step.py)
+        self.clock = FixedStep(tick_rate)
+        self.interpolation = Interpolation()
+        for node in [self.character, self.camera_rig] + self.enemy_roster:
+            self.interpolation.track(node)
+
+        # Ghost runs, earlier runs racing alongside as see-through kitties with no gameplay at all! (ghost_run.py)
+        self.ghosts = Ghosts()
+        self.ghost_recorder = None
+
+        # Bind game loop (Ursina only ticks entities, so hang it on one, purrr)
+        self.game_loop = Entity(update=self._game_update)
 
     def _setup_fangame_aesthetics(self):
         # Directional light
@@ -78,9 +174,10 @@ class SonicFangameWorld:
         # Fog
         scene.fog_density = 0.005
         scene.fog_color = color.rgb(100, 150, 255)
-        # Clip planes
-        camera.clip_plane_far = 500
-        camera.clip_plane_near = 0.1
+        # Clip planes (no lens without a window, nya)
+        if not self.headless:
+            camera.clip_plane_far = 500
+            camera.clip_plane_near = 0.1
 
     def _setup_controls(self):
         self.controls = {
@@ -90,70 +187,48 @@ class SonicFangameWorld:
             'spin_dash': 'left ctrl', 'stomp': 'e',
             'camera_left': 'q', 'camera_right': 'r'
         }
+        self.character.controls = self.controls # Kitty reads the same key map!
 
     def _create_fangame_world(self):
-        # Ground
+        # Ground, chunked heightfield meshes with no collider (the kitty samples self.terrain instead)
         # Meow! 'white_cube' is a built-in Ursina texture, so no external png needed here! Purrrfect.
-        ground = Entity(
-            model='plane', texture='white_cube',
+        self.terrain_chunks.extend(self.terrain.build(
+            chunk_size=fangame_level.TERRAIN_CHUNK, texture='white_cube',
             color=color.rgb(50, 200, 100), # Nice green grass!
-            scale=(200,1,200), collider='box',
-            position=(0,-0.5,0), texture_scale=(20,20)
-        )
-        self.entities.append(ground)
+            texture_scale=(20,20), shader=basic_lighting_shader
+        ))
+
+        # Lightning shield monitors
+        for pos in fangame_level.SHIELD_MONITORS:
+            m = Entity(model='cube', color=color.cyan,
+                       scale=fangame_level.MONITOR_SCALE, position=pos,
+                       collider='box',
+                       shader=basic_lighting_shader)
+            self.monitors.append(m)
 
         # Checkpoints
-        for i in range(3):
+        for pos in fangame_level.CHECKPOINTS:
             cp = Entity(
                 model='cube', color=color.yellow,
-                scale=(2,3,2), position=(40*(i+1),0,0),
+                scale=fangame_level.CHECKPOINT_SCALE, position=pos,
                 collider='box',
                 shader=basic_lighting_shader # Let's make things look a little nicer, nya!
             )
             self.checkpoints.append(cp)
 
         # Springs
-        spring_defs = [
-            (color.red, 20, (15,0,0)),
-            (color.blue, 30, (25,0,0)),
-            (color.yellow, 40, (35,0,0))
-        ]
-        for clr, power, pos in spring_defs:
+        for clr, power, pos in fangame_level.SPRINGS:
             # Using a cylinder model might need collider='mesh', which can be slow.
             # Let's use a simple box collider adjusted to fit, purrr.
-            s = Entity(model='cube', color=clr, scale=(1.5,0.5,1.5), # Using cube for simpler collision
+            s = Entity(model='cube', color=getattr(color, clr), scale=fangame_level.SPRING_SCALE, # Using cube for simpler collision
                        position=pos, collider='box', # Box collider is usually faster!
                        shader=basic_lighting_shader)
             s.spring_power = power
             self.entities.append(s)
 
-        # Rings
-        patterns = [
-            [(x,1,0) for x in range(0,50,3)],
-            [(math.cos(a)*10+30,1,math.sin(a)*10)
-             for a in [math.radians(x) for x in range(0,360,15)]],
-            [(x,1,5 if x%10<5 else -5) for x in range(20,70,2)]
-        ]
-        for pattern in patterns:
-            for pos in pattern:
-                # Using a mesh collider for rings is okay, they are small! Nya!
-                r = Entity(model='torus', color=color.yellow,
-                           scale=(0.5,0.5,0.5), # Let's make the torus a bit thicker!
-                           position=pos,
-                           collider='sphere', # Sphere collider might be more efficient for rings!
-                           rotation=(90,0,0), # Rotate it correctly!
-                           shader=basic_lighting_shader,
-                           double_sided=True) # So we can see it from both sides!
-                self.rings.append(r)
-
         # Enemies (Badniks! Hiss!)
-        enemy_defs = [
-            (color.red, 1, 10, (25,0.5,0)),
-            (color.blue,1.5,20,(40,0.75,5)),
-            (color.purple,2,30,(55,1,-5))
-        ]
-        for clr, scale, points, pos in enemy_defs:
-            e = Entity(model='sphere', color=clr,
+        for clr, scale, points, pos in fangame_level.ENEMIES:
+            e = Entity(model='sphere', color=getattr(color, clr),
                        scale=(scale,scale,scale), position=pos,
                        collider='sphere', # Sphere collider is purrfect for spheres!
                        shader=basic_lighting_shader)
@@ -161,8 +236,7 @@ class SonicFangameWorld:
             self.enemies.append(e)
 
         # Platforms
-        plat_defs = [(0,5,10,5,1,5),(0,10,20,3,1,3),(10,7,15,8,1,1)]
-        for x,y,z,sx,sy,sz in plat_defs:
+        for x,y,z,sx,sy,sz in fangame_level.PLATFORMS:
             p = Entity(model='cube', color=color.rgb(200,150,100),
                        scale=(sx,sy,sz), position=(x,y,z),
                        collider='box', # Box collider is good!
@@ -171,59 +245,80 @@ class SonicFangameWorld:
 
         # Ramp
         ramp = Entity(model='cube', color=color.rgb(180,140,100),
-                      scale=(10,1,5), position=(60,0,0),
-                      rotation_z=-30, collider='box', # Box might be okay, but mesh is more accurate for ramps
+                      scale=fangame_level.RAMP_SCALE, position=fangame_level.RAMP_POSITION,
+                      rotation_z=fangame_level.RAMP_ROTATION_Z, collider='box', # Box might be okay, but mesh is more accurate for ramps
                       shader=basic_lighting_shader)
                       # Consider collider='mesh' if collision feels weird, nya!
         self.entities.append(ramp)
 
+    def _create_character(self):
         # Player Kitty!
-        self.character = FangameCharacter(position=(0,3,0))
+        self.character = FangameCharacter(position=fangame_level.PLAYER_START)
+        self.character.terrain = self.terrain
         self.character.shader = basic_lighting_shader # Make the kitty shiny!
         self.entities.append(self.character)
 
     def _game_update(self):
-        dt = time.dt * self.time_scale
-        if dt > 0.1: # Prevent huge jumps if lagging, purrr
-            dt = 0.1
+        self.effects.tick(time.dt) # Unclamped, so the budget sees real lag, purrr
+        self.interpolation.restore()
+
+        # Rewinding steps back one tick per frame instead of playing, purrr (not while replays run)
+        if held_keys[self.rewind_key] and not (self.replay_player or self.recorder):
+            if self.rewind.available(self.tick - 1):
+                self.rewind_to(self.tick - 1)
+            self.ghosts.update(self.tick)
+            return
 
+        # Fixed ticks, as many as this frame's time pays for (capped, so a hitch can't snowball), nya!
+        for _ in range(self.clock.advance(time.dt * self.time_scale)):
+            # Replays drive the keys, recordings just watch them, nya!
+            if self.replay_player:
+                if not self.replay_player.apply(held_keys, self.controls):
+                    break
+            elif self.recorder:
+                self.recorder.capture(pack_input(held_keys, self.controls, self.recorder.control_names))
+            self._tick(self.clock.dt)
+            self.interpolation.store()
+        self.interpolation.apply(self.clock.alpha)
+        self.ghosts.update(self.tick - 1 + self.clock.alpha) # Drawn a tick behind too, like everything else
+
+    def _tick(self, dt):
         # Update the kitty!
+        start = self.character.position
         self.character.game_update(dt, self.audio, self.enemies) # Pass dependencies needed
-
-        # Rings collection
-        for ring in self.rings[:]:
-            if self.character.intersects(ring).hit:
-                self.rings.remove(ring)
-                destroy(ring)
-                self.ring_count += 1
-                self.score += 10
-                self.audio.play('ring', volume=0.3) # Pretend play! Meow!
+        end = self.character.position
+        self.badniks.update(end, dt)
+        for racer in self.racers:
+            self._tick_racer(racer, dt)
+
+        # Rings collection, along the whole path kitty swept this tick so fast kitties can't skip any
+        for train in self.ring_trains:
+            for _ in train.collect(start, end, self.ring_pickup_radius):
+                self._collect_ring()
+        # Shielded kitty pulls rings in, they count once they reach her, purrr!
+        for _ in range(self.ring_magnet.update(end, dt)):
+            self._collect_ring()
+
+        # Monitors, pop one for a lightning shield! Nya!
+        for monitor in self.monitors[:]:
+            if self.character.intersects(monitor).hit:
+                self.monitors.remove(monitor)
+                self._create_explosion_effect(monitor.position)
+                monitor.disable()
+                self._set_shield(True)
+                self.audio.play('shield', volume=0.5) # Pretend play!
 
         # Enemy interaction
         for enemy in self.enemies[:]:
             if self.character.intersects(enemy).hit:
                 if self.character.is_attacking(): # Check if kitty is attacking!
-                    self.enemies.remove(enemy)
-                    destroy(enemy)
-                    self.score += enemy.points
-                    self.audio.play('enemy_defeat', volume=0.5) # Pretend play!
-                    self._create_explosion_effect(enemy.position)
-                    # Give kitty a little bounce! Nya!
-                    if not self.character.grounded:
-                        self.character.velocity.y = self.character.jump_height * 0.6
-                    self.character.homing_available = True # Can home again after hitting!
+                    self.score += self._defeat_enemy(enemy, self.character)
                 elif not self.character.invincible:
                     self._player_hit()
                     break # Only process one hit per frame, purrr.
 
         # Springs interaction
-        for ent in self.entities:
-            if hasattr(ent, 'spring_power') and self.character.intersects(ent).hit:
-                 # Check if kitty hits it from above or side, not below! Purrr.
-                 if self.character.velocity.y <= 0 or abs(self.character.y - (ent.y + ent.scale_y/2)) < 0.5:
-                     self.character.velocity.y = ent.spring_power
-                     self.character.position.y = ent.y + ent.scale_y/2 + self.character.scale_y/2 # Prevent sticking
-                     self.audio.play('spring', volume=0.5) # Pretend play!
+        self._bounce_on_springs(self.character)
 
         # Checkpoints interaction
         for cp in self.checkpoints:
@@ -239,7 +334,7 @@ class SonicFangameWorld:
         self.camera_rig.position = lerp(self.camera_rig.position, target_pos, dt * 4)
 
         # Keep camera distance based on speed, purrr!
-        current_speed = Vec3(self.character.velocity.x, 0, self.character.velocity.z).length()
+        current_speed = self.character.motion.speed_xz()
         target_dist = 15 + current_speed * 0.3 # Zoom out when faster! Nya!
         target_dist = clamp(target_dist, 15, 35) # Min/Max distance
         camera.z = lerp(camera.z, -target_dist, dt*2)
@@ -251,12 +346,20 @@ class SonicFangameWorld:
             self.camera_rig.rotation_y -= 100 * dt
 
         # Speed effects, meow!
-        if self.character.is_boosting and random.random() < 0.4: # A bit more frequent!
+        if self.character.is_boosting and random.random() < 0.4 and self.effects.allow('speed_lines'): # A bit more frequent!
             self._create_speed_effect()
 
         # Update ring physics if any were lost
-        for ring in self.rings:
-            if hasattr(ring, 'velocity'): # Only update rings that were dropped
+        if self.sim:
+            # The sim thread did the falling, just pick up where it put them, purrr
+            buffer, _ = self.sim.sync()
+            if buffer:
+                for ring in self.dropped_rings:
+                    state = buffer.get(id(ring))
+                    if state:
+                        ring.position = state[:3]
+        else:
+            for ring in self.dropped_rings:
                 ring.velocity.y -= self.character.gravity * dt * 2 # Rings fall faster!
                 ring.position += ring.velocity * dt
                 # Basic ground collision for dropped rings, nya!
@@ -264,9 +367,87 @@ class SonicFangameWorld:
                     ring.y = 0
                     ring.velocity = Vec3(0,0,0) # Stop bouncing
 
+        self.tick += 1
+        self.rewind.record(self.tick, self.capture_state())
+        if self.ghost_recorder:
+            self.ghost_recorder.record(*self.character.getPos(), self.character.getH())
+
+    def _defeat_enemy(self, enemy, character):
+        # Squish! Returns the badnik's points, nya
+        self.enemies.remove(enemy)
+        self.badniks.remove(enemy)
+        self.audio.play('enemy_defeat', volume=0.5) # Pretend play!
+        self._create_explosion_effect(enemy.position)
+        enemy.disable() # Not destroyed, so a rewind can bring it back! Hiss!
+        # Give kitty a little bounce! Nya!
+        if not character.grounded:
+            character.motion.vy = character.jump_height * 0.6
+        character.homing_available = True # Can home again after hitting!
+        return enemy.points
+
+    def _bounce_on_springs(self, character):
+        for ent in self.entities:
+            if hasattr(ent, 'spring_power') and character.intersects(ent).hit:
+                 # Check if kitty hits it from above or side, not below! Purrr.
+                 if character.motion.vy <= 0 or abs(character.y - (ent.y + ent.scale_y/2)) < 0.5:
+                     character.motion.vy = ent.spring_power
+                     character.position.y = ent.y + ent.scale_y/2 + character.scale_y/2 # Prevent sticking
+                     self.audio.play('spring', volume=0.5) # Pretend play!
+
+    # --- Racers, nya! ---
+    # More kitties in the same world for netplay races (netplay.py). They run the same controller and
+    # share the rings, badniks and springs with the local kitty, first come first served, but keep
+    # their own rings and score. Racers aren't part of rewind snapshots, purrr.
+    def add_racer(self, position=None):
+        c = FangameCharacter(position=position if position is not None else fangame_level.PLAYER_START)
+        c.terrain = self.terrain
+        c.shader = basic_lighting_shader
+        c.controls = self.controls
+        c.keys = defaultdict(int)
+        c.view = RacerView()
+        racer = Racer(c)
+        self.racers.append(racer)
+        self.interpolation.track(c)
+        return racer
+
+    def remove_racer(self, racer):
+        self.racers.remove(racer)
+        self.interpolation.untrack(racer.character)
+        destroy(racer.character)
+
+    def _tick_racer(self, racer, dt):
+        c = racer.character
+        start = c.position
+        c.game_update(dt, self.audio, self.enemies)
+        end = c.position
+        for train in self.ring_trains:
+            got = len(train.collect(start, end, self.ring_pickup_radius))
+            racer.ring_count += got
+            racer.score += got * 10
+        for enemy in self.enemies[:]:
+            if c.intersects(enemy).hit:
+                if c.is_attacking():
+                    racer.score += self._defeat_enemy(enemy, c)
+                elif not c.invincible:
+                    # Racers just drop their rings, no lives to lose in a race, nya
+                    c.invincible = True
+                    c.invincibility_timer = 1.5
+                    racer.ring_count = 0
+                    break
+        self._bounce_on_springs(c)
+
+    def _collect_ring(self):
+        self.ring_count += 1
+        self.score += 10
+        self.audio.play('ring', volume=0.3) # Pretend play! Meow!
+
+    def _set_shield(self, on):
+        self.ring_magnet.active = on
+        self.shield.enabled = on
+
     def _create_explosion_effect(self, position):
         # Little poof effect! Nya!
-        for _ in range(8): # Less particles maybe?
+        for _ in range(self.effects.allow('explosion_quads', 8)): # Fewer when the frame budget is tight!
             p = Entity(model='quad', # Using quads might be cheaper!
                        color=random.choice([color.orange, color.yellow, color.white]),
                        scale=random.uniform(0.2, 0.5),
@@ -288,7 +469,7 @@ class SonicFangameWorld:
         destroy(p, delay=0.3)
 
     def _player_hit(self):
-        if self.invincible: # Can't get hit if invincible! Nya!
+        if self.character.invincible: # Can't get hit if invincible! Nya!
             return
 
         self.audio.play('hurt', volume=0.6) # Play hurt sound!
@@ -296,7 +477,11 @@ class SonicFangameWorld:
         self.character.invincibility_timer = 1.5 # For 1.5 seconds
         self.character.blink(duration=1.5) # Make kitty blink!
 
-        if self.ring_count > 0:
+        if self.ring_magnet.active:
+            # The shield pops instead, kitty keeps her rings! Nya!
+            self._set_shield(False)
+            self.audio.play('shield_loss', volume=0.5) # Pretend play!
+        elif self.ring_count > 0:
             lost_rings = min(self.ring_count, 20) # Lose up to 20 rings
             self.ring_count -= lost_rings
             self.score -= lost_rings * 5 # Lose some score too maybe? Meow?
@@ -323,7 +508,8 @@ class SonicFangameWorld:
                 # Make these temporary rings, not collectible again? Or collectable for less points?
                 # For now, just make them vanish. Nya!
                 r.fade_out(duration=3)
-                destroy(r, delay=3.1)
+                self._drop_ring(r)
+                invoke(self._expire_dropped_ring, r, delay=3.1)
         else:
             # No rings, kitty takes a big hit!
             self.lives -= 1
@@ -337,7 +523,21 @@ class SonicFangameWorld:
                 invoke(self.respawn_player, delay=1.5) # Respawn after a short delay
 
 
+    def _drop_ring(self, ring):
+        self.dropped_rings.append(ring)
+        if self.sim:
+            self.sim.submit(self.sim.world.add_body, id(ring), position=tuple(ring.position),
+                            velocity=tuple(ring.velocity), gravity=self.character.gravity * 2, floor=0)
+
+    def _expire_dropped_ring(self, ring):
+        if ring in self.dropped_rings:
+            self.dropped_rings.remove(ring)
+        if self.sim:
+            self.sim.submit(self.sim.world.remove_body, id(ring))
+        destroy(ring)
+
     def respawn_player(self):
+         self.interpolation.restore() # Invoked between ticks, so move the simulated kitty, not the drawn one
          self.character.position = self.character.spawn_point
          self.character.velocity = Vec3(0,0,0)
          self.character.visible = True
@@ -346,6 +546,7 @@ class SonicFangameWorld:
          self.character.blink(duration=2.0)
          # Reset boost maybe?
          self.character.boost_energy = self.character.max_boost
+         self.interpolation.snap() # No sliding across the level to the checkpoint, nya
 
     def _game_over(self):
         print(f"Game Over! Nya... Final Score: {self.score}")
@@ -355,260 +556,430 @@ class SonicFangameWorld:
         self.character.visible = False # Hide the kitty
         # application.quit() # Maybe don't quit right away?
 
+    def _telemetry_counts(self):
+        # Dropped rings are the particles here, and the rewind buffer is the pool, nya
+        return dict(rings=sum(train.remaining for train in self.ring_trains), enemies=len(self.enemies),
+                    particles=len(self.dropped_rings), pool_used=min(self.rewind.newest + 1, self.rewind.capacity),
+                    pool_size=self.rewind.capacity)
+
     def run(self):
         print("Starting the cute fangame world! Meow!")
         self.app.run()
 
+    # --- Input replays, meow! ---
+    # Recording and playback both run lockstep: one fixed tick per frame with
+    # time.dt pinned, so invoke() delays and animations replay exactly too.
+    def _use_fixed_dt(self, seed, dt):
+        random.seed(seed)
+        application.calculate_dt = False
+        time.dt = dt
+        self.clock.set_dt(dt) # One tick per frame, purrr
+        self.badniks.budget = None # No wall-clock budget, every due badnik ticks, purrr
+
+    def start_recording(self, path, seed=None, dt=1/60):
+        if seed is None:
+            seed = random.getrandbits(63)
+        self._use_fixed_dt(seed, dt)
+        self.recorder = InputRecorder(sorted(self.controls), seed, dt)
+        atexit.register(self.stop_recording, path)
+
+    def stop_recording(self, path):
+        if not self.recorder:
+            return
+        size = self.recorder.save(path, self.state_hash())
+        print(f"Saved {self.recorder.tick_count} ticks to '{path}' ({size} bytes), purrr!")
+        self.recorder = None
+
+    def play_replay(self, path):
+        """Feed a recording back through the game at full speed. Returns True if the final state matches"""
+        replay = InputReplay.load(path)
+        self._use_fixed_dt(replay.seed, replay.dt)
+        self.replay_player = ReplayPlayer(replay)
+        while not self.replay_player.done:
+            self.app.step()
+        matched = self.state_hash() == replay.state_hash
+        print(f"Replayed {replay.tick_count} ticks: {'state matches' if matched else 'STATE MISMATCH'}! Nya!")
+        return matched
+
+    # --- Ghost runs, meow! ---
+    # A ghost frame is the kitty's transform after each tick, frame 0 being the tick recording started.
+    def start_ghost_recording(self, path):
+        self.ghost_recorder = GhostRecorder(path, rate=self.clock.rate)
+        self.ghost_start = self.tick
+        self.ghost_recorder.record(*self.character.getPos(), self.character.getH())
+        atexit.register(self.stop_ghost_recording)
+
+    def stop_ghost_recording(self):
+        if not self.ghost_recorder:
+            return
+        size = self.ghost_recorder.close()
+        print(f"Saved a {self.ghost_recorder.frames} tick ghost to '{self.ghost_recorder.path}' ({size} bytes), purrr!")
+        self.ghost_recorder = None
+
+    def add_ghost(self, path, start=None):
+        """Race a recorded run, starting now (or at game tick start)"""
+        node = Entity(model='sphere', color=color.rgba(255, 255, 255, 80), scale=self.character.scale)
+        self.ghosts.add(GhostReader(path), node, self.tick if start is None else start)
+        return node
+
+    # --- Rewind, meow! ---
+    # Gameplay state (not render nodes) is flattened into one float vector per tick for the RewindBuffer:
+    # score and lives, the kitty's motion and body, the camera rig (kitty steers camera-relative),
+    # every badnik, monitor and checkpoint of the level, each ring's collected bit and the rings in flight. Pending invoke()s (respawns, blinks) and
+    # dropped rings are just effects, they don't rewind, purrr.
+    _BODY_FIELDS = [name for name in CharacterState.__slots__ if name not in ('state', 'spawn_point')]
+    _BODY_FLAGS = {name for name in _BODY_FIELDS if isinstance(getattr(CharacterState(None, 0), name), bool)}
+    _HEAD = 26 + len(_BODY_FIELDS)
+    _ENEMY = 9 # alive, x, y, z, patrol angle, state, last tick, band, next frame
+
+    def _setup_rewind(self, seconds=5):
+        self.enemy_roster = list(self.enemies)
+        self.monitor_roster = list(self.monitors)
+        self.state_names = [] # Kitty and badnik states are strings, the vector stores their index here
+        self.ring_total = len(self.ring_magnet.owners)
+        width = (self._HEAD + self._ENEMY * len(self.enemy_roster) + len(self.monitor_roster) + len(self.checkpoints)
+                 + self.ring_total * 8) # collected bit, plus key, position and velocity when in flight
+        self.rewind = RewindBuffer(width, seconds=seconds)
+        self.rewind_state = np.zeros(width)
+        self.rewind_key = 'backspace'
+        self.tick = 0
+        self.rewind.record(self.tick, self.capture_state())
+
+    def _name_index(self, name):
+        if name not in self.state_names:
+            self.state_names.append(name)
+        return self.state_names.index(name)
+
+    def capture_state(self):
+        """The gameplay state as the RewindBuffer's float vector (reused, copy it to keep it)"""
+        c = self.character
+        m = c.motion
+        b = c.body
+        magnet = self.ring_magnet
+        out = self.rewind_state
+        n = self._HEAD
+        out[:n] = [
+            self.ring_count, self.score, self.lives, self.badniks.time, self.badniks.frame,
+            magnet.active, magnet.homing,
+            c.x, c.y, c.z, m.vx, m.vy, m.vz, c.rotation_y, m.nx, m.ny, m.nz,
+            self._name_index(b.state), *b.spawn_point,
+            *self.camera_rig.position, self.camera_rig.rotation_y, camera.z,
+        ] + [getattr(b, name) for name in self._BODY_FIELDS]
+        for enemy in self.enemy_roster:
+            badnik = self.badniks.badniks.get(id(enemy))
+            if badnik is None:
+                out[n:n + self._ENEMY] = 0
+            else:
+                out[n:n + self._ENEMY] = (1, badnik.x, badnik.y, badnik.z, badnik.angle, self._name_index(badnik.state),
+                                          badnik.last_tick, badnik.band, badnik.next_frame)
+            n += self._ENEMY
+        for monitor in self.monitor_roster:
+            out[n] = monitor.enabled
+            n += 1
+        for cp in self.checkpoints:
+            out[n] = cp.color == color.lime
+            n += 1
+        for train in self.ring_trains:
+            out[n:n + len(train.collected)] = np.frombuffer(train.collected, np.uint8)
+            n += len(train.collected)
+        homing = magnet.homing
+        total = self.ring_total
+        out[n:n + total] = 0
+        out[n:n + homing] = magnet.keys
+        n += total
+        out[n:n + total * 6] = 0
+        out[n:n + homing * 3] = magnet.pos.ravel()
+        out[n + total * 3:n + total * 3 + homing * 3] = magnet.vel.ravel()
+        return out
+
+    def rewind_to(self, tick):
+        """Put the gameplay state back the way it was at tick. Recording carries on from there"""
+        s = self.rewind.restore(tick)
+        c = self.character
+        m = c.motion
+        b = c.body
+        self.ring_count, self.score, self.lives = int(s[0]), int(s[1]), int(s[2])
+        self.badniks.time, self.badniks.frame = float(s[3]), int(s[4])
+        homing = int(s[6])
+        c.position = Vec3(*s[7:10])
+        m.vx, m.vy, m.vz = float(s[10]), float(s[11]), float(s[12])
+        c.rotation_y = float(s[13])
+        m.load(c)
+        m.set_ground_normal(float(s[14]), float(s[15]), float(s[16]))
+        b.state = self.state_names[int(s[17])]
+        b.spawn_point = Vec3(*s[18:21])
+        self.camera_rig.position = Vec3(*s[21:24])
+        self.camera_rig.rotation_y = float(s[24])
+        camera.z = float(s[25])
+        for i, name in enumerate(self._BODY_FIELDS):
+            value = s[26 + i]
+            setattr(b, name, bool(value) if name in self._BODY_FLAGS else float(value))
+        n = self._HEAD
+
+        self.enemies = []
+        for enemy in self.enemy_roster:
+            alive, x, y, z, angle, state, last_tick, band, next_frame = s[n:n + self._ENEMY]
+            n += self._ENEMY
+            badnik = self.badniks.badniks.get(id(enemy))
+            if not alive:
+                if badnik is not None:
+                    self.badniks.remove(enemy)
+                    enemy.disable()
+                continue
+            if badnik is None:
+                enemy.enable()
+                badnik = self.badniks.add(enemy)
+            badnik.x, badnik.y, badnik.z, badnik.angle = float(x), float(y), float(z), float(angle)
+            badnik.state = self.state_names[int(state)]
+            badnik.last_tick, badnik.band, badnik.next_frame = float(last_tick), int(band), int(next_frame)
+            enemy.setPos(badnik.x, badnik.y, badnik.z)
+            self.enemies.append(enemy)
+        self.badniks.reschedule()
+
+        self.monitors = []
+        for monitor in self.monitor_roster:
+            monitor.enabled = bool(s[n])
+            if monitor.enabled:
+                self.monitors.append(monitor)
+            n += 1
+        for cp in self.checkpoints:
+            cp.color = color.lime if s[n] else color.yellow
+            n += 1
+
+        for train in self.ring_trains:
+            bits = s[n:n + len(train.collected)].astype(np.uint8)
+            train.collected[:] = bits.tobytes()
+            train.remaining = len(train.collected) - int(bits.sum())
+            n += len(train.collected)
+        total = self.ring_total
+        self.ring_magnet.restore(s[n:n + homing].astype(np.int64), s[n + total:n + total + homing * 3],
+                                 s[n + total * 4:n + total * 4 + homing * 3])
+        self._set_shield(bool(s[5]))
+        self.tick = tick
+        self.interpolation.snap()
+        if self.ghost_recorder:
+            self.ghost_recorder.truncate(tick - self.ghost_start + 1) # The ghost rewinds with the kitty, nya
+
+    def state_hash(self):
+        self.interpolation.restore() # Hash the simulated kitty, not the drawn one, purrr
+        c = self.character
+        return hash_state(
+            c.x, c.y, c.z, c.motion.vx, c.motion.vy, c.motion.vz, c.rotation_y,
+            c.boost_energy, c.spin_dash_charge, c.invincibility_timer, c.state,
+            self.ring_count, self.score, self.lives, sum(t.remaining for t in self.ring_trains), len(self.enemies),
+            self.ring_magnet.active, self.ring_magnet.homing,
+        )
+
 
 class FangameCharacter(Entity):
     def __init__(self, **kwargs):
         super().__init__(model='sphere', color=color.blue, # Kitty is blue!
                          scale=(0.8, 0.8, 0.8), # Slightly smaller kitty?
                          collider='sphere', **kwargs)
-        # Movement Stats! Nya!
-        self.base_speed = 10 # A bit faster!
-        self.top_speed = 25
-        self.acceleration = 15 # Accelerate faster on ground
-        self.air_acceleration = 5 # Slower acceleration in air
-        self.deceleration = 10 # Stop faster
-        self.friction = 5 # Ground friction
-        self.gravity = 35 # Stronger gravity, more Sonic-like! Purrr.
-        self.air_control_factor = 0.6 # How much control in the air
-        self.jump_height = 12
-        self.max_fall_speed = -30 # Terminal velocity! Nya!
-
-        self.velocity = Vec3(0,0,0)
-        self.grounded = False
-        self.ground_normal = Vec3(0,1,0) # What direction the ground is facing
-
-        # Mechanics! Meow!
-        self.spin_dash_charge = 0
-        self.max_spin_dash_charge = 120
-        self.min_spin_dash_speed = 15
-        self.spin_dash_speed_factor = 0.3
-
-        self.boost_energy = 100
-        self.max_boost = 100
-        self.boost_speed_multiplier = 1.8 # How much faster boost makes you
-        self.boost_cost_per_second = 30
-        self.boost_recharge_per_second = 10
-        self.boost_min_activation = 10 # Need some boost to start
-
-        self.stomp_speed = -25
-        self.homing_speed = 35
-        self.homing_range = 20 # How far kitty can see enemies!
-        self.homing_angle_limit = 70 # Cone in front for homing target
-
-        # State flags
-        self.is_boosting = False
-        self.is_charging_spin_dash = False
-        self.is_rolling = False # General rolling state
-        self.is_stomping = False
-        self.is_homing = False
-        self.homing_available = False # Can only home once per jump usually
-        self.just_jumped = False # To prevent double jumps instantly
-
-        # Invincibility! Nya!
-        self.invincible = False
-        self.invincibility_timer = 0
-
-        # State machine (simple version)
-        self.state = 'idle' # idle, walking, running, jumping, rolling, spinning, boosting, stomping, homing
-        self.spawn_point = self.position + Vec3(0,1,0) # Start spawn point slightly above initial position
+        # Movement Stats and runtime state live in slotted records, not on the Entity, nya!
+        # (See fangame_state.py; the old attribute names still work through properties.)
+        self.stats = CharacterStats()
+        self.body = CharacterState(
+            spawn_point=self.position + Vec3(0,1,0), # Start spawn point slightly above initial position
+            boost_energy=self.stats.max_boost,
+        )
+        # Position, velocity, facing and ground normal as plain floats for the movement math (fangame_kinematics.py)
+        self.motion = Kinematics(self.position, self.rotation_y)
 
+        # Heightfield ground to sample instead of raycasting, set by the world. Nya!
+        self.terrain = None
         # Store audio system reference
         self.audio = None
         # Store potential homing targets
         self.potential_targets = []
+        # Keys and camera the kitty steers by, netplay racers get their own! Nya!
+        self.keys = held_keys
+        self.view = camera
 
 
     def is_attacking(self):
         # Kitty is attacking if rolling, stomping, or homing! Nya!
-        return self.is_rolling or self.is_stomping or self.is_homing
+        b = self.body
+        return b.is_rolling or b.is_stomping or b.is_homing
+
+    # Velocity and ground normal are floats in self.motion now; these hand out Vec3 copies, nya!
+    # (So character.velocity.y = 5 does nothing, write character.motion.vy instead.)
+    @property
+    def velocity(self):
+        m = self.motion
+        return Vec3(m.vx, m.vy, m.vz)
+
+    @velocity.setter
+    def velocity(self, value):
+        m = self.motion
+        m.vx, m.vy, m.vz = value
+
+    @property
+    def ground_normal(self):
+        m = self.motion
+        return Vec3(m.nx, m.ny, m.nz)
+
+    @ground_normal.setter
+    def ground_normal(self, value):
+        self.motion.set_ground_normal(*value)
 
     def game_update(self, dt, audio, enemies):
         # Store references! Purrr.
         self.audio = audio
         self.potential_targets = enemies
+        s = self.stats
+        b = self.body
+        controls = self.controls
+        keys = self.keys
+
+        # Read the kitty's transform once, everything below works on plain floats in self.motion, purrr
+        m = self.motion
+        m.load(self)
+        half_height = self.scale_y * 0.5
 
         # --- Ground Check ---
-        # Cast slightly downwards from kitty's center
-        ground_check = raycast(self.world_position + self.up * 0.1, self.down, distance=self.scale_y * 0.5 + 0.2, ignore=[self], debug=False)
-        self.grounded = ground_check.hit
+        # Cast slightly downwards from kitty's center (self.up carries the scale, so 0.1 of it).
+        # Over the heightfield that's one sample, props (platforms, springs...) still need the raycast, purrr.
+        ray_y = m.y + self.scale_y * 0.1
+        if self.terrain is not None:
+            ground = self.terrain.ground(m.x, ray_y, m.z, half_height + 0.2, self._raycast_ground)
+        else:
+            ground = self._raycast_ground(m.x, ray_y, m.z, half_height + 0.2)
+        b.grounded = ground is not None
 
-        if self.grounded:
-            self.ground_normal = ground_check.world_normal
+        if b.grounded:
+            ground_y, nx, ny, nz = ground
+            m.set_ground_normal(nx, ny, nz)
             # Snap to ground if needed, slightly adjust position
-            self.y = ground_check.world_point.y + self.scale_y * 0.5
+            m.y = ground_y + half_height
             # Reset vertical velocity if we just landed
-            if self.velocity.y < 0:
-                self.velocity.y = 0
+            if m.vy < 0:
+                m.vy = 0
             # Allow homing again after landing
-            self.homing_available = True
-            self.is_homing = False # No longer homing if grounded
-            self.is_stomping = False # No longer stomping if grounded
-            if self.just_jumped: self.just_jumped = False # Can jump again
+            b.homing_available = True
+            b.is_homing = False # No longer homing if grounded
+            b.is_stomping = False # No longer stomping if grounded
+            if b.just_jumped: b.just_jumped = False # Can jump again
 
             # Cancel stomp state if we hit ground
-            if self.state == 'stomping':
-                self.state = 'idle' # Or maybe a little 'land' animation? Purr.
+            if b.state == 'stomping':
+                b.state = 'idle' # Or maybe a little 'land' animation? Purr.
                 # Add small landing effect?
         else:
-            self.ground_normal = Vec3(0,1,0) # Assume flat ground normal if airborne
-            # Apply Gravity
-            self.velocity.y -= self.gravity * dt
-            # Clamp fall speed
-            if self.velocity.y < self.max_fall_speed:
-                self.velocity.y = self.max_fall_speed
+            m.set_ground_normal(0, 1, 0) # Assume flat ground normal if airborne
+            # Apply Gravity, clamping fall speed
+            m.fall(s.gravity, dt, s.max_fall_speed)
             # Can't charge spindash in air
-            if self.is_charging_spin_dash:
+            if b.is_charging_spin_dash:
                 self._release_spin_dash() # Release if kitty falls off edge while charging
-                self.is_charging_spin_dash = False
-
-        # --- Handle Input ---
-        move_input = Vec3(held_keys[self.controls['right']] - held_keys[self.controls['left']],
-                           0,
-                           held_keys[self.controls['up']] - held_keys[self.controls['down']]).normalized()
+                b.is_charging_spin_dash = False
 
-        # --- Camera Relative Movement ---
-        # Get camera's forward direction on the XZ plane
-        cam_fwd = camera.forward
-        cam_fwd.y = 0
-        cam_fwd.normalize()
-        cam_right = camera.right
-        cam_right.y = 0
-        cam_right.normalize()
-
-        # Calculate world direction based on input and camera
-        world_move_dir = (cam_fwd * move_input.z + cam_right * move_input.x).normalized()
+        # --- Handle Input & Camera Relative Movement ---
+        # World direction from the input and the camera's forward direction on the XZ plane
+        cam_fwd = self.view.forward
+        has_input = m.steer(keys[controls['right']], keys[controls['left']],
+                            keys[controls['up']], keys[controls['down']],
+                            cam_fwd.x, cam_fwd.z)
 
         # --- State Updates & Movement Logic ---
 
         # Stop boosting if button released or out of energy
-        if self.is_boosting and (not held_keys[self.controls['boost']] or self.boost_energy <= 0):
-            self.is_boosting = False
+        if b.is_boosting and (not keys[controls['boost']] or b.boost_energy <= 0):
+            b.is_boosting = False
             self.audio.play('boost_end') # Pretend sound
 
         # Boosting depletes energy, otherwise recharge
-        if self.is_boosting:
-            self.boost_energy -= self.boost_cost_per_second * dt
-            if self.boost_energy <= 0:
-                self.boost_energy = 0
-                self.is_boosting = False # Force stop if empty
-        elif self.grounded: # Only recharge boost on ground! Nya!
-            self.boost_energy = min(self.max_boost, self.boost_energy + self.boost_recharge_per_second * dt)
+        if b.is_boosting:
+            b.boost_energy -= s.boost_cost_per_second * dt
+            if b.boost_energy <= 0:
+                b.boost_energy = 0
+                b.is_boosting = False # Force stop if empty
+        elif b.grounded: # Only recharge boost on ground! Nya!
+            b.boost_energy = min(s.max_boost, b.boost_energy + s.boost_recharge_per_second * dt)
 
         # Start Boosting
-        if self.grounded and held_keys[self.controls['boost']] and move_input.length() > 0 and self.boost_energy > self.boost_min_activation and not self.is_boosting:
-            self.is_boosting = True
-            self.is_rolling = True # Boosting often involves rolling! Purrr.
+        if b.grounded and keys[controls['boost']] and has_input and b.boost_energy > s.boost_min_activation and not b.is_boosting:
+            b.is_boosting = True
+            b.is_rolling = True # Boosting often involves rolling! Purrr.
             self.audio.play('boost_start') # Pretend sound
 
         # Spin Dash Charging
-        if self.grounded and held_keys[self.controls['spin_dash']] and not self.is_rolling:
-            if not self.is_charging_spin_dash: # First frame of charging
+        if b.grounded and keys[controls['spin_dash']] and not b.is_rolling:
+            if not b.is_charging_spin_dash: # First frame of charging
                 self.audio.play('spindash_charge') # Pretend sound
-                self.velocity = Vec3(0,0,0) # Stop moving while charging
-            self.is_charging_spin_dash = True
-            self.spin_dash_charge = min(self.max_spin_dash_charge, self.spin_dash_charge + 90 * dt) # Charge up!
-            self.state = 'spinning'
+                m.vx = m.vy = m.vz = 0 # Stop moving while charging
+            b.is_charging_spin_dash = True
+            b.spin_dash_charge = min(s.max_spin_dash_charge, b.spin_dash_charge + 90 * dt) # Charge up!
+            b.state = 'spinning'
             # Make kitty face forward based on last direction or camera?
             # For now, just stay facing current direction.
 
         # Release Spin Dash
-        if self.is_charging_spin_dash and not held_keys[self.controls['spin_dash']]:
+        if b.is_charging_spin_dash and not keys[controls['spin_dash']]:
            self._release_spin_dash()
 
         # Handle movement direction and speed
-        current_speed_xz = Vec3(self.velocity.x, 0, self.velocity.z).length()
-        target_speed = self.top_speed
+        current_speed_xz = m.speed_xz()
+        target_speed = s.top_speed
 
-        if self.is_boosting:
-            target_speed *= self.boost_speed_multiplier
+        if b.is_boosting:
+            target_speed *= s.boost_speed_multiplier
 
         # Apply acceleration / deceleration
-        if move_input.length() > 0 and not self.is_charging_spin_dash:
-            # Rotate kitty to face movement direction
-            target_angle = math.degrees(math.atan2(world_move_dir.x, world_move_dir.z))
-            # Use shortest angle lerp! Purrrrfect!
-            self.rotation_y = lerp_angle(self.rotation_y, target_angle, dt * 10)
-
-            # Acceleration differs in air vs ground
-            accel = self.acceleration if self.grounded else self.air_acceleration
-            current_vel_in_move_dir = self.velocity.dot(world_move_dir)
-
-            # Only accelerate if below target speed or moving against direction
-            if current_vel_in_move_dir < target_speed:
-                 new_velocity = self.velocity + world_move_dir * accel * dt
-                 # Clamp speed if needed? Might feel better without strict clamp during accel.
-                 self.velocity.x = new_velocity.x
-                 self.velocity.z = new_velocity.z
-                 # Limit speed if not boosting (but allow boost to exceed)
-                 if not self.is_boosting:
-                     vel_xz = Vec3(self.velocity.x, 0, self.velocity.z)
-                     if vel_xz.length() > self.top_speed:
-                         vel_xz = vel_xz.normalized() * self.top_speed
-                         self.velocity.x = vel_xz.x
-                         self.velocity.z = vel_xz.z
-
-
-            # Air control adjustment - allows changing direction mid-air
-            if not self.grounded:
-                 # Project current velocity onto new direction and lerp
-                 proj_vel = world_move_dir * max(0, current_vel_in_move_dir) # Velocity along the new direction
-                 side_vel = self.velocity - proj_vel # Velocity perpendicular to new direction
-                 # Blend towards the new direction
-                 self.velocity = lerp(self.velocity, proj_vel + side_vel, dt * self.air_control_factor * 5)
+        if has_input and not b.is_charging_spin_dash:
+            # Rotate kitty to face movement direction, shortest angle lerp! Purrrrfect!
+            m.turn(dt * 10)
+
+            # Acceleration differs in air vs ground. Only accelerate if below target speed or moving
+            # against direction, and limit speed if not boosting (but allow boost to exceed)
+            accel = s.acceleration if b.grounded else s.air_acceleration
+            m.accelerate(accel, target_speed, dt, None if b.is_boosting else s.top_speed)
 
+            # Air control used to blend velocity towards (along + side) of the new direction, which adds
+            # back up to velocity itself, so there is nothing to do mid-air, nya.
 
             # Update state based on speed
-            if self.grounded:
-                if self.is_rolling: self.state = 'rolling'
-                elif self.is_boosting: self.state = 'boosting'
-                elif current_speed_xz > self.base_speed * 0.8: self.state = 'running'
-                else: self.state = 'walking'
+            if b.grounded:
+                if b.is_rolling: b.state = 'rolling'
+                elif b.is_boosting: b.state = 'boosting'
+                elif current_speed_xz > s.base_speed * 0.8: b.state = 'running'
+                else: b.state = 'walking'
 
-        elif self.grounded and not self.is_charging_spin_dash and not self.is_rolling: # No input, grounded, not charging/rolling
+        elif b.grounded and not b.is_charging_spin_dash and not b.is_rolling: # No input, grounded, not charging/rolling
              # Apply friction / deceleration
-             speed_reduction = (self.deceleration + self.friction) * dt
-             if current_speed_xz > speed_reduction:
-                 decel_factor = (current_speed_xz - speed_reduction) / current_speed_xz
-                 self.velocity.x *= decel_factor
-                 self.velocity.z *= decel_factor
-             else:
-                 self.velocity.x = 0
-                 self.velocity.z = 0
-             self.state = 'idle'
+             m.decelerate((s.deceleration + s.friction) * dt)
+             b.state = 'idle'
 
         # Jumping
-        if self.grounded and held_keys[self.controls['jump']] and not self.just_jumped and not self.is_charging_spin_dash:
-            self.velocity.y = self.jump_height
-            self.grounded = False
-            self.state = 'jumping'
+        if b.grounded and keys[controls['jump']] and not b.just_jumped and not b.is_charging_spin_dash:
+            m.vy = s.jump_height
+            b.grounded = False
+            b.state = 'jumping'
             self.audio.play('jump') # Pretend sound
-            self.homing_available = True # Can home after jumping!
-            self.just_jumped = True # Prevent immediate re-jump next frame
-            self.is_rolling = False # Jumping usually uncurls kitty!
+            b.homing_available = True # Can home after jumping!
+            b.just_jumped = True # Prevent immediate re-jump next frame
+            b.is_rolling = False # Jumping usually uncurls kitty!
 
         # Stomping! Nya!
-        if not self.grounded and held_keys[self.controls['stomp']] and not self.is_stomping and not self.is_homing:
-            self.is_stomping = True
-            self.velocity.y = self.stomp_speed
-            self.velocity.x = 0 # Stop horizontal movement during stomp
-            self.velocity.z = 0
-            self.state = 'stomping'
+        if not b.grounded and keys[controls['stomp']] and not b.is_stomping and not b.is_homing:
+            b.is_stomping = True
+            m.vy = s.stomp_speed
+            m.vx = 0 # Stop horizontal movement during stomp
+            m.vz = 0
+            b.state = 'stomping'
             self.audio.play('stomp') # Pretend sound
 
         # Homing Attack! Pew Pew!
-        if not self.grounded and held_keys[self.controls['jump']] and self.homing_available and not self.is_stomping and self.state != 'jumping': # Check state to avoid double jump triggering homing
-            target = self._find_homing_target()
+        if not b.grounded and keys[controls['jump']] and b.homing_available and not b.is_stomping and b.state != 'jumping': # Check state to avoid double jump triggering homing
+            pos = Vec3(m.x, m.y, m.z)
+            target = self._find_homing_target(pos, m.rotation_y)
             if target:
-                direction = (target.world_position - self.world_position).normalized()
-                self.velocity = direction * self.homing_speed
-                self.is_homing = True
-                self.state = 'homing'
+                direction = (target.world_position - pos).normalized()
+                m.vx, m.vy, m.vz = direction * s.homing_speed
+                b.is_homing = True
+                b.state = 'homing'
                 self.audio.play('homing_attack') # Pretend sound
-                self.homing_available = False # Used homing attack
+                b.homing_available = False # Used homing attack
             else:
                 # Maybe a little jump dash if no target? Or just ignore?
                 # Let's ignore for now, purrr.
@@ -618,67 +989,80 @@ class FangameCharacter(Entity):
         # Automatically roll if speed is high and grounded? Or require input?
         # Let's keep it simple: boosting or spin-dashing makes you roll.
         # Stop rolling if speed drops too low while grounded and not boosting/spin-dashing.
-        if self.is_rolling and self.grounded and not self.is_boosting and not self.is_charging_spin_dash and current_speed_xz < self.base_speed * 0.5:
-            self.is_rolling = False
+        if b.is_rolling and b.grounded and not b.is_boosting and not b.is_charging_spin_dash and current_speed_xz < s.base_speed * 0.5:
+            b.is_rolling = False
 
 
         # --- Apply Velocity ---
         # Handle slopes! Nya! Project velocity onto the ground plane if grounded.
-        if self.grounded and not self.just_jumped: # Don't interfere right after jumping
+        if b.grounded and not b.just_jumped: # Don't interfere right after jumping
             # Project velocity onto the plane defined by the ground normal
-            projected_velocity = self.velocity - self.ground_normal * self.velocity.dot(self.ground_normal)
-            self.velocity = projected_velocity
+            m.project_on_ground()
 
             # Add a small downward force to help stick to slopes?
-            # self.velocity -= self.ground_normal * self.gravity * dt * 0.5
+            # velocity -= ground_normal * s.gravity * dt * 0.5
 
-        # Actual movement application (using move function handles collisions better)
-        move_amount = self.velocity * dt
-        self.position += move_amount
-        # Using Ursina's built-in collision handling by moving the entity
+        # Actual movement application, written to the Entity once per tick! Meow!
+        m.integrate(dt)
+        m.store(self)
 
 
         # --- Invincibility Timer ---
-        if self.invincible:
-            self.invincibility_timer -= dt
-            if self.invincibility_timer <= 0:
-                self.invincible = False
-                self.invincibility_timer = 0
+        if b.invincible:
+            b.invincibility_timer -= dt
+            if b.invincibility_timer <= 0:
+                b.invincible = False
+                b.invincibility_timer = 0
                 self.color = color.blue # Restore original color! Meow!
                 self.alpha = 1 # Restore alpha
 
+    def _raycast_ground(self, x, y, z, distance):
+        # (height, normal x, y, z) of whatever collider is below, for props and off the terrain, nya
+        ground_check = raycast((x, y, z), (0, -1, 0), distance=distance, ignore=[self], debug=False)
+        if not ground_check.hit:
+            return None
+        return (ground_check.world_point.y, *ground_check.world_normal)
+
     def _release_spin_dash(self):
          # Release spin dash only if charged enough! Nya!
-         if self.spin_dash_charge > 10: # Minimum charge needed
-             speed = self.min_spin_dash_speed + self.spin_dash_charge * self.spin_dash_speed_factor
-             # Use the direction the character is facing!
-             self.velocity = self.forward * speed
+         s = self.stats
+         b = self.body
+         if b.spin_dash_charge > 10: # Minimum charge needed
+             speed = s.min_spin_dash_speed + b.spin_dash_charge * s.spin_dash_speed_factor
+             # Use the direction the character is facing! (The Entity still has this tick's starting rotation.)
+             self.motion.vx, self.motion.vy, self.motion.vz = self.forward * speed
              self.audio.play('spindash_release') # Pretend sound
-             self.is_rolling = True # Start rolling!
-             self.state = 'rolling'
-         self.spin_dash_charge = 0
-         self.is_charging_spin_dash = False
-
-    def _find_homing_target(self):
+             b.is_rolling = True # Start rolling!
+             b.state = 'rolling'
+         b.spin_dash_charge = 0
+         b.is_charging_spin_dash = False
+
+    def _facing(self, rotation_y=None):
+        # self.forward for a yaw, without touching the Entity mid-tick, nya (it carries the scale too!)
+        if rotation_y is None:
+            return self.forward
+        r = math.radians(rotation_y)
+        return Vec3(math.sin(r), 0, math.cos(r)) * self.scale_z
+
+    def _find_homing_target(self, position=None, rotation_y=None):
         best_target = None
-        min_dist_sq = self.homing_range * self.homing_range # Check within range
+        min_dist_sq = self.stats.homing_range * self.stats.homing_range # Check within range
+        position = self.world_position if position is None else position
+        forward = self._facing(rotation_y)
+        cos_limit = math.cos(math.radians(self.stats.homing_angle_limit))
 
         for enemy in self.potential_targets:
             if not hasattr(enemy, 'position'): continue # Skip if enemy has no position (already destroyed?)
 
-            direction_to_enemy = enemy.world_position - self.world_position
+            direction_to_enemy = enemy.world_position - position
             dist_sq = direction_to_enemy.length_squared()
 
             if dist_sq < min_dist_sq:
                 # Check if target is generally in front of the player
                 # Using dot product with kitty's forward direction
-                dir_normalized = direction_to_enemy.normalized()
-                dot_product = self.forward.dot(dir_normalized)
+                dot_product = forward.dot(direction_to_enemy.normalized())
 
-                # Convert dot product to angle (approx)
-                angle = math.degrees(math.acos(clamp(dot_product, -1, 1)))
-
-                if angle < self.homing_angle_limit: # Check if within homing cone
+                if dot_product > cos_limit: # Check if within homing cone (no acos needed, purrr)
                     min_dist_sq = dist_sq
                     best_target = enemy
 
@@ -691,6 +1075,46 @@ class FangameCharacter(Entity):
         invoke(setattr, self, 'alpha', 1, delay=duration)
 
 
+# The old attribute names still work, they just live in the slotted records now, nya!
+forward_attributes(FangameCharacter, 'stats', CharacterStats.__slots__)
+forward_attributes(FangameCharacter, 'body', CharacterState.__slots__)
+
+
+class RacerView:
+    # Stands in for the camera of a racer on another machine, only its yaw matters for steering, purrr
+    def __init__(self, yaw=0.0):
+        self.yaw = yaw
+
+    @property
+    def forward(self):
+        a = math.radians(self.yaw)
+        return Vec3(math.sin(a), 0, math.cos(a))
+
+
+class Racer:
+    # Another player's kitty, with the keys and yaw netplay.py writes into it every tick, nya!
+    def __init__(self, character):
+        self.character = character
+        self.keys = character.keys
+        self.view = character.view
+        self.ring_count = 0
+        self.score = 0
+
+
 if __name__ == '__main__':
-    world = SonicFangameWorld()
+    # Usage: [--record out.rpl] [--threaded] [--ghost-record out.ghost] [--ghost in.ghost ...] | [--replay in.rpl [--headless]]
+    args = sys.argv[1:]
+    if '--replay' in args:
+        world = SonicFangameWorld(headless='--headless' in args)
+        ok = world.play_replay(args[args.index('--replay') + 1])
+        sys.exit(0 if ok else 1)
+
+    world = SonicFangameWorld(threaded_sim='--threaded' in args)
+    if '--record' in args:
+        world.start_recording(args[args.index('--record') + 1])
+    if '--ghost-record' in args:
+        world.start_ghost_recording(args[args.index('--ghost-record') + 1])
+    for i, arg in enumerate(args):
+        if arg == '--ghost':
+            world.add_ghost(args[i + 1])
     world.run()
@@ -5,10 +5,11 @@ from ursina.shaders import basic_lighting_shader
 import random
 import math
 from collections import deque
-
-class Voxel(Entity):
-    def __init__(self, position=(0, 0, 0)):
-        super().__init__(model='cube', color=color.white, position=position, collider='box')
+import asset_cache
+import telemetry
+from badnik_ai import BadnikScheduler
+from fangame_kinematics import Kinematics
+from voxel_terrain import VoxelTerrain
 
 class FangameAudioSystem:
     def __init__(self):
@@ -20,6 +21,9 @@ class FangameAudioSystem:
 class SonicFangameWorld:
     def __init__(self):
         self.app = Ursina()
+        asset_cache.install()
+        self.telemetry = telemetry.install(lambda: dict(rings=len(self.rings), enemies=len(self.enemies)),
+                                           path='fangame2510_telemetry.tlm')
         window.title = 'Sonic Fangame World Demo'
         window.borderless = False
         window.fullscreen = False
@@ -44,26 +48,34 @@ class SonicFangameWorld:
         camera.rotation_x = 30
 
         self._create_fangame_world()
+        self.badniks = BadnikScheduler()
+        for enemy in self.enemies:
+            self.badniks.add(enemy)
         self._setup_controls()
+        self.character.controls = self.controls
 
         self.input_buffer = deque(maxlen=10)
 
-        self.app.update = self._game_update
+        # Bind game loop (Ursina only ticks entities, so hang it on one)
+        self.game_loop = Entity(update=self._game_update)
 
     def _setup_controls(self):
         self.controls = {
             'left': 'a', 'right': 'd',
             'up': 'w', 'down': 's',
             'jump': 'space', 'boost': 'left shift',
-            'spin_dash': 'left ctrl', 'stomp': 'e',
+            'spin_dash': 'left control', 'stomp': 'e',
             'camera_left': 'q', 'camera_right': 'r'
         }
 
     def _create_fangame_world(self):
-        # Create voxel terrain
-        for z in range(-10, 10):
-            for x in range(-10, 10):
-                voxel = Voxel(position=(x, 0, z))
+        # Create voxel terrain: chunked, so stomps and spin dashes can carve it
+        self.terrain = VoxelTerrain(floor=-3, color=color.white, shader=basic_lighting_shader)
+        self.terrain.fill((-10, -3, -10), (9, 0, 9))
+        for i in range(6):
+            x, z = random.randint(-9, 8), random.randint(-9, 8)
+            self.terrain.fill((x, 1, z), (x + 1, random.randint(1, 3), z + 1))
+        self.terrain.build()
 
         # Create rings
         for i in range(10):
@@ -85,6 +97,16 @@ class SonicFangameWorld:
         if dt > 0.1: dt = 0.1
 
         self.character.game_update(dt, self.audio, self.enemies)
+        self.badniks.update(self.character.position, dt)
+
+        # Carve the terrain: a stomp leaves a crater, a spin dash bores through anything above the floor
+        c = self.character
+        if c.stomp_impact is not None:
+            self.terrain.carve(c.stomp_impact, radius=2.0)
+            c.stomp_impact = None
+        if c.is_rolling:
+            self.terrain.carve(c.world_position, radius=0.9, min_y=c.y - c.scale_y * 0.5 + 0.25)
+        self.terrain.update()
 
         # Update rings
         for ring in self.rings[:]:
@@ -100,6 +122,7 @@ class SonicFangameWorld:
             if self.character.intersects(enemy).hit:
                 if self.character.is_attacking():
                     self.enemies.remove(enemy)
+                    self.badniks.remove(enemy)
                     destroy(enemy)
                     self.score += 10
                     self.audio.play('enemy_defeat', volume=0.5)
@@ -127,54 +150,103 @@ class FangameCharacter(Entity):
         self.air_control_factor = 0.6
         self.jump_height = 12
         self.max_fall_speed = -30
-
-        self.velocity = Vec3(0,0,0)
+        self.stomp_speed = -25
+        self.max_spin_dash_charge = 120
+        self.min_spin_dash_speed = 15
+        self.spin_dash_speed_factor = 0.3
+        self.controls = {'spin_dash': 'left control', 'stomp': 'e'}
+
+        # Position, velocity, facing and ground normal as plain floats (fangame_kinematics.py)
+        self.motion = Kinematics(self.position, self.rotation_y)
         self.grounded = False
-        self.ground_normal = Vec3(0,1,0)
+        self.is_stomping = False
+        self.stomp_impact = None  # where the last stomp landed, until the world has carved it
+        self.is_rolling = False
+        self.is_charging_spin_dash = False
+        self.spin_dash_charge = 0
+
+    @property
+    def velocity(self):
+        m = self.motion
+        return Vec3(m.vx, m.vy, m.vz)
+
+    @velocity.setter
+    def velocity(self, value):
+        m = self.motion
+        m.vx, m.vy, m.vz = value
+
+    @property
+    def ground_normal(self):
+        m = self.motion
+        return Vec3(m.nx, m.ny, m.nz)
 
     def game_update(self, dt, audio, enemies):
-        # Update character movement
-        move_input = Vec3(held_keys['d'] - held_keys['a'], 0, held_keys['w'] - held_keys['s']).normalized()
+        m = self.motion
+        m.load(self)
+
+        # Spin dash: charge while held on the ground, launch rolling on release
+        controls = self.controls
+        if self.grounded and held_keys[controls['spin_dash']]:
+            self.is_charging_spin_dash = True
+            self.spin_dash_charge = min(self.max_spin_dash_charge, self.spin_dash_charge + 90 * dt)
+            m.vx = m.vz = 0
+        elif self.is_charging_spin_dash:
+            if self.spin_dash_charge > 10:
+                speed = self.min_spin_dash_speed + self.spin_dash_charge * self.spin_dash_speed_factor
+                facing = math.radians(m.rotation_y)
+                m.vx, m.vz = math.sin(facing) * speed, math.cos(facing) * speed
+                self.is_rolling = True
+                audio.play('spindash_release')
+            self.is_charging_spin_dash = False
+            self.spin_dash_charge = 0
+
+        # Stomp: straight down from the air
+        if not self.grounded and held_keys[controls['stomp']] and not self.is_stomping:
+            self.is_stomping = True
+            m.vx = m.vz = 0
+            m.vy = self.stomp_speed
+            audio.play('stomp')
 
+        # Update character movement
         cam_fwd = camera.forward
-        cam_fwd.y = 0
-        cam_fwd.normalize()
-        cam_right = camera.right
-        cam_right.y = 0
-        cam_right.normalize()
-
-        world_move_dir = (cam_fwd * move_input.z + cam_right * move_input.x).normalized()
+        if m.steer(held_keys['d'], held_keys['a'], held_keys['w'], held_keys['s'], cam_fwd.x, cam_fwd.z):
+            m.turn(dt * 10)
 
-        if move_input.length() > 0:
-            self.rotation_y = lerp_angle(self.rotation_y, math.degrees(math.atan2(world_move_dir.x, world_move_dir.z)), dt * 10)
+            if not self.is_charging_spin_dash and not self.is_stomping:
+                accel = self.acceleration if self.grounded else self.air_acceleration
+                m.accelerate(accel, self.top_speed, dt)
 
-            accel = self.acceleration if self.grounded else self.air_acceleration
-            current_vel_in_move_dir = self.velocity.dot(world_move_dir)
-
-            if current_vel_in_move_dir < self.top_speed:
-                new_velocity = self.velocity + world_move_dir * accel * dt
-                self.velocity.x = new_velocity.x
-                self.velocity.z = new_velocity.z
+        # A roll slows down until it is back to running speed
+        if self.is_rolling:
+            m.decelerate(self.friction * dt)
+            if m.speed_xz() < self.base_speed * 0.5:
+                self.is_rolling = False
 
         # Apply gravity
         if not self.grounded:
-            self.velocity.y -= self.gravity * dt
+            m.fall(self.gravity, dt)
 
         # Move character
-        self.position += self.velocity * dt
+        m.integrate(dt)
 
         # Check for ground collision
-        ground_check = raycast(self.world_position + self.up * 0.1, self.down, distance=self.scale_y * 0.5 + 0.2, ignore=[self], debug=False)
+        half_height = self.scale_y * 0.5
+        ground_check = raycast((m.x, m.y + self.scale_y * 0.1, m.z), (0, -1, 0), distance=half_height + 0.2, ignore=[self], debug=False)
         self.grounded = ground_check.hit
 
         if self.grounded:
-            self.ground_normal = ground_check.world_normal
-            self.y = ground_check.world_point.y + self.scale_y * 0.5
-            if self.velocity.y < 0:
-                self.velocity.y = 0
+            m.set_ground_normal(*ground_check.world_normal)
+            m.y = ground_check.world_point.y + half_height
+            if m.vy < 0:
+                m.vy = 0
+            if self.is_stomping:
+                self.is_stomping = False
+                self.stomp_impact = (m.x, m.y - half_height, m.z)
+
+        m.store(self)
 
     def is_attacking(self):
-        return False  # Implement attack logic here
+        return self.is_rolling or self.is_stomping
 
 if __name__ == '__main__':
     world = SonicFangameWorld()
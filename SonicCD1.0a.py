@@ -2,6 +2,8 @@
 
 # test.py
 from ursina import * # Bug Fix 1: Added necessary imports
+import asset_cache
+import telemetry
 
 class FangameCharacter(Entity):
     def __init__(self, **kwargs):
@@ -96,6 +98,8 @@ class FangameCharacter(Entity):
 # Example Usage (requires Ursina app setup)
 if __name__ == '__main__':
     app = Ursina()
+    asset_cache.install()
+    telemetry.install(path='cd_telemetry.tlm')
 
     # Need a ground plane for testing grounded state, collisions etc.
     ground = Entity(model='plane', scale=30, collider='box', texture='white_cube', texture_scale=(30,30))
@@ -1,7 +1,6 @@
 import math
 
-from ursina import raycast
-from ursina.camera import clamp
+from ursina import clamp, raycast
  
 
 def _find_homing_target(self):
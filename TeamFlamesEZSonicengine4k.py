@@ -3,10 +3,19 @@ from ursina.shaders import basic_lighting_shader
 import random
 import math
 from collections import deque
+import asset_cache
+import dynamic_resolution
+import telemetry
+from scene_snapshot import SceneSnapshot
+from badnik_ai import BadnikScheduler
+import heightfield
 
 class SonicAdventureEngine:
     def __init__(self):
         self.app = Ursina()
+        asset_cache.install()
+        self.resolution = dynamic_resolution.install()  # scale 3D rendering to hold the frame rate
+        self.telemetry = telemetry.install(self._telemetry_counts, path='adventure_telemetry.tlm')
         window.title = 'Sonic Adventure Tech Demo'
         window.borderless = False
         window.fullscreen = False
@@ -39,12 +48,26 @@ class SonicAdventureEngine:
         camera.position = (0, 15, -20)
         camera.rotation_x = 30
         
-        # Demo level setup
-        self._create_demo_level()
+        # Ground is a heightfield, sampled instead of raycast by the character
+        self.terrain = heightfield.Heightfield([[0] * 51 for _ in range(51)], size=(100, 100), position=(0, -0.5, 0))
+        
+        # Demo level setup (warm starts load the last build from a snapshot)
+        snapshot = SceneSnapshot('adventure_demo_level', sources=(SonicAdventureEngine._create_demo_level, heightfield),
+                                 lists=('rings',), attrs=('ground', 'checkpoint', 'spring', 'enemy'))
+        if not snapshot.restore(self):
+            self._create_demo_level()
+            snapshot.capture(self)
+        self.terrain.add_props((self.checkpoint, self.spring))
+        self._create_character()
+        self.badniks = BadnikScheduler()
+        self.badniks.add(self.enemy, patrol_radius=4)
         
         # Input
         self.input_buffer = deque(maxlen=10)
         self._setup_controls()
+
+        # Bind game loop (Ursina only ticks entities, so hang it on one)
+        self.game_loop = Entity(update=self.update)
         
     def _setup_dreamcast_aesthetics(self):
         """Configure Dreamcast-style visual elements"""
@@ -79,14 +102,11 @@ class SonicAdventureEngine:
         
     def _create_demo_level(self):
         """Create a simple Adventure-style level"""
-        # Ground
-        self.ground = Entity(
-            model='plane',
+        # Ground, one chunk (no collider, see self.terrain)
+        self.ground, = self.terrain.build(
+            chunk_size=50,
             texture='white_cube',
-            color=color.rgb(30, 120, 80),
-            scale=(100, 1, 100),
-            collider='box',
-            position=(0, -0.5, 0)
+            color=color.rgb(30, 120, 80)
         )
         
         # Checkpoint (Adventure-style)
@@ -132,6 +152,8 @@ class SonicAdventureEngine:
             collider='sphere'
         )
         
+    def _create_character(self):
+        """Create the player character"""
         # Player character (Sonic)
         self.character = AdventureCharacter(
             model='sphere',
@@ -140,14 +162,15 @@ class SonicAdventureEngine:
             position=(0, 1, 0),
             collider='sphere'
         )
+        self.character.terrain = self.terrain
         self.entities.append(self.character)
         
     def update(self):
         """Main game loop"""
         dt = time.dt * self.time_scale
         
-        # Update character
-        self.character.update()
+        # The character is an Entity, Ursina updates it on its own
+        self.badniks.update(self.character.position, dt)
         
         # Check ring collisions
         for ring in self.rings[:]:
@@ -225,6 +248,11 @@ class SonicAdventureEngine:
         self.audio.play('game_over', volume=0.8)
         application.quit()
         
+    def _telemetry_counts(self):
+        """Per-frame counts for the telemetry ring buffer"""
+        return dict(rings=len(self.rings), enemies=len(self.badniks.badniks),
+                    particles=len(self.particle_systems))
+
     def run(self):
         """Start the engine"""
         self.app.run()
@@ -239,6 +267,7 @@ class AdventureCharacter(Entity):
         self.gravity = 1.5
         self.air_control = 0.5
         self.velocity = Vec3(0, 0, 0)
+        self.terrain = None  # heightfield under the level, if any
         
         # Adventure mechanics
         self.spin_dash_power = 0
@@ -259,9 +288,12 @@ class AdventureCharacter(Entity):
         # Apply gravity
         self.velocity.y -= self.gravity * dt
         
-        # Ground check
-        ground_ray = raycast(self.position, (0, -1, 0), distance=1.1)
-        grounded = ground_ray.hit
+        # Ground check (sampled over terrain, raycast near props)
+        x, y, z = self.position
+        if self.terrain is not None:
+            grounded = self.terrain.ground(x, y, z, 1.1, self._raycast_ground) is not None
+        else:
+            grounded = self._raycast_ground(x, y, z, 1.1) is not None
         
         # Input handling
         move_dir = Vec3(0, 0, 0)
@@ -323,6 +355,13 @@ class AdventureCharacter(Entity):
                 self.invincible = False
                 self.color = color.blue
                 
+    def _raycast_ground(self, x, y, z, distance):
+        """(height, nx, ny, nz) of the collider below, or None"""
+        ground_ray = raycast((x, y, z), (0, -1, 0), distance=distance, ignore=[self])
+        if not ground_ray.hit:
+            return None
+        return (ground_ray.world_point.y, *ground_ray.world_normal)
+            
     def _perform_homing_attack(self):
         """SA2-style homing attack"""
         if self.homing_target:
@@ -5,6 +5,11 @@ from ursina.shaders import basic_lighting_shader
 import random
 import math
 from collections import deque
+import asset_cache
+from badnik_ai import BadnikScheduler
+from fangame_kinematics import Kinematics
+import dynamic_resolution
+import telemetry
 
 class FangameAudioSystem:
     def __init__(self):
@@ -16,6 +21,10 @@ class FangameAudioSystem:
 class SonicFangameWorld:
     def __init__(self):
         self.app = Ursina()
+        asset_cache.install()
+        self.resolution = dynamic_resolution.install()  # scale 3D rendering to hold the frame rate
+        self.telemetry = telemetry.install(lambda: dict(rings=len(self.rings), enemies=len(self.enemies)),
+                                           path='hdr_telemetry.tlm')
         window.title = 'Sonic Fangame World Demo'
         window.borderless = False
         window.fullscreen = False
@@ -40,11 +49,15 @@ class SonicFangameWorld:
         camera.rotation_x = 30
 
         self._create_fangame_world()
+        self.badniks = BadnikScheduler()
+        for enemy in self.enemies:
+            self.badniks.add(enemy)
         self._setup_controls()
 
         self.input_buffer = deque(maxlen=10)
 
-        self.app.update = self._game_update
+        # Bind game loop (Ursina only ticks entities, so hang it on one)
+        self.game_loop = Entity(update=self._game_update)
 
     def _setup_controls(self):
         self.controls = {
@@ -74,31 +87,27 @@ class SonicFangameWorld:
         # Create player
         self.character = Entity(model='sphere', color=color.blue, scale=(0.8, 0.8, 0.8), position=(0, 3, 0), collider='sphere', shader=basic_lighting_shader)
         self.entities.append(self.character)
+        self.motion = Kinematics(self.character.position, self.character.rotation_y)
 
     def _game_update(self):
         dt = time.dt * self.time_scale
         if dt > 0.1: dt = 0.1
 
-        # Update character movement
-        move_input = Vec3(held_keys['d'] - held_keys['a'], 0, held_keys['w'] - held_keys['s']).normalized()
-
+        # Update character movement, on plain floats (fangame_kinematics.py)
+        m = self.motion
         cam_fwd = camera.forward
-        cam_fwd.y = 0
-        cam_fwd.normalize()
-        cam_right = camera.right
-        cam_right.y = 0
-        cam_right.normalize()
-
-        world_move_dir = (cam_fwd * move_input.z + cam_right * move_input.x).normalized()
-
-        if move_input.length() > 0:
-            self.character.rotation_y = lerp_angle(self.character.rotation_y, math.degrees(math.atan2(world_move_dir.x, world_move_dir.z)), dt * 10)
+        if m.steer(held_keys['d'], held_keys['a'], held_keys['w'], held_keys['s'], cam_fwd.x, cam_fwd.z):
+            m.load(self.character)
+            m.turn(dt * 10)
 
             speed = 10
             if held_keys['left shift']:
                 speed *= 2
 
-            self.character.position += world_move_dir * speed * dt
+            m.move(speed, dt)
+            m.store(self.character)
+
+        self.badniks.update(self.character.position, dt)
 
         # Update camera
         target_pos = self.character.world_position + Vec3(0, 2, 0)
@@ -117,6 +126,7 @@ class SonicFangameWorld:
         for enemy in self.enemies[:]:
             if self.character.intersects(enemy).hit:
                 self.enemies.remove(enemy)
+                self.badniks.remove(enemy)
                 destroy(enemy)
                 self.score += 10
                 self.audio.play('enemy_defeat', volume=0.5)
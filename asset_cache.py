@@ -0,0 +1,303 @@
+# asset_cache.py
+# Startup cache for the models and textures the demos load by name.
+#
+# Ursina finds 'sphere', 'cube', 'grass' and friends by globbing the asset
+# folders on every launch, then builds meshes by eval'ing .ursinamesh source
+# and decodes pngs. install() routes those loads through a cache folder:
+# the first run stores each asset as a Panda3D .bam / mipmapped .txo named by
+# the hash of its source file, later runs load that file directly. An index
+# remembers where each source lives so a warm start never globs; a source
+# whose size or mtime changed is re-hashed, and a new hash means a new entry.
+# Names a folder does not have are remembered too, and looked for again once
+# per launch, so a model added to the project later is picked up.
+#
+# A warm load returns what a cold one would: Ursina turns .ursinamesh and
+# .obj sources into Mesh objects, so for those the cache keeps the Mesh's
+# vertex lists in a pickle next to the .bam and rebuilds the Mesh around the
+# cached geometry, registered in mesh_importer.imported_meshes as before.
+#
+# Run this file to time process launch to first rendered frame per variant.
+
+import builtins
+import hashlib
+import json
+import os
+import pickle
+import sys
+import time
+from pathlib import Path
+
+CACHE_VERSION = 2
+MODEL_FILE_TYPES = ('.bam', '.ursinamesh', '.obj', '.glb', '.gltf', '.blend')
+TEXTURE_FILE_TYPES = ('.tif', '.jpg', '.jpeg', '.png', '.gif')
+PROBE_ENV = 'ASSET_CACHE_STARTUP_PROBE'
+
+
+def _hash_file(path, salt):
+    h = hashlib.blake2b(digest_size=10)
+    h.update(salt.encode('utf-8'))
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _find_source(name, folders, file_types):
+    for folder in folders:
+        folder = Path(folder)
+        for file_type in file_types:
+            for filename in folder.glob(f'**/{name}{file_type}'):
+                return filename.resolve()
+    return None
+
+
+class AssetCache:
+    def __init__(self, folder):
+        from panda3d.core import PandaSystem
+        self.folder = Path(folder)
+        self.folder.mkdir(parents=True, exist_ok=True)
+        self._index_path = self.folder / 'index.json'
+        self._salt = f'{CACHE_VERSION}/{PandaSystem.getVersionString()}'
+        self.hits = 0
+        self.misses = 0
+        self._still_missing = set()  # missing entries checked against the disk this launch
+        try:
+            with open(self._index_path) as f:
+                self.index = json.load(f)
+            if self.index.get('salt') != self._salt:
+                self.index = {}
+        except (OSError, ValueError):
+            self.index = {}
+        self.index['salt'] = self._salt
+        self.index.setdefault('entries', {})
+
+    def _save_index(self):
+        tmp = self._index_path.with_suffix('.tmp')
+        with open(tmp, 'w') as f:
+            json.dump(self.index, f, indent=1)
+        os.replace(tmp, self._index_path)
+
+    def _lookup(self, key):
+        """Cached file for key if its source is unchanged, else None"""
+        entry = self.index['entries'].get(key)
+        if not entry or entry.get('missing'):
+            return None
+        try:
+            st = os.stat(entry['source'])
+        except OSError:
+            return None
+        cached = self.folder / entry['file']
+        if (st.st_size, st.st_mtime_ns) != (entry['size'], entry['mtime']):
+            digest = _hash_file(entry['source'], self._salt)
+            if digest != entry['hash']:
+                return None
+            entry['size'], entry['mtime'] = st.st_size, st.st_mtime_ns
+            self._save_index()
+        if not cached.exists() or (entry.get('mesh') and not cached.with_suffix('.mesh').exists()):
+            return None
+        return cached
+
+    def _store(self, key, kind, source, write, **extra):
+        digest = _hash_file(source, self._salt)
+        name = Path(key.split('|')[-1]).name
+        file = f'{kind}/{name}-{digest}' + ('.bam' if kind == 'models' else '.txo')
+        (self.folder / kind).mkdir(exist_ok=True)
+        if write(self.folder / file):
+            st = os.stat(source)
+            self.index['entries'][key] = dict(source=str(source), hash=digest, file=file,
+                                              size=st.st_size, mtime=st.st_mtime_ns, **extra)
+            self._save_index()
+
+    # --- Models ---
+    def load_model(self, original, name, path, *args, **kwargs):
+        key = f'model|{path}|{name}'
+        entry = self.index['entries'].get(key)
+        if entry and entry.get('missing'):
+            if key in self._still_missing:
+                return None
+            if _find_source(name, (path,), MODEL_FILE_TYPES) is None:
+                self._still_missing.add(key)
+                return None
+            del self.index['entries'][key]  # added since, load it for real
+            self._save_index()
+        cached = self._lookup(key)
+        if cached:
+            self.hits += 1
+            if self.index['entries'][key].get('mesh'):
+                return self._load_mesh(cached, name, self.index['entries'][key]['source'])
+            return builtins.loader.loadModel(str(cached))
+
+        model = original(name, path, *args, **kwargs)
+        if model is None and '.' not in name:
+            self.index['entries'][key] = dict(missing=True)
+            self._save_index()
+        if model is None or '.' in name:
+            return model
+        source = _find_source(name, (path,), MODEL_FILE_TYPES)
+        if source:
+            from ursina.mesh import Mesh
+            self.misses += 1
+            if isinstance(model, Mesh):
+                self._store(key, 'models', source, lambda target: self._write_mesh(model, target), mesh=True)
+            else:
+                self._store(key, 'models', source, lambda target: model.writeBamFile(str(target)))
+        return model
+
+    _MESH_FIELDS = ('vertices', 'triangles', 'colors', 'uvs', 'normals', 'static', 'mode', 'thickness',
+                    'render_points_in_3d')
+
+    def _write_mesh(self, mesh, target):
+        """The Mesh's geometry as .bam and its vertex lists as a pickle beside it"""
+        recipe = {field: getattr(mesh, field) for field in self._MESH_FIELDS}
+        with open(target.with_suffix('.mesh'), 'wb') as f:
+            pickle.dump(recipe, f, protocol=pickle.HIGHEST_PROTOCOL)
+        from panda3d.core import NodePath
+        return NodePath(mesh.geomNode).writeBamFile(str(target)) if hasattr(mesh, 'geomNode') else False
+
+    def _load_mesh(self, cached, name, source):
+        """Rebuild the Mesh a cold load makes, around the cached geometry instead of generating it"""
+        from ursina import mesh_importer
+        from ursina.mesh import Mesh
+        with open(cached.with_suffix('.mesh'), 'rb') as f:
+            recipe = pickle.load(f)
+        mesh = Mesh()  # no vertices yet, so nothing is generated
+        for field, value in recipe.items():
+            setattr(mesh, field, value)
+        geom = builtins.loader.loadModel(str(cached))  # the Mesh's own GeomNode, as _write_mesh saved it
+        mesh.geomNode = geom.node()
+        geom.reparentTo(mesh)
+        mesh.path = Path(source)
+        mesh.name = name
+        mesh_importer.imported_meshes[name] = mesh
+        return mesh
+
+    # --- Textures ---
+    def load_texture(self, original, name, path=None, *args, **kwargs):
+        from ursina import texture_importer
+        from ursina.texture import Texture
+        if path is not None or not isinstance(name, str):
+            return original(name, path, *args, **kwargs)
+
+        key = f'texture|{name}'
+        cached = self._lookup(key)
+        if cached:
+            self.hits += 1
+            if name not in texture_importer.imported_textures:
+                t = Texture(builtins.loader.loadTexture(str(cached)))
+                t.path = Path(self.index['entries'][key]['source'])
+                t._cached_image = None
+                texture_importer.imported_textures[name] = t
+            return original(name, path, *args, **kwargs)
+
+        t = original(name, path, *args, **kwargs)
+        source = getattr(t, 'path', None)
+        if t is None or source is None or Path(source).suffix not in TEXTURE_FILE_TYPES:
+            return t
+        self.misses += 1
+
+        def write(target):
+            from panda3d.core import Filename, SamplerState
+            tex = builtins.loader.loadTexture(Filename.fromOsSpecific(str(source))).makeCopy()
+            tex.setMinfilter(SamplerState.FT_linear_mipmap_linear)
+            tex.generateRamMipmapImages()
+            return tex.write(Filename.fromOsSpecific(str(target)))
+
+        self._store(key, 'textures', Path(source), write)
+        return t
+
+
+_cache = None
+
+
+def install(folder=None):
+    """Route Ursina's model and texture loading through the cache. Safe to call more than once"""
+    global _cache
+    if os.environ.get(PROBE_ENV):
+        _install_startup_probe()
+    if _cache is not None:
+        return _cache
+
+    from ursina import application, entity, mesh_importer, texture_importer
+    folder = folder or os.environ.get('ASSET_CACHE_DIR') or application.asset_folder / 'asset_cache'
+    _cache = AssetCache(folder)
+    original_model = mesh_importer.load_model
+    original_texture = texture_importer.load_texture
+
+    def load_model(name, path=None, *args, **kwargs):
+        if path is None:
+            path = application.asset_folder
+        # meshes Ursina already holds in memory are copied without touching disk
+        if not isinstance(name, str) or name in mesh_importer.imported_meshes:
+            return original_model(name, path, *args, **kwargs)
+        return _cache.load_model(original_model, name, path, *args, **kwargs)
+
+    def load_texture(name, path=None, *args, **kwargs):
+        return _cache.load_texture(original_texture, name, path, *args, **kwargs)
+
+    # Entity binds these names at import time, so patch them where they are looked up
+    entity.load_model = load_model
+    entity.load_texture = load_texture
+    return _cache
+
+
+_probe_installed = False
+
+
+def _install_startup_probe():
+    """Print the wall clock once the first frame is rendered, then exit"""
+    global _probe_installed
+    if _probe_installed:
+        return
+    _probe_installed = True
+    from direct.task.TaskManagerGlobal import taskMgr
+
+    def report(task):
+        # sort 60 runs after igLoop (50), so this frame has been drawn
+        print(f'first-frame {time.time():.6f}', flush=True)
+        os._exit(0)
+
+    taskMgr.add(report, 'asset-cache-startup-probe', sort=60)
+
+
+VARIANTS = [
+    'Sonic4k-4.20.25$1.0.py',
+    'Sonic4k4.20.2510:02PMPST.py',
+    'SonicCD1.0a.py',
+    'TeamFlamesEZSonicengine4k.py',
+    'TeamFlamesHDRSonik4k.py',
+    'deepseek_ai_sonic.a.py',
+    'enginedeepseek+4.1.py',
+    'robo2d.py',
+]
+
+
+def _time_launch(script, env, timeout=120):
+    import subprocess
+    start = time.time()
+    try:
+        proc = subprocess.run([sys.executable, script], env=env, capture_output=True, text=True, timeout=timeout,
+                              cwd=Path(script).parent)
+    except subprocess.TimeoutExpired:
+        return None  # hung before its first frame, reported like one that never drew it
+    for line in proc.stdout.splitlines():
+        if line.startswith('first-frame '):
+            return float(line.split()[1]) - start
+    return None
+
+
+def benchmark(variants=VARIANTS, runs=3):
+    import tempfile
+    here = Path(__file__).resolve().parent
+    print(f"{'variant':<32} {'cold s':>8} {'warm s':>8}")
+    for variant in variants:
+        with tempfile.TemporaryDirectory() as tmp:
+            env = dict(os.environ, ASSET_CACHE_DIR=tmp, **{PROBE_ENV: '1'})
+            cold = _time_launch(here / variant, env)
+            warm = [_time_launch(here / variant, env) for _ in range(runs)]
+        warm = [w for w in warm if w is not None]
+        fmt = lambda t: f'{t:8.3f}' if t is not None else '     n/a'
+        print(f'{variant:<32} {fmt(cold)} {fmt(min(warm) if warm else None)}')
+
+
+if __name__ == '__main__':
+    benchmark(sys.argv[1:] or VARIANTS)
@@ -0,0 +1,248 @@
+# badnik_ai.py
+# Patrolling / chasing badniks, ticked by a time-sliced scheduler.
+#
+# A Badnik circles its home point, chases the player once they come within
+# aggro range, and walks back home when the player escapes or it strays past
+# its leash. Its state lives in plain floats and only the final position is
+# pushed to the entity (setPos) when it ticks.
+#
+# BadnikScheduler decides who ticks. Badniks near the player tick every
+# frame. Further out they tick every mid_interval or far_interval frames
+# with the time that has passed since their last tick, and beyond `far`
+# they freeze: no behaviour, just a distance check now and then to see
+# whether they should wake up. Due badniks wait in a queue fed from a
+# frame-indexed wheel and are worked off in order until the per-frame time
+# budget runs out; whatever is left goes first next frame, so the load is
+# spread round-robin instead of spiking. Set budget to None for
+# deterministic runs (replays), which ticks everything that is due.
+#
+# Run this file for a 5000 badnik stress benchmark.
+
+import math
+import time
+from collections import deque
+
+PATROL = 'patrol'
+CHASE = 'chase'
+RETURN = 'return'
+FROZEN = 'frozen'
+
+NEAR, MID, FAR, FROZEN_BAND = range(4)
+
+
+class Badnik:
+    __slots__ = ('entity', 'x', 'y', 'z', 'home_x', 'home_z', 'patrol_radius', 'speed', 'chase_speed',
+                 'aggro_radius', 'leash_radius', 'angle', 'state', 'last_tick', 'band', 'next_frame', 'removed')
+
+    def __init__(self, entity, position, patrol_radius=3.0, speed=2.0, chase_speed=6.0,
+                 aggro_radius=12.0, leash_radius=25.0, angle=0.0):
+        self.entity = entity
+        self.x, self.y, self.z = position
+        self.home_x = self.x
+        self.home_z = self.z
+        self.patrol_radius = patrol_radius
+        self.speed = speed
+        self.chase_speed = chase_speed
+        self.aggro_radius = aggro_radius
+        self.leash_radius = leash_radius
+        self.angle = angle
+        self.state = PATROL
+        self.last_tick = 0.0
+        self.band = NEAR
+        self.next_frame = 0
+        self.removed = False
+
+    def _move_towards(self, tx, tz, step):
+        dx = tx - self.x
+        dz = tz - self.z
+        d = math.sqrt(dx * dx + dz * dz)
+        if d <= step:
+            self.x = tx
+            self.z = tz
+            return True
+        self.x += dx / d * step
+        self.z += dz / d * step
+        return False
+
+    def tick(self, elapsed, px, pz):
+        dx = px - self.x
+        dz = pz - self.z
+        player_sq = dx * dx + dz * dz
+        state = self.state
+
+        if state == CHASE:
+            hx = self.x - self.home_x
+            hz = self.z - self.home_z
+            escape = self.aggro_radius * 1.5
+            if player_sq > escape * escape or hx * hx + hz * hz > self.leash_radius * self.leash_radius:
+                self.state = RETURN
+            else:
+                self._move_towards(px, pz, self.chase_speed * elapsed)
+        elif player_sq < self.aggro_radius * self.aggro_radius:
+            self.state = CHASE
+        elif state == RETURN:
+            tx = self.home_x + math.cos(self.angle) * self.patrol_radius
+            tz = self.home_z + math.sin(self.angle) * self.patrol_radius
+            if self._move_towards(tx, tz, self.speed * elapsed):
+                self.state = PATROL
+        else:
+            self.state = PATROL
+            self.angle += self.speed / self.patrol_radius * elapsed
+            self.x = self.home_x + math.cos(self.angle) * self.patrol_radius
+            self.z = self.home_z + math.sin(self.angle) * self.patrol_radius
+
+        if self.entity is not None:
+            self.entity.setPos(self.x, self.y, self.z)
+        return player_sq
+
+
+class BadnikScheduler:
+    def __init__(self, budget=0.001, near=25.0, mid=60.0, far=120.0,
+                 mid_interval=4, far_interval=15, frozen_interval=60, max_elapsed=0.5):
+        self.budget = budget
+        self.near = near
+        self.mid = mid
+        self.far = far
+        self.mid_interval = mid_interval
+        self.far_interval = far_interval
+        self.frozen_interval = frozen_interval
+        self.max_elapsed = max_elapsed
+
+        self.frame = 0
+        self.time = 0.0
+        self.badniks = {}
+        self._near = []
+        self._due = deque()
+        self._wheel = {}
+        self.ticked = 0
+        self.deferred = 0
+
+    def add(self, entity, **behaviour):
+        """Start running behaviour for entity. Returns its Badnik"""
+        position = tuple(entity.getPos()) if entity is not None else behaviour.pop('position')
+        b = Badnik(entity, position, **behaviour)
+        b.last_tick = self.time
+        b.next_frame = self.frame + 1
+        self.badniks[id(b) if entity is None else id(entity)] = b
+        self._due.append(b)
+        return b
+
+    def remove(self, entity):
+        b = self.badniks.pop(id(entity), None)
+        if b is not None:
+            b.removed = True
+
+    def _place(self, b, player_sq):
+        if player_sq < self.near * self.near:
+            b.band = NEAR
+            b.next_frame = self.frame + 1
+            self._near.append(b)
+            return
+        if player_sq < self.mid * self.mid:
+            b.band, interval = MID, self.mid_interval
+        elif player_sq < self.far * self.far:
+            b.band, interval = FAR, self.far_interval
+        else:
+            b.band, interval = FROZEN_BAND, self.frozen_interval
+        b.next_frame = self.frame + interval
+        self._wheel.setdefault(b.next_frame, []).append(b)
+
+    def reschedule(self):
+        """Rebuild the queues from each badnik's band and next_frame, after frame and the badniks were
+        written back (a rewind)"""
+        self._near = []
+        self._due = deque()
+        self._wheel = {}
+        for b in self.badniks.values():
+            if b.next_frame <= self.frame:
+                self._due.append(b)  # was deferred by the budget
+            elif b.band == NEAR and b.next_frame == self.frame + 1:
+                self._near.append(b)
+            else:
+                self._wheel.setdefault(b.next_frame, []).append(b)
+
+    def _run(self, b, px, pz):
+        if b.band == FROZEN_BAND:
+            # frozen badniks only check whether the player came back; their clock stands still
+            b.last_tick = self.time
+            dx = px - b.x
+            dz = pz - b.z
+            return dx * dx + dz * dz
+        elapsed = min(self.time - b.last_tick, self.max_elapsed)
+        b.last_tick = self.time
+        return b.tick(elapsed, px, pz)
+
+    def update(self, player_position, dt):
+        self.frame += 1
+        self.time += dt
+        px = player_position[0]
+        pz = player_position[2]
+        budget = self.budget
+        start = time.perf_counter()
+        ticked = 0
+
+        near, self._near = self._near, []
+        for b in near:
+            if not b.removed:
+                self._place(b, self._run(b, px, pz))
+                ticked += 1
+
+        due = self._due
+        bucket = self._wheel.pop(self.frame, None)
+        if bucket:
+            due.extend(bucket)
+        while due:
+            if budget is not None and not ticked & 15 and time.perf_counter() - start > budget:
+                break
+            b = due.popleft()
+            if b.removed:
+                continue
+            self._place(b, self._run(b, px, pz))
+            ticked += 1
+
+        self.ticked = ticked
+        self.deferred = len(due)
+        return ticked
+
+    def stats(self):
+        bands = [0, 0, 0, 0]
+        for b in self.badniks.values():
+            bands[b.band] += 1
+        return dict(near=bands[NEAR], mid=bands[MID], far=bands[FAR], frozen=bands[FROZEN_BAND],
+                    ticked=self.ticked, deferred=self.deferred)
+
+
+def benchmark(count=5000, frames=600, area=800.0, seed=1):
+    import random
+    from ursina import Entity, Ursina
+    Ursina(window_type='none')
+    rng = random.Random(seed)
+    entities = [Entity(position=(rng.uniform(-area / 2, area / 2), 0.5, rng.uniform(-area / 2, area / 2)))
+                for _ in range(count)]
+
+    def run(name, scheduler):
+        for e in entities:
+            scheduler.add(e, angle=rng.uniform(0, math.tau))
+        times = []
+        ticks = 0
+        for f in range(frames):
+            a = f / frames * math.tau
+            player = (math.cos(a) * area / 4, 0, math.sin(a) * area / 4)
+            start = time.perf_counter()
+            ticks += scheduler.update(player, 1 / 60)
+            times.append(time.perf_counter() - start)
+        times.sort()
+        mean = sum(times) / len(times)
+        print(f'{name:<12} {mean * 1000:8.3f} {times[int(len(times) * 0.99)] * 1000:8.3f} {times[-1] * 1000:8.3f} '
+              f'{ticks / frames:10.0f}')
+
+    print(f'{count} badniks, {frames} frames')
+    print(f"{'scheduler':<12} {'mean ms':>8} {'p99 ms':>8} {'max ms':>8} {'ticks/frm':>10}")
+    run('every frame', BadnikScheduler(budget=None, near=math.inf))
+    run('banded', BadnikScheduler(budget=None))
+    run('banded+1ms', BadnikScheduler(budget=0.001))
+
+
+if __name__ == '__main__':
+    import sys
+    benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 5000)
@@ -3,10 +3,17 @@ from ursina.shaders import basic_lighting_shader
 import random
 import math
 from collections import deque
+import asset_cache
+from effects_budget import EffectsBudget
+from threaded_sim import ThreadedSimulation
+from fixed_step import FixedStep
+import telemetry
 
 class SonicVolumeDeepseekEngine:
-    def __init__(self):
+    def __init__(self, threaded=False, tick_rate=60):
         self.app = Ursina()
+        asset_cache.install()
+        self.telemetry = telemetry.install(self._telemetry_counts, path='deepseek_telemetry.tlm')
         window.color = color.black  # Fixed: Access window directly from ursina module
         self.entities = []
         self.particle_systems = []
@@ -20,6 +27,18 @@ class SonicVolumeDeepseekEngine:
         self.collision_precision = 0.1
         self.max_physics_steps = 5
         
+        # Gameplay runs in fixed ticks whatever the frame rate; SonicEntity reads this clock
+        self.clock = FixedStep(tick_rate, max_steps=self.max_physics_steps)
+        SonicEntity.clock = self.clock
+
+        # Particle counts shrink when frames run long and grow back with headroom
+        self.effects = EffectsBudget(target_fps=60)
+        self.effects.register('particles', cap=self.max_particles, floor=0.2)
+        
+        # Optionally integrate entity motion and particles on a worker thread
+        self.sim = ThreadedSimulation().start() if threaded else None
+        self._sim_entities = {}
+        
         # Set up default camera
         self.camera_rig = Entity()
         camera.parent = self.camera_rig  # Fixed: Access camera directly
@@ -52,30 +71,44 @@ class SonicVolumeDeepseekEngine:
         """Create a new game entity with default components"""
         entity = SonicEntity(**kwargs)
         self.entities.append(entity)
+        if self.sim and not entity.static:
+            self._sim_entities[id(entity)] = entity
+            entity.attach_sim(self.sim)
         return entity
     
     def create_particle_system(self, position, count=50, **kwargs):
-        """Create a particle emitter"""
+        """Create a particle emitter, sized by the effects budget"""
         if len(self.particle_systems) < self.max_particles:
+            count = self.effects.allow('particles', round(count * self.effects.scale('particles')))
+            if not count:
+                return None
             system = ParticleSystem(position, count, **kwargs)
             self.particle_systems.append(system)
+            if self.sim:
+                self.sim.submit(self.sim.world.add_particles, system)
             return system
         return None
     
     def update(self):
         """Main engine update loop"""
         dt = time.dt * self.time_scale
+        self.effects.tick(time.dt)
         
-        # Process physics in fixed steps
-        physics_steps = min(int(dt / (1/60)) + 1, self.max_physics_steps)
-        for _ in range(physics_steps):
-            self.physics.update(dt / physics_steps)
+        # Process physics in fixed ticks; entities run the same number of ticks in their own update
+        for _ in range(self.clock.advance(dt)):
+            self.physics.update(self.clock.dt)
+            
+        # Moving bodies wake the sleeping ones they touch
+        self._wake_contacts()
             
         # Update particles
-        for system in self.particle_systems[:]:
-            system.update(dt)
-            if system.dead:
-                self.particle_systems.remove(system)
+        if self.sim:
+            self._sync_sim()
+        else:
+            for system in self.particle_systems[:]:
+                system.update(dt)
+                if system.dead:
+                    self.particle_systems.remove(system)
                 
         # Process input buffer
         self._process_input_buffer()
@@ -84,6 +117,45 @@ class SonicVolumeDeepseekEngine:
         if self.debug_mode:
             self._render_debug()
     
+    def _sync_sim(self):
+        """Apply the worker thread's latest transforms and handle its events"""
+        buffer, events = self.sim.sync()
+        if buffer:
+            for key, (x, y, z, vx, vy, vz) in buffer.items():
+                entity = self._sim_entities.get(key)
+                if entity is not None and not entity.isEmpty():
+                    entity.position = (x, y, z)
+                    entity.velocity = Vec3(vx, vy, vz)
+        for kind, obj in events:
+            if kind == 'particles_done' and obj in self.particle_systems:
+                self.particle_systems.remove(obj)
+    
+    def _wake_contacts(self):
+        """Wake sleeping bodies that an awake, moving body is touching"""
+        for entity in self.entities:
+            if entity.sleeping or entity.isEmpty() or not entity.collider:
+                continue
+            if entity.velocity.length_squared() < SonicEntity.sleep_speed ** 2:
+                continue
+            hit = entity.intersects()
+            for other in hit.entities if hit.hit else ():
+                if isinstance(other, SonicEntity) and other.sleeping and not other.static:
+                    other.wake()
+    
+    def wake_all(self):
+        """Wake every sleeping entity"""
+        for entity in self.entities:
+            if not entity.isEmpty():
+                entity.wake()
+    
+    @property
+    def awake_count(self):
+        return sum(1 for e in self.entities if not e.isEmpty() and not e.sleeping)
+    
+    @property
+    def asleep_count(self):
+        return sum(1 for e in self.entities if not e.isEmpty() and e.sleeping)
+    
     def _process_input_buffer(self):
         """Process buffered inputs"""
         while self.input_buffer:
@@ -97,6 +169,12 @@ class SonicVolumeDeepseekEngine:
             if hasattr(entity, 'collider') and entity.collider:
                 entity.collider.debug = True
     
+    def _telemetry_counts(self):
+        """Per-frame counts for the telemetry ring buffer"""
+        return dict(entities=len(self.entities), particles=sum(len(s.particles) for s in self.particle_systems),
+                    pool_used=len(self.particle_systems), pool_size=self.max_particles,
+                    voices=telemetry.playing_voices(self.audio_system.sounds.values()))
+
     def run(self):
         """Start the engine"""
         self.app.run()
@@ -110,7 +188,14 @@ class SonicVolumeDeepseekEngine:
         self.audio_system.play(sound_name, volume, pitch)
 
 class SonicEntity(Entity):
-    def __init__(self, **kwargs):
+    # Bodies slower than this for sleep_ticks ticks stop ticking until woken
+    sleep_speed = 0.05
+    sleep_ticks = 30
+    # Fixed-step clock shared by all entities, advanced once per frame by the engine
+    # before Ursina runs entity updates. None ticks once per frame on time.dt
+    clock = None
+    
+    def __init__(self, static=False, **kwargs):
         super().__init__(**kwargs)
         self.velocity = Vec3(0, 0, 0)
         self.acceleration = Vec3(0, 0, 0)
@@ -132,11 +217,106 @@ class SonicEntity(Entity):
         self.spin_dash_charged = 0
         self.boost_energy = 100
         
+        self.sim = None
+        
+        # Sleeping bodies are skipped by Ursina's update loop (ignore=True).
+        # Static ones (ground, walls) rest on nothing, so they never fall and start asleep.
+        self.static = static
+        self.sleeping = False
+        self._still_ticks = 0
+        # Transforms after the last two ticks; the entity is drawn blended between them
+        self._pose = self._last_pose = (*self.getPos(), *self.getHpr())
+        if static:
+            self.grounded = True
+            self.sleep()
+        
+    def attach_sim(self, sim):
+        """Let a ThreadedSimulation integrate this entity's motion from now on"""
+        self.sim = sim
+        sim.submit(sim.world.add_body, id(self), position=tuple(self.position),
+                   velocity=tuple(self.velocity), acceleration=tuple(self.acceleration),
+                   gravity=self.gravity / sim.dt, friction=self.friction,
+                   max_speed=self.max_speed, grounded=self.grounded)
+        
+    def _push_motion(self):
+        """Hand velocity changes made here over to the simulation thread"""
+        if self.sim:
+            self.sim.submit(self.sim.world.set_velocity, id(self), tuple(self.velocity))
+            self.sim.submit(self.sim.world.set_grounded, id(self), self.grounded)
+        
+    def snap(self):
+        """Take the current transform as the simulated one; call after moving the entity by hand"""
+        self._pose = self._last_pose = (*self.getPos(), *self.getHpr())
+        
+    def sleep(self):
+        """Stop ticking until woken"""
+        if self.clock is not None and not self.sim:
+            self.setPosHpr(*self._pose)  # rest where it was simulated, not mid-blend
+        self.sleeping = True
+        self.ignore = True
+        self.velocity = Vec3(0, 0, 0)
+        self._still_ticks = 0
+        self._push_motion()
+        
+    def wake(self):
+        """Resume ticking"""
+        self.sleeping = False
+        self.ignore = False
+        self._still_ticks = 0
+        self._push_motion()
+        
+    def apply_impulse(self, impulse):
+        """Add to the velocity and wake up"""
+        self.velocity += impulse
+        self.wake()
+        
     def update(self):
+        """Run this frame's ticks and show the entity between its last two"""
+        clock = self.clock
+        if clock is None:
+            self.tick(time.dt)
+            return
+        if self.sim:
+            # the simulation thread moves it, there is nothing to blend
+            for _ in range(clock.steps):
+                self.tick(clock.dt)
+            return
+        self.setPosHpr(*self._pose)
+        for _ in range(clock.steps):
+            self.tick(clock.dt)
+            self._last_pose = self._pose
+            self._pose = (*self.getPos(), *self.getHpr())
+            if self.sleeping:
+                return
+        t = clock.alpha
+        x0, y0, z0, h0, p0, r0 = self._last_pose
+        x1, y1, z1, h1, p1, r1 = self._pose
+        self.setPosHpr(x0 + (x1 - x0) * t, y0 + (y1 - y0) * t, z0 + (z1 - z0) * t,
+                       lerp_angle(h0, h1, t), lerp_angle(p0, p1, t), lerp_angle(r0, r1, t))
+        
+    def tick(self, dt):
         """Entity-specific update logic"""
-        dt = time.dt
+        # Apply physics (the simulation thread does this for attached entities)
+        if not self.sim:
+            self._integrate(dt)
+            
+        # Update invincibility
+        if self.invincible:
+            self.invincibility_time -= dt
+            if self.invincibility_time <= 0:
+                self.invincible = False
         
-        # Apply physics
+        # Fall asleep after resting for a while
+        limit = self.sleep_speed ** 2
+        if (self.velocity.length_squared() < limit and self.acceleration.length_squared() < limit
+                and not self.invincible):
+            self._still_ticks += 1
+            if self._still_ticks >= self.sleep_ticks:
+                self.sleep()
+        else:
+            self._still_ticks = 0
+                
+    def _integrate(self, dt):
         self.velocity += self.acceleration * dt
         self.velocity.x *= self.friction
         self.velocity.z *= self.friction
@@ -153,21 +333,17 @@ class SonicEntity(Entity):
             self.velocity.y -= self.gravity
         else:
             self.velocity.y = 0
-            
-        # Update invincibility
-        if self.invincible:
-            self.invincibility_time -= dt
-            if self.invincibility_time <= 0:
-                self.invincible = False
                 
     def jump(self):
         if self.grounded:
             self.velocity.y = self.jump_power
             self.grounded = False
+            self.wake()
             
     def dash(self, direction):
         if self.can_dash and self.boost_energy >= 10:
             self.velocity = direction.normalized() * self.dash_power
+            self.wake()
             self.boost_energy -= 10
             self.can_dash = False
             invoke(setattr, self, 'can_dash', True, delay=self.dash_cooldown)
@@ -176,6 +352,7 @@ class SonicEntity(Entity):
         if self.homing_attack_ready and target:
             direction = (target.position - self.position).normalized()
             self.velocity = direction * self.dash_power * 1.5
+            self.wake()
             self.homing_attack_ready = False
             invoke(setattr, self, 'homing_attack_ready', True, delay=0.5)
             
@@ -185,6 +362,7 @@ class SonicEntity(Entity):
     def release_spin_dash(self):
         power = self.spin_dash_charged / 10
         self.velocity = self.forward * power
+        self.wake()
         self.spin_dash_charged = 0
         
     def take_damage(self, amount):
@@ -195,11 +373,14 @@ class SonicEntity(Entity):
             else:
                 self.invincible = True
                 self.invincibility_time = 2.0
+                self.wake()
                 # Flash effect
                 self.blink(color.red, duration=0.1, loop=5)
                 
     def die(self):
         """Handle entity death"""
+        if self.sim:
+            self.sim.submit(self.sim.world.remove_body, id(self))
         destroy(self)
         
     def collect_ring(self, amount=1):
@@ -321,7 +502,8 @@ class AudioSystem:
 
 # Example usage
 if __name__ == "__main__":
-    engine = SonicVolumeDeepseekEngine()
+    import sys
+    engine = SonicVolumeDeepseekEngine(threaded='--threaded' in sys.argv)
     
     # Create a player entity
     player = engine.create_entity(
@@ -338,7 +520,8 @@ if __name__ == "__main__":
         scale=(50,1,50),
         texture='grass',
         collider='box',
-        position=(0,0,0)
+        position=(0,0,0),
+        static=True
     )
     
     # Add some obstacles
@@ -348,11 +531,13 @@ if __name__ == "__main__":
             position=(random.uniform(-20,20), 0.5, random.uniform(-20,20)),
             scale=(2,2,2),
             texture='brick',
-            collider='box'
+            collider='box',
+            static=True
         )
     
     # Camera follow
     def update():
+        engine.update()
         engine.camera_rig.position = lerp(
             engine.camera_rig.position,
             (player.x, player.y + 5, player.z),
@@ -0,0 +1,186 @@
+# dynamic_resolution.py
+# Render the 3D scene at a variable resolution and upscale it to the window.
+#
+# install() moves the main camera into an offscreen buffer the size of the
+# window and draws only the lower-left `scale` part of it. The window's own
+# 3D display region then shows that part stretched over the whole window
+# with linear filtering, and Ursina's UI display region (sort 20) is drawn
+# on top at native resolution, so Text, buttons and the fps counter stay
+# sharp.
+#
+# ResolutionGovernor picks the scale. It keeps rolling averages of the frame
+# time and of the time spent in the render/flip task (the closest thing to
+# GPU time available from Python; with vsync on it also includes the wait),
+# lowers the pixel count in proportion to how far the worse of the two is
+# over budget, and raises it again in small steps after a run of frames with
+# headroom. Scale, timings and controller state are published as PStats
+# levels under "Dynamic resolution" and returned by stats().
+
+import math
+import time
+
+STEADY = 'steady'
+LOWERING = 'lowering'
+RAISING = 'raising'
+
+
+class ResolutionGovernor:
+    """Turns frame and render times into a resolution scale"""
+    def __init__(self, target_fps=60, min_scale=0.5, max_scale=1.0, step=0.05,
+                 smoothing=0.1, headroom=0.8, raise_after=30, cooldown=10):
+        self.budget = 1.0 / target_fps
+        self.min_scale = min_scale
+        self.max_scale = max_scale
+        self.step = step
+        self.smoothing = smoothing
+        self.headroom = headroom
+        self.raise_after = raise_after
+        self.cooldown = cooldown
+
+        self.scale = max_scale
+        self.state = STEADY
+        self.frame_time = self.budget
+        self.gpu_time = 0.0
+        self._calm_frames = 0
+        self._hold = 0
+
+    def _quantize(self, scale):
+        scale = round(round(scale / self.step) * self.step, 6)
+        return min(self.max_scale, max(self.min_scale, scale))
+
+    def update(self, frame_time, gpu_time):
+        """Feed one frame's timings. Returns the scale to render the next frame at"""
+        a = self.smoothing
+        self.frame_time += (frame_time - self.frame_time) * a
+        self.gpu_time += (gpu_time - self.gpu_time) * a
+        if self._hold:
+            # give the last change a few frames to show up in the averages
+            self._hold -= 1
+            return self.scale
+
+        cost = max(self.frame_time, self.gpu_time)
+        if cost > self.budget and self.scale > self.min_scale:
+            # pixel count scales with scale^2, so take the square root of the overshoot
+            target = self._quantize(self.scale * math.sqrt(self.budget * self.headroom / cost))
+            self.scale = min(target, self._quantize(self.scale - self.step))
+            self.state = LOWERING
+            self._calm_frames = 0
+            self._hold = self.cooldown
+        elif cost < self.budget * self.headroom and self.scale < self.max_scale:
+            self._calm_frames += 1
+            self.state = RAISING
+            if self._calm_frames >= self.raise_after:
+                self.scale = self._quantize(self.scale + self.step)
+                self._calm_frames = 0
+                self._hold = self.cooldown
+        else:
+            self._calm_frames = 0
+            self.state = STEADY
+        return self.scale
+
+    def stats(self):
+        return dict(scale=self.scale, state=self.state, budget_ms=self.budget * 1000,
+                    frame_ms=self.frame_time * 1000, gpu_ms=self.gpu_time * 1000)
+
+
+class DynamicResolution:
+    """Offscreen scene buffer plus the card that upscales it to the window"""
+    def __init__(self, governor=None, **governor_kwargs):
+        from panda3d.core import (Camera, CardMaker, NodePath, OrthographicLens, PStatCollector,
+                                  SamplerState, Texture, TextureStage)
+        from ursina import application, camera
+
+        self.base = application.base
+        self.governor = governor or ResolutionGovernor(**governor_kwargs)
+        self._texture_stage = TextureStage.getDefault()
+        self._collectors = {key: PStatCollector(f'Dynamic resolution:{key}')
+                            for key in ('Scale', 'Budget ms', 'Frame ms', 'GPU ms', 'Lowering', 'Raising')}
+
+        self.texture = Texture('dynamic_resolution')
+        self.texture.setMinfilter(SamplerState.FT_linear)
+        self.texture.setMagfilter(SamplerState.FT_linear)
+        self.buffer = None
+        self.scene_region = None
+        self._make_buffer()
+
+        # the window's 3D region now just shows the buffer on a fullscreen card
+        self.present_root = NodePath('dynamic_resolution_present')
+        self.present_root.setDepthTest(False)
+        self.present_root.setDepthWrite(False)
+        lens = OrthographicLens()
+        lens.setFilmSize(2, 2)
+        lens.setNearFar(-1, 1)
+        present_camera = self.present_root.attachNewNode(Camera('dynamic_resolution_camera', lens))
+        cm = CardMaker('dynamic_resolution_card')
+        cm.setFrame(-1, 1, -1, 1)
+        self.card = self.present_root.attachNewNode(cm.generate())
+        self.card.setTexture(self.texture)
+        self.window_region = camera.display_region
+        self.window_region.setCamera(present_camera)
+
+        self.scale = None
+        self._apply_scale(self.governor.scale)
+        self._render_start = None
+        self.base.taskMgr.add(self._before_render, 'dynamic-resolution-mark', sort=49)
+        self.base.taskMgr.add(self._after_render, 'dynamic-resolution-govern', sort=51)
+
+    def _make_buffer(self):
+        win = self.base.win
+        self._size = (win.getXSize(), win.getYSize())
+        if self.buffer is not None:
+            self.base.graphicsEngine.removeWindow(self.buffer)
+        self.buffer = win.makeTextureBuffer('dynamic_resolution', *self._size, self.texture)
+        self.buffer.setSort(-100)
+        self.buffer.setClearColor(win.getClearColor())
+        self.buffer.setClearColorActive(True)
+        self.scene_region = self.buffer.makeDisplayRegion()
+        self.scene_region.setCamera(self.base.cam)
+        self.scale = None
+
+    def _apply_scale(self, scale):
+        if scale == self.scale:
+            return
+        self.scale = scale
+        self.scene_region.setDimensions(0, scale, 0, scale)
+        # the buffer texture can be padded, so only sample the part that holds the image
+        u = self.texture.getTexScale()
+        self.card.setTexScale(self._texture_stage, scale * u.x, scale * u.y)
+
+    def _before_render(self, task):
+        self._render_start = time.perf_counter()
+        return task.cont
+
+    def _after_render(self, task):
+        win = self.base.win
+        if (win.getXSize(), win.getYSize()) != self._size:
+            self._make_buffer()
+        self.buffer.setClearColor(win.getClearColor())
+
+        gpu_time = time.perf_counter() - self._render_start if self._render_start else 0.0
+        frame_time = self.base.clock.getDt()
+        self._apply_scale(self.governor.update(frame_time, gpu_time))
+
+        g = self.governor
+        self._collectors['Scale'].setLevel(g.scale * 100)
+        self._collectors['Budget ms'].setLevel(g.budget * 1000)
+        self._collectors['Frame ms'].setLevel(g.frame_time * 1000)
+        self._collectors['GPU ms'].setLevel(g.gpu_time * 1000)
+        self._collectors['Lowering'].setLevel(float(g.state == LOWERING))
+        self._collectors['Raising'].setLevel(float(g.state == RAISING))
+        return task.cont
+
+    def stats(self):
+        stats = self.governor.stats()
+        stats['width'] = int(self._size[0] * self.scale)
+        stats['height'] = int(self._size[1] * self.scale)
+        return stats
+
+
+def install(**governor_kwargs):
+    """Turn on dynamic resolution for the open window. Returns None when there is no window"""
+    from panda3d.core import GraphicsWindow
+    from ursina import application
+    win = getattr(application.base, 'win', None)
+    if not isinstance(win, GraphicsWindow):
+        return None
+    return DynamicResolution(**governor_kwargs)
@@ -0,0 +1,99 @@
+# effects_budget.py
+# Hand out per-frame spawn allowances to visual effects based on frame time.
+#
+# Each effect source is registered with a per-frame cap and a floor, in the
+# order it should be cut back: the first source is degraded all the way to
+# its floor before the next one is touched. tick(frame_time) runs once per
+# frame; while the smoothed frame time is over budget it lowers the quality
+# of the first source that still has room, one step per cooldown, and after
+# a run of frames with headroom it restores quality in the reverse order.
+#
+# A source's quality turns into credit every frame: quality * cap, kept up to
+# the larger of that and 1, so bursts shrink with quality too and a cap of 1
+# at quality 0.5 allows a spawn every other frame.
+# allow(name, wanted) spends that credit and returns how many may be spawned
+# now; scale(name) is the raw quality for effects that size themselves.
+#
+# Feed tick() the game's dt rather than a wall clock: with a fixed replay dt
+# the allowances, and every random number the effects draw, stay the same.
+
+
+class EffectSource:
+    def __init__(self, name, cap, floor=0.0):
+        self.name = name
+        self.cap = cap
+        self.floor = floor
+        self.quality = 1.0
+        self.credit = float(cap)
+        self.spawned = 0
+        self.denied = 0
+
+
+class EffectsBudget:
+    def __init__(self, target_fps=60, smoothing=0.1, step=0.25, over=1.05, headroom=0.85,
+                 recover_after=60, cooldown=15):
+        self.budget = 1.0 / target_fps
+        self.smoothing = smoothing
+        self.step = step
+        self.over = over
+        self.headroom = headroom
+        self.recover_after = recover_after
+        self.cooldown = cooldown
+
+        self.sources = {}
+        self.order = []
+        self.frame_time = self.budget
+        self._calm_frames = 0
+        self._hold = 0
+
+    def register(self, name, cap, floor=0.0):
+        """Add an effect source. Sources registered first are degraded first"""
+        source = EffectSource(name, cap, floor)
+        self.sources[name] = source
+        self.order.append(source)
+        return source
+
+    def tick(self, frame_time):
+        self.frame_time += (frame_time - self.frame_time) * self.smoothing
+        for source in self.order:
+            allowance = source.quality * source.cap
+            source.credit = min(max(1.0, allowance), source.credit + allowance)
+
+        if self._hold:
+            self._hold -= 1
+            return
+        if self.frame_time > self.budget * self.over:
+            self._calm_frames = 0
+            for source in self.order:
+                if source.quality > source.floor:
+                    source.quality = max(source.floor, source.quality - self.step)
+                    self._hold = self.cooldown
+                    break
+        elif self.frame_time < self.budget * self.headroom:
+            self._calm_frames += 1
+            if self._calm_frames >= self.recover_after:
+                self._calm_frames = 0
+                for source in reversed(self.order):
+                    if source.quality < 1.0:
+                        source.quality = min(1.0, source.quality + self.step)
+                        self._hold = self.cooldown
+                        break
+        else:
+            self._calm_frames = 0
+
+    def allow(self, name, wanted=1):
+        """How many of the wanted spawns may happen this frame. The result is spent"""
+        source = self.sources[name]
+        granted = min(int(wanted), int(source.credit))
+        source.credit -= granted
+        source.spawned += granted
+        source.denied += int(wanted) - granted
+        return granted
+
+    def scale(self, name):
+        return self.sources[name].quality
+
+    def stats(self):
+        return dict(frame_ms=self.frame_time * 1000, budget_ms=self.budget * 1000,
+                    sources={s.name: dict(quality=s.quality, spawned=s.spawned, denied=s.denied)
+                             for s in self.order})
@@ -1,19 +1,21 @@
 from ursina import *
-from ursina.shaders import basic_lighting_shader
 import random
+import asset_cache
+import telemetry
+from sprite_atlas import SpriteBatch, astra_atlas
 
 class Astra(Entity):
-    def __init__(self, **kwargs):
+    def __init__(self, sprites, **kwargs):
         super().__init__(
             model='quad',
-            texture='astro_fox',
-            color=color.hex("#6A5ACD"),
             scale=(1,2,1),
-            shader=basic_lighting_shader,
             position=(0,1,0),
             collider='box',
+            visible_self=False,  # drawn by the sprite batch, the quad is only the collider's shape
             **kwargs
         )
+        self.sprites = sprites
+        self.sprite = sprites.add(self.world_position, 'idle', height=self.scale_y)
         self.speed = 8
         self.jump_height = 4
         self.dash_cooldown = 1.5
@@ -48,8 +50,8 @@ class Astra(Entity):
     def reality_shift(self):
         if self.teleport_ready:
             self.teleport_ready = False
-            self.color = color.cyan
-            invoke(setattr, self, 'color', color.hex("#6A5ACD"), delay=0.1)
+            self.sprites.tint(self.sprite, color.cyan)
+            invoke(self.sprites.tint, self.sprite, color.white, delay=0.1)
             self.position += self.right * 3
             invoke(setattr, self, 'teleport_ready', True, delay=2)
 
@@ -68,8 +70,12 @@ class Astra(Entity):
         if self.grounded and self.y_velocity < 0:
             self.y_velocity = 0
             self.y = self.intersects().entity.world_y + self.scale_y/2
+        self.sprites.play(self.sprite, 'run' if held_keys['d'] or held_keys['a'] else 'idle')
+        self.sprites.move(self.sprite, self.world_position, rotation=self.rotation_z)
 
 app = Ursina()
+asset_cache.install()
+telemetry.install(path='astra41_telemetry.tlm')
 window.color = color.black
 
 # World setup
@@ -89,7 +95,8 @@ for i in range(20):
         collider='box'
     )
 
-astra = Astra()
+sprites = SpriteBatch(astra_atlas(), capacity=64)
+astra = Astra(sprites)
 camera_rig = Entity()
 camera.parent = camera_rig
 camera.position = (0,15,-20)
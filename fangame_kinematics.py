@@ -0,0 +1,285 @@
+# fangame_kinematics.py
+# Float-only movement kernel shared by the fangame character controllers.
+#
+# The controllers used to build a fresh Vec3 for the input, for both camera
+# axes, for the move direction, for every horizontal speed check, for the
+# slope projection and for the step itself. Kinematics keeps position,
+# velocity, facing, ground normal and the current move direction as plain
+# float slots and every method updates them in place, so a tick allocates
+# nothing beyond the floats themselves. Vec3s only appear at the edges: the
+# entity position read at the start of a tick and written at the end, the
+# camera forward, and the ground raycast.
+#
+# Methods mirror the Vec3 code they replaced, step for step. Run this file
+# to check parity against that Vec3 code on random states and to compare
+# ticks per second.
+
+import math
+
+
+def lerp_angle(start_angle, end_angle, t):
+    """Shortest-way angle lerp in degrees, same as ursina.lerp_angle"""
+    start_angle %= 360
+    end_angle %= 360
+    angle_diff = (end_angle - start_angle + 180) % 360 - 180
+    return (start_angle + t * angle_diff + 360) % 360
+
+
+class Kinematics:
+    __slots__ = ('x', 'y', 'z', 'vx', 'vy', 'vz', 'rotation_y', 'nx', 'ny', 'nz', 'wx', 'wz', 'has_input')
+
+    def __init__(self, position=(0.0, 0.0, 0.0), rotation_y=0.0):
+        self.x, self.y, self.z = position
+        self.vx = self.vy = self.vz = 0.0
+        self.rotation_y = rotation_y
+        self.nx, self.ny, self.nz = 0.0, 1.0, 0.0
+        self.wx = self.wz = 0.0
+        self.has_input = False
+
+    # --- Edges ---
+    def load(self, entity):
+        """Read the entity's position and yaw"""
+        self.x, self.y, self.z = entity.position
+        self.rotation_y = entity.rotation_y
+
+    def store(self, entity):
+        """Write position and yaw back to the entity"""
+        entity.position = (self.x, self.y, self.z)
+        entity.rotation_y = self.rotation_y
+
+    # --- Kernel ---
+    def steer(self, right, left, up, down, camera_fx, camera_fz):
+        """Camera-relative move direction from key states and the camera's forward vector (x and z)"""
+        ix = right - left
+        iz = up - down
+        length = math.sqrt(ix * ix + iz * iz)
+        self.has_input = length > 0
+        if not self.has_input:
+            self.wx = self.wz = 0.0
+            return False
+        ix /= length
+        iz /= length
+        length = math.sqrt(camera_fx * camera_fx + camera_fz * camera_fz)
+        if length == 0:
+            self.wx = self.wz = 0.0
+            return True
+        fx = camera_fx / length
+        fz = camera_fz / length
+        # camera.right flattened is forward turned 90 degrees clockwise: (fz, -fx)
+        wx = fx * iz + fz * ix
+        wz = fz * iz - fx * ix
+        length = math.sqrt(wx * wx + wz * wz)
+        if length:
+            wx /= length
+            wz /= length
+        self.wx = wx
+        self.wz = wz
+        return True
+
+    def turn(self, t):
+        """Turn the facing toward the move direction"""
+        self.rotation_y = lerp_angle(self.rotation_y, math.degrees(math.atan2(self.wx, self.wz)), t)
+
+    def speed_xz(self):
+        return math.sqrt(self.vx * self.vx + self.vz * self.vz)
+
+    def accelerate(self, accel, target_speed, dt, limit=None):
+        """Push along the move direction while below target_speed, then cap the horizontal speed at limit"""
+        along = self.vx * self.wx + self.vz * self.wz
+        if along < target_speed:
+            self.vx += self.wx * accel * dt
+            self.vz += self.wz * accel * dt
+            if limit is not None:
+                speed_sq = self.vx * self.vx + self.vz * self.vz
+                if speed_sq > limit * limit:
+                    k = limit / math.sqrt(speed_sq)
+                    self.vx *= k
+                    self.vz *= k
+        return along
+
+    def decelerate(self, amount):
+        """Take amount off the horizontal speed, stopping at zero"""
+        speed = self.speed_xz()
+        if speed > amount:
+            k = (speed - amount) / speed
+            self.vx *= k
+            self.vz *= k
+        else:
+            self.vx = 0.0
+            self.vz = 0.0
+
+    def fall(self, gravity, dt, max_fall_speed=None):
+        self.vy -= gravity * dt
+        if max_fall_speed is not None and self.vy < max_fall_speed:
+            self.vy = max_fall_speed
+
+    def set_ground_normal(self, nx, ny, nz):
+        self.nx = nx
+        self.ny = ny
+        self.nz = nz
+
+    def project_on_ground(self):
+        """Remove the velocity component along the ground normal"""
+        d = self.vx * self.nx + self.vy * self.ny + self.vz * self.nz
+        self.vx -= self.nx * d
+        self.vy -= self.ny * d
+        self.vz -= self.nz * d
+
+    def integrate(self, dt):
+        self.x += self.vx * dt
+        self.y += self.vy * dt
+        self.z += self.vz * dt
+
+    def move(self, speed, dt):
+        """Step straight along the move direction, for controllers without momentum"""
+        self.x += self.wx * speed * dt
+        self.z += self.wz * speed * dt
+
+
+# --- Parity check and benchmark against the Vec3 code this replaced ---
+
+def _reference_tick(vel, pos, rotation_y, normal, keys, cam_fwd, cam_right, grounded, boosting, dt, s):
+    """The Vec3 movement math of FangameCharacter.game_update before the kernel"""
+    from ursina import Vec3, lerp, lerp_angle as ursina_lerp_angle
+    move_input = Vec3(keys[0] - keys[1], 0, keys[2] - keys[3]).normalized()
+    cam_fwd = Vec3(cam_fwd)
+    cam_fwd.y = 0
+    cam_fwd.normalize()
+    cam_right = Vec3(cam_right)
+    cam_right.y = 0
+    cam_right.normalize()
+    world_move_dir = (cam_fwd * move_input.z + cam_right * move_input.x).normalized()
+    current_speed_xz = Vec3(vel.x, 0, vel.z).length()
+    target_speed = s['top_speed'] * (s['boost_speed_multiplier'] if boosting else 1)
+    if move_input.length() > 0:
+        target_angle = math.degrees(math.atan2(world_move_dir.x, world_move_dir.z))
+        rotation_y = ursina_lerp_angle(rotation_y, target_angle, dt * 10)
+        accel = s['acceleration'] if grounded else s['air_acceleration']
+        current_vel_in_move_dir = vel.dot(world_move_dir)
+        if current_vel_in_move_dir < target_speed:
+            new_velocity = vel + world_move_dir * accel * dt
+            vel.x = new_velocity.x
+            vel.z = new_velocity.z
+            if not boosting:
+                vel_xz = Vec3(vel.x, 0, vel.z)
+                if vel_xz.length() > s['top_speed']:
+                    vel_xz = vel_xz.normalized() * s['top_speed']
+                    vel.x = vel_xz.x
+                    vel.z = vel_xz.z
+        if not grounded:
+            proj_vel = world_move_dir * max(0, current_vel_in_move_dir)
+            side_vel = vel - proj_vel
+            vel = lerp(vel, proj_vel + side_vel, dt * 0.6 * 5)
+    elif grounded:
+        speed_reduction = (s['deceleration'] + s['friction']) * dt
+        if current_speed_xz > speed_reduction:
+            decel_factor = (current_speed_xz - speed_reduction) / current_speed_xz
+            vel.x *= decel_factor
+            vel.z *= decel_factor
+        else:
+            vel.x = 0
+            vel.z = 0
+    if grounded:
+        vel = vel - normal * vel.dot(normal)
+    pos = pos + vel * dt
+    return pos, vel, rotation_y
+
+
+def _kernel_tick(k, keys, cam_fwd, grounded, boosting, dt, s):
+    """The same tick on Kinematics, as FangameCharacter.game_update now runs it"""
+    k.steer(keys[0], keys[1], keys[2], keys[3], cam_fwd[0], cam_fwd[2])
+    current_speed_xz = k.speed_xz()
+    if k.has_input:
+        k.turn(dt * 10)
+        target_speed = s['top_speed'] * (s['boost_speed_multiplier'] if boosting else 1)
+        k.accelerate(s['acceleration'] if grounded else s['air_acceleration'], target_speed, dt,
+                     None if boosting else s['top_speed'])
+    elif grounded:
+        k.decelerate((s['deceleration'] + s['friction']) * dt)
+    if grounded:
+        k.project_on_ground()
+    k.integrate(dt)
+    return current_speed_xz
+
+
+def _random_case(rng):
+    pitch = math.radians(rng.uniform(10, 60))
+    yaw = math.radians(rng.uniform(0, 360))
+    cam_fwd = (math.sin(yaw) * math.cos(pitch), -math.sin(pitch), math.cos(yaw) * math.cos(pitch))
+    cam_right = (math.cos(yaw), 0.0, -math.sin(yaw))
+    tilt = math.radians(rng.uniform(0, 30))
+    tilt_dir = rng.uniform(0, math.tau)
+    normal = (math.sin(tilt) * math.cos(tilt_dir), math.cos(tilt), math.sin(tilt) * math.sin(tilt_dir))
+    return dict(
+        vel=(rng.uniform(-30, 30), rng.uniform(-20, 20), rng.uniform(-30, 30)),
+        pos=(rng.uniform(-100, 100), rng.uniform(0, 10), rng.uniform(-100, 100)),
+        rotation_y=rng.uniform(0, 360),
+        normal=normal,
+        keys=tuple(rng.random() < 0.4 for _ in range(4)),
+        cam_fwd=cam_fwd, cam_right=cam_right,
+        grounded=rng.random() < 0.7, boosting=rng.random() < 0.3,
+        dt=rng.choice((1 / 30, 1 / 60, 1 / 144)),
+    )
+
+
+def parity(cases=20000, seed=0, tolerance=1e-3):
+    """Run the reference and the kernel on random states. Returns the worst absolute difference"""
+    import random
+    from ursina import Vec3
+    from fangame_state import CharacterStats
+    stats = CharacterStats()
+    s = {name: getattr(stats, name) for name in CharacterStats.__slots__}
+    rng = random.Random(seed)
+    worst = 0.0
+    for _ in range(cases):
+        c = _random_case(rng)
+        pos, vel, rot = _reference_tick(Vec3(*c['vel']), Vec3(*c['pos']), c['rotation_y'], Vec3(*c['normal']),
+                                        c['keys'], c['cam_fwd'], c['cam_right'], c['grounded'], c['boosting'],
+                                        c['dt'], s)
+        k = Kinematics(c['pos'], c['rotation_y'])
+        k.vx, k.vy, k.vz = c['vel']
+        k.set_ground_normal(*c['normal'])
+        _kernel_tick(k, c['keys'], c['cam_fwd'], c['grounded'], c['boosting'], c['dt'], s)
+        angle = abs((k.rotation_y - rot + 180) % 360 - 180)
+        diff = max(abs(k.x - pos.x), abs(k.y - pos.y), abs(k.z - pos.z),
+                   abs(k.vx - vel.x), abs(k.vy - vel.y), abs(k.vz - vel.z), angle)
+        worst = max(worst, diff)
+        if diff > tolerance:
+            raise AssertionError(f'kernel differs from reference by {diff} for {c}')
+    return worst
+
+
+def benchmark(ticks=100000, seed=1):
+    import random
+    import time
+    from ursina import Vec3
+    from fangame_state import CharacterStats
+    stats = CharacterStats()
+    s = {name: getattr(stats, name) for name in CharacterStats.__slots__}
+    rng = random.Random(seed)
+    cases = [_random_case(rng) for _ in range(256)]
+
+    vel, pos, normal = Vec3(0, 0, 0), Vec3(0, 0, 0), Vec3(0, 1, 0)
+    rot = 0.0
+    start = time.perf_counter()
+    for i in range(ticks):
+        c = cases[i & 255]
+        pos, vel, rot = _reference_tick(vel, pos, rot, normal, c['keys'], c['cam_fwd'], c['cam_right'],
+                                        c['grounded'], c['boosting'], 1 / 60, s)
+    reference = ticks / (time.perf_counter() - start)
+
+    k = Kinematics()
+    start = time.perf_counter()
+    for i in range(ticks):
+        c = cases[i & 255]
+        _kernel_tick(k, c['keys'], c['cam_fwd'], c['grounded'], c['boosting'], 1 / 60, s)
+    kernel = ticks / (time.perf_counter() - start)
+
+    print(f"{'movement math':<14} {'ticks/s':>12}")
+    print(f"{'Vec3':<14} {reference:>12,.0f}")
+    print(f"{'Kinematics':<14} {kernel:>12,.0f} ({kernel / reference:.1f}x)")
+
+
+if __name__ == '__main__':
+    print(f'parity: worst difference {parity():.2e} over 20000 random states')
+    benchmark()
@@ -0,0 +1,87 @@
+# fangame_level.py
+# Layout data for the SonicFangameWorld demo level.
+#
+# Kept free of Ursina so headless simulations can build the exact same
+# level as SonicFangameWorld._create_fangame_world. Colors are given by
+# name and resolved against ursina.color by the renderer.
+
+import math
+
+GROUND_SIZE = 200
+GROUND_Y = -0.5
+
+# Ground heightfield: TERRAIN_RESOLUTION samples per side across GROUND_SIZE,
+# flat at GROUND_Y except for the hills, (x, z, radius, height) each
+TERRAIN_RESOLUTION = 101
+TERRAIN_CHUNK = 25
+TERRAIN_HILLS = [(-50, -50, 30, 8), (-55, 45, 25, 5), (60, -55, 30, 10), (55, 60, 25, 6)]
+
+# (x, y, z) of each checkpoint post, scale (2, 3, 2)
+CHECKPOINT_SCALE = (2, 3, 2)
+CHECKPOINTS = [(40 * (i + 1), 0, 0) for i in range(3)]
+
+# (color, spring power, position), scale (1.5, 0.5, 1.5)
+SPRING_SCALE = (1.5, 0.5, 1.5)
+SPRINGS = [
+    ('red', 20, (15, 0, 0)),
+    ('blue', 30, (25, 0, 0)),
+    ('yellow', 40, (35, 0, 0)),
+]
+
+# Ring trains in ring_train.RingTrain.to_data() form: a path plus spacing,
+# or one ring per point when spacing is None
+RING_TRAINS = [
+    # a straight line
+    dict(points=[(0, 1, 0), (48, 1, 0)], spacing=3),
+    # a circle
+    dict(points=[(math.cos(a) * 10 + 30, 1, math.sin(a) * 10)
+                 for a in [math.radians(x) for x in range(0, 360, 15)]], spacing=None, closed=True),
+    # a zig-zag
+    dict(points=[(x, 1, 5 if x % 10 < 5 else -5) for x in range(20, 70, 2)], spacing=None),
+]
+
+# (x, y, z) of each lightning shield monitor, scale (1, 1, 1). The shield
+# pulls nearby rings in and takes one hit
+MONITOR_SCALE = (1, 1, 1)
+SHIELD_MONITORS = [(8, 0, 0)]
+
+# (color, scale, points, position)
+ENEMIES = [
+    ('red', 1, 10, (25, 0.5, 0)),
+    ('blue', 1.5, 20, (40, 0.75, 5)),
+    ('violet', 2, 30, (55, 1, -5)),
+]
+
+# (x, y, z, sx, sy, sz)
+PLATFORMS = [(0, 5, 10, 5, 1, 5), (0, 10, 20, 3, 1, 3), (10, 7, 15, 8, 1, 1)]
+
+RAMP_POSITION = (60, 0, 0)
+RAMP_SCALE = (10, 1, 5)
+RAMP_ROTATION_Z = -30
+
+PLAYER_START = (0, 3, 0)
+
+
+def ring_positions():
+    """Every ring position in level order"""
+    from ring_train import RingTrain
+    return [pos for data in RING_TRAINS for pos in RingTrain.from_data(data).positions]
+
+
+def terrain_heights():
+    """Rows of ground heights above GROUND_Y, row 0 at the -z edge"""
+    step = GROUND_SIZE / (TERRAIN_RESOLUTION - 1)
+    rows = []
+    for j in range(TERRAIN_RESOLUTION):
+        z = j * step - GROUND_SIZE / 2
+        row = []
+        for i in range(TERRAIN_RESOLUTION):
+            x = i * step - GROUND_SIZE / 2
+            h = 0.0
+            for hx, hz, radius, height in TERRAIN_HILLS:
+                d = math.hypot(x - hx, z - hz)
+                if d < radius:
+                    h += height * 0.5 * (1 + math.cos(math.pi * d / radius))
+            row.append(h)
+        rows.append(row)
+    return rows
@@ -0,0 +1,157 @@
+# fangame_state.py
+# Slotted stats and runtime state for FangameCharacter.
+#
+# An Ursina Entity keeps its attributes in a dict (and older Ursina versions
+# route every assignment through a custom __setattr__), so a controller that
+# touches forty attributes dozens of times per tick pays for it. The
+# character keeps its tunables in a CharacterStats and its runtime state in a
+# CharacterState, both __slots__ records, and game_update works on those.
+# The entity itself is only read once (position, rotation) and written once
+# (the final transform) per tick. forward_attributes() puts properties on
+# the entity class so character.boost_energy, character.state and friends
+# keep working for the world and older scripts.
+#
+# Run this file to benchmark game_update ticks per second and memory per
+# character for a controller script (default: the main fangame world).
+
+import sys
+import time
+
+
+class CharacterStats:
+    """Tunables. Defaults match the original FangameCharacter.__init__"""
+    __slots__ = ('base_speed', 'top_speed', 'acceleration', 'air_acceleration', 'deceleration', 'friction',
+                 'gravity', 'air_control_factor', 'jump_height', 'max_fall_speed',
+                 'max_spin_dash_charge', 'min_spin_dash_speed', 'spin_dash_speed_factor',
+                 'max_boost', 'boost_speed_multiplier', 'boost_cost_per_second', 'boost_recharge_per_second',
+                 'boost_min_activation', 'stomp_speed', 'homing_speed', 'homing_range', 'homing_angle_limit')
+
+    def __init__(self, **overrides):
+        self.base_speed = 10
+        self.top_speed = 25
+        self.acceleration = 15
+        self.air_acceleration = 5
+        self.deceleration = 10
+        self.friction = 5
+        self.gravity = 35
+        self.air_control_factor = 0.6
+        self.jump_height = 12
+        self.max_fall_speed = -30
+        self.max_spin_dash_charge = 120
+        self.min_spin_dash_speed = 15
+        self.spin_dash_speed_factor = 0.3
+        self.max_boost = 100
+        self.boost_speed_multiplier = 1.8
+        self.boost_cost_per_second = 30
+        self.boost_recharge_per_second = 10
+        self.boost_min_activation = 10
+        self.stomp_speed = -25
+        self.homing_speed = 35
+        self.homing_range = 20
+        self.homing_angle_limit = 70
+        for name, value in overrides.items():
+            setattr(self, name, value)
+
+
+class CharacterState:
+    """Everything game_update changes from tick to tick, besides the transform and velocity
+
+    Position, velocity, facing and ground normal are floats in a fangame_kinematics.Kinematics.
+    """
+    __slots__ = ('grounded', 'spin_dash_charge', 'boost_energy',
+                 'is_boosting', 'is_charging_spin_dash', 'is_rolling', 'is_stomping', 'is_homing',
+                 'homing_available', 'just_jumped', 'invincible', 'invincibility_timer', 'state', 'spawn_point')
+
+    def __init__(self, spawn_point, boost_energy):
+        self.grounded = False
+        self.spin_dash_charge = 0
+        self.boost_energy = boost_energy
+        self.is_boosting = False
+        self.is_charging_spin_dash = False
+        self.is_rolling = False
+        self.is_stomping = False
+        self.is_homing = False
+        self.homing_available = False
+        self.just_jumped = False
+        self.invincible = False
+        self.invincibility_timer = 0
+        self.state = 'idle'
+        self.spawn_point = spawn_point
+
+
+def _record_property(record, name):
+    def get(self):
+        return getattr(getattr(self, record), name)
+
+    def set(self, value):
+        setattr(getattr(self, record), name, value)
+    return property(get, set)
+
+
+def forward_attributes(cls, record, names):
+    """Expose record.<name> as cls.<name> for every name"""
+    for name in names:
+        setattr(cls, name, _record_property(record, name))
+    return cls
+
+
+def benchmark(script, counts=(1, 100), ticks=300, memory_count=500):
+    import importlib.util
+    import tracemalloc
+    from pathlib import Path
+
+    here = Path(__file__).resolve().parent
+    sys.path.insert(0, str(here))
+    spec = importlib.util.spec_from_file_location('fangame_controller', here / script)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+
+    from ursina import Entity, Ursina, held_keys
+    Ursina(window_type='none')
+    Entity(model='plane', scale=1000, collider='box', position=(0, -0.5, 0))
+    controls = {'left': 'a', 'right': 'd', 'up': 'w', 'down': 's', 'jump': 'space', 'boost': 'left shift',
+                'spin_dash': 'left ctrl', 'stomp': 'e', 'camera_left': 'q', 'camera_right': 'r'}
+
+    class Audio:
+        def play(self, *args, **kwargs):
+            pass
+    audio = Audio()
+
+    def spawn(n):
+        characters = []
+        for i in range(n):
+            c = module.FangameCharacter(position=((i % 20) * 3, 1, (i // 20) * 3))
+            c.controls = controls
+            characters.append(c)
+        return characters
+
+    print(script)
+    print(f"{'characters':>10} {'ticks/s':>12}")
+    for n in counts:
+        characters = spawn(n)
+        held_keys['w'] = 1
+        start = time.perf_counter()
+        for t in range(ticks):
+            held_keys['space'] = 1 if t % 60 == 0 else 0
+            held_keys['left shift'] = 1 if t % 120 > 60 else 0
+            for c in characters:
+                c.game_update(1 / 60, audio, [])
+        rate = n * ticks / (time.perf_counter() - start)
+        print(f'{n:>10} {rate:>12,.0f}')
+        for c in characters:
+            c.removeNode()
+        held_keys['w'] = 0
+
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    characters = spawn(memory_count)
+    for c in characters:
+        c.game_update(1 / 60, audio, [])
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    total = sum(stat.size_diff for stat in after.compare_to(before, 'filename'))
+    print(f'{total / memory_count:,.0f} bytes of Python heap per character ({memory_count} spawned)')
+
+
+if __name__ == '__main__':
+    benchmark(sys.argv[1] if len(sys.argv) > 1 else 'Sonic4k-4.20.25$1.0.py')
@@ -0,0 +1,514 @@
+# fangame_vec_env.py
+# Batched, headless version of the SonicFangameWorld rules for agent training.
+#
+# N independent copies of the demo level are stepped together as NumPy
+# arrays, one row per world. The movement rules follow
+# FangameCharacter.game_update and the ring/enemy/spring/checkpoint handling
+# of SonicFangameWorld._game_update. Ground is the level's terrain, sampled
+# bilinearly like heightfield.Heightfield, plus the tops of the boxes
+# (platforms, springs, checkpoints); the ramp and the terrain's slopes are
+# left out, there is no raycast here.
+#
+# Actions are input bitmasks using the same control order as input_replay
+# recordings (CONTROL_NAMES), so a recorded session can be fed straight in.
+
+import numpy as np
+
+import fangame_level
+
+CONTROL_NAMES = ('boost', 'camera_left', 'camera_right', 'down', 'jump',
+                 'left', 'right', 'spin_dash', 'stomp', 'up')
+BOOST, CAMERA_LEFT, CAMERA_RIGHT, DOWN, JUMP, LEFT, RIGHT, SPIN_DASH, STOMP, UP = \
+    (1 << i for i in range(len(CONTROL_NAMES)))
+
+# character states, same names as FangameCharacter.state
+STATES = ('idle', 'walking', 'running', 'jumping', 'rolling', 'spinning', 'boosting', 'stomping', 'homing')
+IDLE, WALKING, RUNNING, JUMPING, ROLLING, SPINNING, BOOSTING_STATE, STOMPING, HOMING = range(len(STATES))
+
+OBS_SIZE = 24
+
+
+class FangameStats:
+    """Tunables, matching fangame_state.CharacterStats"""
+    radius = 0.4  # sphere collider of a 0.8 scaled sphere
+    base_speed = 10
+    top_speed = 25
+    acceleration = 15
+    air_acceleration = 5
+    deceleration = 10
+    friction = 5
+    gravity = 35
+    jump_height = 12
+    max_fall_speed = -30
+    max_spin_dash_charge = 120
+    min_spin_dash_speed = 15
+    spin_dash_speed_factor = 0.3
+    max_boost = 100
+    boost_speed_multiplier = 1.8
+    boost_cost_per_second = 30
+    boost_recharge_per_second = 10
+    boost_min_activation = 10
+    stomp_speed = -25
+    homing_speed = 35
+    homing_range = 20
+    homing_angle_limit = 70
+    invincibility_time = 1.5
+    respawn_invincibility_time = 2.0
+    respawn_delay = 1.5
+    ring_radius = 0.25
+    lives = 3
+
+
+class FangameVecEnv:
+    def __init__(self, num_envs, dt=1/60, max_steps=3600, fall_limit=-20.0, stats=FangameStats):
+        self.num_envs = num_envs
+        self.dt = dt
+        self.max_steps = max_steps
+        self.fall_limit = fall_limit
+        self.stats = stats
+        self._build_level_tables()
+        self._allocate()
+        self.reset()
+
+    # --- Level tables (shared by every world) ---
+    def _build_level_tables(self):
+        L = fangame_level
+        self.ring_pos = np.array(L.ring_positions(), dtype=np.float32)
+        self.enemy_pos = np.array([pos for _, _, _, pos in L.ENEMIES], dtype=np.float32)
+        self.enemy_radius = np.array([0.5 * scale for _, scale, _, _ in L.ENEMIES], dtype=np.float32)
+        self.enemy_points = np.array([points for _, _, points, _ in L.ENEMIES], dtype=np.int32)
+
+        def box(pos, scale):
+            return [pos[0] - scale[0] / 2, pos[1] - scale[1] / 2, pos[2] - scale[2] / 2,
+                    pos[0] + scale[0] / 2, pos[1] + scale[1] / 2, pos[2] + scale[2] / 2]
+
+        self.spring_box = np.array([box(pos, L.SPRING_SCALE) for _, _, pos in L.SPRINGS], dtype=np.float32)
+        self.spring_power = np.array([power for _, power, _ in L.SPRINGS], dtype=np.float32)
+        self.checkpoint_box = np.array([box(pos, L.CHECKPOINT_SCALE) for pos in L.CHECKPOINTS], dtype=np.float32)
+        self.checkpoint_spawn = np.array([(x, y + 1, z) for x, y, z in L.CHECKPOINTS], dtype=np.float32)
+        platforms = [box((x, y, z), (sx, sy, sz)) for x, y, z, sx, sy, sz in L.PLATFORMS]
+        # everything the ground ray can land on, besides the terrain itself
+        self.solid_box = np.concatenate([np.array(platforms, dtype=np.float32), self.spring_box, self.checkpoint_box])
+        self.start_pos = np.array(L.PLAYER_START, dtype=np.float32)
+        self.terrain = np.array(L.terrain_heights(), dtype=np.float32) + np.float32(L.GROUND_Y)
+
+    def _allocate(self):
+        n = self.num_envs
+        R = len(self.ring_pos)
+        E = len(self.enemy_pos)
+        f32 = np.float32
+        self.pos = np.zeros((n, 3), f32)
+        self.vel = np.zeros((n, 3), f32)
+        self.yaw = np.zeros(n, f32)          # character rotation_y, degrees
+        self.cam_yaw = np.zeros(n, f32)      # camera rig rotation_y, degrees
+        self.spawn = np.zeros((n, 3), f32)
+        self.boost_energy = np.zeros(n, f32)
+        self.spin_dash_charge = np.zeros(n, f32)
+        self.invincibility_timer = np.zeros(n, f32)
+        self.respawn_timer = np.zeros(n, f32)
+        self.state = np.zeros(n, np.int8)
+        self.grounded = np.zeros(n, bool)
+        self.is_boosting = np.zeros(n, bool)
+        self.is_charging = np.zeros(n, bool)
+        self.is_rolling = np.zeros(n, bool)
+        self.is_stomping = np.zeros(n, bool)
+        self.is_homing = np.zeros(n, bool)
+        self.homing_available = np.zeros(n, bool)
+        self.just_jumped = np.zeros(n, bool)
+        self.invincible = np.zeros(n, bool)
+        self.ring_alive = np.zeros((n, R), bool)
+        self.enemy_alive = np.zeros((n, E), bool)
+        self.checkpoint_active = np.zeros((n, len(self.checkpoint_box)), bool)
+        self.ring_count = np.zeros(n, np.int32)
+        self.score = np.zeros(n, np.int32)
+        self.lives = np.zeros(n, np.int32)
+        self.steps = np.zeros(n, np.int32)
+        self.obs = np.zeros((n, OBS_SIZE), f32)
+
+    # --- Public API ---
+    def reset(self, mask=None):
+        """Reset every world, or only those where mask is True. Returns observations"""
+        if mask is None:
+            mask = np.ones(self.num_envs, bool)
+        s = self.stats
+        self.pos[mask] = self.start_pos
+        self.spawn[mask] = self.start_pos + np.float32((0, 1, 0))
+        self.vel[mask] = 0
+        self.yaw[mask] = 0
+        self.cam_yaw[mask] = 0
+        self.boost_energy[mask] = s.max_boost
+        for arr in (self.spin_dash_charge, self.invincibility_timer, self.respawn_timer,
+                    self.state, self.ring_count, self.score, self.steps):
+            arr[mask] = 0
+        for arr in (self.grounded, self.is_boosting, self.is_charging, self.is_rolling, self.is_stomping,
+                    self.is_homing, self.homing_available, self.just_jumped, self.invincible,
+                    self.checkpoint_active):
+            arr[mask] = False
+        self.ring_alive[mask] = True
+        self.enemy_alive[mask] = True
+        self.lives[mask] = s.lives
+        self._ring_dist_sq = self._enemy_dist_sq = None
+        self._observe()
+        return self.obs
+
+    def step(self, actions):
+        """Advance every world one tick. Returns (observations, rewards, dones)
+
+        Worlds that finish are reset in place; their returned observation is
+        already the first one of the next episode.
+        """
+        actions = np.asarray(actions, dtype=np.int32)
+        score_before = self.score.copy()
+        self._character_update(actions)
+        self._world_update(actions)
+        self.steps += 1
+
+        rewards = (self.score - score_before).astype(np.float32)
+        dones = (self.lives <= 0) | (self.pos[:, 1] < self.fall_limit) | (self.steps >= self.max_steps)
+        if dones.any():
+            self.reset(dones)
+        else:
+            self._observe()
+        return self.obs, rewards, dones
+
+    # --- Simulation ---
+    def _ground_height(self):
+        """Height of the surface the ground ray hits, -inf where it hits nothing"""
+        s = self.stats
+        x, y, z = self.pos[:, 0], self.pos[:, 1], self.pos[:, 2]
+        # ray from y + 0.1 straight down, length radius + 0.2
+        top = y + 0.1
+        bottom = top - (s.radius + 0.2)
+        half = fangame_level.GROUND_SIZE / 2
+        on_plane = (np.abs(x) <= half) & (np.abs(z) <= half)
+        last = fangame_level.TERRAIN_RESOLUTION - 1
+        gx = np.clip((x + half) * (last / fangame_level.GROUND_SIZE), 0, last)
+        gz = np.clip((z + half) * (last / fangame_level.GROUND_SIZE), 0, last)
+        i = np.minimum(gx.astype(np.int32), last - 1)
+        j = np.minimum(gz.astype(np.int32), last - 1)
+        fx = gx - i
+        fz = gz - j
+        t = self.terrain
+        bottom_row = t[j, i] + (t[j, i + 1] - t[j, i]) * fx
+        top_row = t[j + 1, i] + (t[j + 1, i + 1] - t[j + 1, i]) * fx
+        plane_y = bottom_row + (top_row - bottom_row) * fz
+        height = np.where(on_plane & (plane_y <= top) & (plane_y >= bottom), plane_y, -np.inf).astype(np.float32)
+
+        b = self.solid_box
+        over = ((x[:, None] >= b[:, 0]) & (x[:, None] <= b[:, 3]) &
+                (z[:, None] >= b[:, 2]) & (z[:, None] <= b[:, 5]) &
+                (b[:, 4] <= top[:, None]) & (b[:, 4] >= bottom[:, None]))
+        if over.any():
+            box_top = np.where(over, b[:, 4], -np.inf).max(axis=1)
+            height = np.maximum(height, box_top)
+        return height
+
+    def _character_update(self, a):
+        s = self.stats
+        dt = np.float32(self.dt)
+        vel = self.vel
+
+        # --- Ground check ---
+        ground_y = self._ground_height()
+        grounded = np.isfinite(ground_y)
+        self.grounded = grounded
+        self.pos[grounded, 1] = ground_y[grounded] + s.radius
+        landing = grounded & (vel[:, 1] < 0)
+        vel[landing, 1] = 0
+        self.homing_available |= grounded
+        self.is_homing &= ~grounded
+        self.is_stomping &= ~grounded
+        self.just_jumped &= ~grounded
+        self.state[grounded & (self.state == STOMPING)] = IDLE
+
+        air = ~grounded
+        vel[air, 1] = np.maximum(vel[air, 1] - s.gravity * dt, s.max_fall_speed)
+        fell_while_charging = air & self.is_charging
+        if fell_while_charging.any():
+            self._release_spin_dash(fell_while_charging)
+
+        # --- Input, camera relative ---
+        ix = ((a & RIGHT) != 0).astype(np.float32) - ((a & LEFT) != 0)
+        iz = ((a & UP) != 0).astype(np.float32) - ((a & DOWN) != 0)
+        in_len = np.sqrt(ix * ix + iz * iz)
+        has_move = in_len > 0
+        safe = np.where(has_move, in_len, 1)
+        ix, iz = ix / safe, iz / safe
+        cam = np.radians(self.cam_yaw)
+        cs, cc = np.sin(cam), np.cos(cam)
+        # camera forward (sin, 0, cos), camera right (cos, 0, -sin)
+        dx = cs * iz + cc * ix
+        dz = cc * iz - cs * ix
+        d_len = np.sqrt(dx * dx + dz * dz)
+        d_safe = np.where(d_len > 0, d_len, 1)
+        dx, dz = dx / d_safe, dz / d_safe
+
+        boost_key = (a & BOOST) != 0
+        spin_key = (a & SPIN_DASH) != 0
+        jump_key = (a & JUMP) != 0
+
+        # --- Boost ---
+        self.is_boosting &= boost_key & (self.boost_energy > 0)
+        b = self.is_boosting
+        self.boost_energy[b] -= s.boost_cost_per_second * dt
+        emptied = b & (self.boost_energy <= 0)
+        self.boost_energy[emptied] = 0
+        self.is_boosting &= ~emptied
+        recharge = ~self.is_boosting & grounded
+        self.boost_energy[recharge] = np.minimum(s.max_boost, self.boost_energy[recharge] + s.boost_recharge_per_second * dt)
+
+        start = grounded & boost_key & has_move & (self.boost_energy > s.boost_min_activation) & ~self.is_boosting
+        self.is_boosting |= start
+        self.is_rolling |= start
+
+        # --- Spin dash ---
+        charge = grounded & spin_key & ~self.is_rolling
+        vel[charge & ~self.is_charging] = 0
+        self.is_charging |= charge
+        self.spin_dash_charge[charge] = np.minimum(s.max_spin_dash_charge, self.spin_dash_charge[charge] + 90 * dt)
+        self.state[charge] = SPINNING
+        release = self.is_charging & ~spin_key
+        if release.any():
+            self._release_spin_dash(release)
+
+        # --- Acceleration / friction ---
+        speed_xz = np.sqrt(vel[:, 0] ** 2 + vel[:, 2] ** 2)
+        target_speed = np.where(self.is_boosting, s.top_speed * s.boost_speed_multiplier, s.top_speed)
+
+        steer = has_move & ~self.is_charging
+        if steer.any():
+            target_angle = np.degrees(np.arctan2(dx, dz))
+            diff = (target_angle - self.yaw + 180) % 360 - 180
+            t = dt * 10  # lerp_angle, unclamped like Ursina's
+            self.yaw = np.where(steer, self.yaw + diff * t, self.yaw).astype(np.float32)
+
+            accel = np.where(grounded, s.acceleration, s.air_acceleration) * dt
+            along = vel[:, 0] * dx + vel[:, 2] * dz
+            push = steer & (along < target_speed)
+            vel[push, 0] += dx[push] * accel[push]
+            vel[push, 2] += dz[push] * accel[push]
+            cap = push & ~self.is_boosting
+            new_speed = np.sqrt(vel[:, 0] ** 2 + vel[:, 2] ** 2)
+            over = cap & (new_speed > s.top_speed)
+            if over.any():
+                k = s.top_speed / new_speed[over]
+                vel[over, 0] *= k
+                vel[over, 2] *= k
+
+            g = steer & grounded
+            self.state[g] = np.select(
+                [self.is_rolling[g], self.is_boosting[g], speed_xz[g] > s.base_speed * 0.8],
+                [ROLLING, BOOSTING_STATE, RUNNING], WALKING)
+
+        brake = ~steer & grounded & ~self.is_charging & ~self.is_rolling
+        if brake.any():
+            reduction = (s.deceleration + s.friction) * dt
+            k = np.where(speed_xz > reduction, (speed_xz - reduction) / np.maximum(speed_xz, 1e-9), 0).astype(np.float32)
+            vel[brake, 0] *= k[brake]
+            vel[brake, 2] *= k[brake]
+            self.state[brake] = IDLE
+
+        # --- Jump ---
+        jump = grounded & jump_key & ~self.just_jumped & ~self.is_charging
+        vel[jump, 1] = s.jump_height
+        grounded &= ~jump
+        self.state[jump] = JUMPING
+        self.homing_available |= jump
+        self.just_jumped |= jump
+        self.is_rolling &= ~jump
+
+        # --- Stomp ---
+        stomp = ~grounded & ((a & STOMP) != 0) & ~self.is_stomping & ~self.is_homing
+        self.is_stomping |= stomp
+        vel[stomp] = (0, s.stomp_speed, 0)
+        self.state[stomp] = STOMPING
+
+        # --- Homing attack ---
+        home = ~grounded & jump_key & self.homing_available & ~self.is_stomping & (self.state != JUMPING)
+        if home.any():
+            self._homing_attack(home)
+
+        # --- Rolling ends when slow ---
+        self.is_rolling &= ~(grounded & ~self.is_boosting & ~self.is_charging & (speed_xz < s.base_speed * 0.5))
+
+        # --- Slope projection (flat ground) and move ---
+        vel[grounded & ~self.just_jumped, 1] = 0
+        self.pos += vel * dt
+
+        # --- Invincibility ---
+        inv = self.invincible
+        self.invincibility_timer[inv] -= dt
+        ended = inv & (self.invincibility_timer <= 0)
+        self.invincible &= ~ended
+        self.invincibility_timer[ended] = 0
+
+    def _release_spin_dash(self, mask):
+        s = self.stats
+        strong = mask & (self.spin_dash_charge > 10)
+        if strong.any():
+            speed = s.min_spin_dash_speed + self.spin_dash_charge[strong] * s.spin_dash_speed_factor
+            yaw = np.radians(self.yaw[strong])
+            self.vel[strong] = np.stack([np.sin(yaw) * speed, np.zeros_like(speed), np.cos(yaw) * speed], axis=1)
+            self.is_rolling |= strong
+            self.state[strong] = ROLLING
+        self.spin_dash_charge[mask] = 0
+        self.is_charging &= ~mask
+
+    def _homing_attack(self, mask):
+        s = self.stats
+        idx = np.nonzero(mask)[0]
+        rel = self.enemy_pos[None, :, :] - self.pos[idx, None, :]
+        dist_sq = (rel ** 2).sum(axis=2)
+        dist = np.sqrt(np.maximum(dist_sq, 1e-12))
+        yaw = np.radians(self.yaw[idx])
+        dot = (rel[:, :, 0] * np.sin(yaw)[:, None] + rel[:, :, 2] * np.cos(yaw)[:, None]) / dist
+        cone = np.cos(np.radians(s.homing_angle_limit))
+        ok = self.enemy_alive[idx] & (dist_sq < s.homing_range ** 2) & (dot > cone)
+        candidate = np.where(ok, dist_sq, np.inf)
+        best = candidate.argmin(axis=1)
+        found = np.isfinite(candidate[np.arange(len(idx)), best])
+        if not found.any():
+            return
+        hit = idx[found]
+        best = best[found]
+        direction = rel[found, best] / dist[found, best][:, None]
+        self.vel[hit] = direction * s.homing_speed
+        self.is_homing[hit] = True
+        self.state[hit] = HOMING
+        self.homing_available[hit] = False
+
+    def _world_update(self, a):
+        s = self.stats
+        dt = np.float32(self.dt)
+        pos = self.pos
+
+        # --- Rings ---
+        rel = self.ring_pos[None, :, :] - pos[:, None, :]
+        ring_dist_sq = (rel ** 2).sum(axis=2)
+        got = self.ring_alive & (ring_dist_sq < (s.radius + s.ring_radius) ** 2)
+        collected = got.sum(axis=1, dtype=np.int32)
+        self.ring_alive &= ~got
+        self.ring_count += collected
+        self.score += collected * 10
+        self._ring_dist_sq = np.where(self.ring_alive, ring_dist_sq, np.inf)
+
+        # --- Enemies (first touching enemy only) ---
+        rel = self.enemy_pos[None, :, :] - pos[:, None, :]
+        enemy_dist_sq = (rel ** 2).sum(axis=2)
+        touch = self.enemy_alive & (enemy_dist_sq < (s.radius + self.enemy_radius[None, :]) ** 2)
+        self._enemy_dist_sq = np.where(self.enemy_alive, enemy_dist_sq, np.inf)
+        any_touch = touch.any(axis=1)
+        if any_touch.any():
+            attacking = self.is_rolling | self.is_stomping | self.is_homing
+            kill = any_touch & attacking
+            if kill.any():
+                # attacking kitties pop every badnik they touch this frame
+                killed = touch & kill[:, None]
+                self.enemy_alive &= ~killed
+                self.score += (killed * self.enemy_points[None, :]).sum(axis=1, dtype=np.int32)
+                bounce = kill & ~self.grounded
+                self.vel[bounce, 1] = s.jump_height * 0.6
+                self.homing_available |= kill
+            hurt = any_touch & ~attacking & ~self.invincible
+            if hurt.any():
+                self._player_hit(hurt)
+
+        # --- Springs ---
+        hit = self._sphere_box(self.spring_box)
+        if hit.any():
+            spring_top = self.spring_box[:, 4]
+            ok = hit & ((self.vel[:, 1:2] <= 0) | (np.abs(pos[:, 1:2] - spring_top[None, :]) < 0.5))
+            envs, which = np.nonzero(ok)
+            self.vel[envs, 1] = self.spring_power[which]
+            pos[envs, 1] = spring_top[which] + s.radius
+
+        # --- Checkpoints ---
+        hit = self._sphere_box(self.checkpoint_box) & ~self.checkpoint_active
+        if hit.any():
+            self.checkpoint_active |= hit
+            envs, which = np.nonzero(hit)
+            self.spawn[envs] = self.checkpoint_spawn[which]
+
+        # --- Camera rotation keys ---
+        turn = ((a & CAMERA_LEFT) != 0).astype(np.float32) - ((a & CAMERA_RIGHT) != 0)
+        self.cam_yaw += turn * 100 * dt
+
+        # --- Delayed respawn ---
+        waiting = self.respawn_timer > 0
+        if waiting.any():
+            self.respawn_timer[waiting] -= dt
+            back = waiting & (self.respawn_timer <= 0)
+            pos[back] = self.spawn[back]
+            self.vel[back] = 0
+            self.invincible |= back
+            self.invincibility_timer[back] = s.respawn_invincibility_time
+            self.boost_energy[back] = s.max_boost
+
+    def _player_hit(self, mask):
+        s = self.stats
+        self.invincible |= mask
+        self.invincibility_timer[mask] = s.invincibility_time
+        has_rings = mask & (self.ring_count > 0)
+        lost = np.minimum(self.ring_count, 20)
+        self.ring_count[has_rings] -= lost[has_rings]
+        self.score[has_rings] = np.maximum(0, self.score[has_rings] - lost[has_rings] * 5)
+        dies = mask & ~has_rings
+        self.lives[dies] -= 1
+        self.vel[dies] = (0, 5, 0)
+        self.respawn_timer[dies & (self.lives > 0)] = s.respawn_delay
+
+    def _sphere_box(self, boxes):
+        """(N, B) mask of character spheres touching axis-aligned boxes"""
+        p = self.pos[:, None, :]
+        closest = np.clip(p, boxes[None, :, :3], boxes[None, :, 3:])
+        return ((closest - p) ** 2).sum(axis=2) < self.stats.radius ** 2
+
+    def _observe(self):
+        s = self.stats
+        o = self.obs
+        yaw = np.radians(self.yaw)
+        o[:, 0:3] = self.pos
+        o[:, 3:6] = self.vel / s.top_speed
+        o[:, 6] = np.sin(yaw)
+        o[:, 7] = np.cos(yaw)
+        o[:, 8] = self.grounded
+        o[:, 9] = self.boost_energy / s.max_boost
+        o[:, 10] = self.spin_dash_charge / s.max_spin_dash_charge
+        o[:, 11] = self.is_boosting
+        o[:, 12] = self.is_rolling
+        o[:, 13] = self.is_stomping
+        o[:, 14] = self.is_homing
+        o[:, 15] = self.homing_available
+        o[:, 16] = self.invincible
+        o[:, 17] = self.lives
+        # nearest alive ring and enemy, relative to the character
+        ring_d = self._ring_dist_sq
+        if ring_d is None:
+            ring_d = np.where(self.ring_alive, ((self.ring_pos[None] - self.pos[:, None]) ** 2).sum(axis=2), np.inf)
+        enemy_d = self._enemy_dist_sq
+        if enemy_d is None:
+            enemy_d = np.where(self.enemy_alive, ((self.enemy_pos[None] - self.pos[:, None]) ** 2).sum(axis=2), np.inf)
+        rows = np.arange(self.num_envs)
+        nearest = ring_d.argmin(axis=1)
+        any_ring = np.isfinite(ring_d[rows, nearest])
+        o[:, 18:21] = np.where(any_ring[:, None], self.ring_pos[nearest] - self.pos, 0)
+        nearest = enemy_d.argmin(axis=1)
+        any_enemy = np.isfinite(enemy_d[rows, nearest])
+        o[:, 21:24] = np.where(any_enemy[:, None], self.enemy_pos[nearest] - self.pos, 0)
+
+
+if __name__ == '__main__':
+    import sys
+    import time as _time
+
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 4096
+    steps = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+    env = FangameVecEnv(n)
+    rng = np.random.default_rng(0)
+    actions = rng.integers(0, 1 << len(CONTROL_NAMES), size=(steps, n), dtype=np.int32)
+    env.step(actions[0])
+    start = _time.perf_counter()
+    for i in range(steps):
+        env.step(actions[i])
+    elapsed = _time.perf_counter() - start
+    print(f"{n} envs x {steps} steps: {n * steps / elapsed:,.0f} env-steps/s")
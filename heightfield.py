@@ -0,0 +1,215 @@
+# heightfield.py
+# Grid terrain with constant-time ground queries.
+#
+# A Heightfield is a regular grid of heights over a rectangle in the XZ
+# plane. Rows run along +z and columns along +x; heights are in world units
+# above the field's position. height() finds the grid cell under a point with
+# two divisions and blends its four corners bilinearly, and normal() uses
+# the slope of the same bilinear patch, so a controller standing on terrain
+# gets its ground height and normal without a scene-wide raycast.
+# cast_down() answers the question a downward ground ray asks ("is there
+# ground within this distance below me?") from the same sample.
+#
+# build() turns the grid into chunk_size x chunk_size cell meshes, one Entity
+# each, so the renderer can cull the chunks that are off screen. The chunks
+# have no collider; props (platforms, springs, ramps) keep theirs. add_props()
+# marks the cells under them, and ground() only falls back to a raycast in
+# marked cells or off the field, taking whichever surface is higher.
+#
+# Everything except build() works without Ursina.
+
+import math
+
+
+class Heightfield:
+    def __init__(self, heights, size, position=(0, 0, 0), height_scale=1.0):
+        """heights: rows of samples (any nested sequence, numpy arrays too), row 0 at the -z edge.
+        size: (width, depth) of the whole field in world units, centered on position."""
+        rows = [[float(v) * height_scale for v in row] for row in heights]
+        self.rows = len(rows)
+        self.columns = len(rows[0]) if rows else 0
+        if self.rows < 2 or self.columns < 2:
+            raise ValueError('a heightfield needs at least 2x2 samples')
+        if any(len(row) != self.columns for row in rows):
+            raise ValueError('every row of a heightfield needs the same number of samples')
+        self.heights = [h for row in rows for h in row]
+        self.width, self.depth = size
+        self.x, self.y, self.z = position
+        self.min_x = self.x - self.width / 2
+        self.min_z = self.z - self.depth / 2
+        self.cell_x = self.width / (self.columns - 1)
+        self.cell_z = self.depth / (self.rows - 1)
+        self.props = bytearray((self.rows - 1) * (self.columns - 1))
+
+    @classmethod
+    def from_image(cls, path, size, height, position=(0, 0, 0)):
+        """Grayscale image, black at position.y and white at position.y + height. The top of the image is +z"""
+        from PIL import Image
+        image = Image.open(path).convert('L')
+        w, h = image.size
+        pixels = list(image.getdata())
+        rows = [pixels[r * w:(r + 1) * w] for r in range(h - 1, -1, -1)]
+        return cls(rows, size, position, height_scale=height / 255)
+
+    def _cell(self, x, z):
+        gx = (x - self.min_x) / self.cell_x
+        gz = (z - self.min_z) / self.cell_z
+        if gx < 0 or gz < 0 or gx > self.columns - 1 or gz > self.rows - 1:
+            return None
+        i = min(int(gx), self.columns - 2)
+        j = min(int(gz), self.rows - 2)
+        return i, j, gx - i, gz - j
+
+    def contains(self, x, z):
+        return (self.min_x <= x <= self.min_x + self.width) and (self.min_z <= z <= self.min_z + self.depth)
+
+    def sample(self, x, z):
+        """(height, nx, ny, nz) at a world point, or None outside the field"""
+        cell = self._cell(x, z)
+        if cell is None:
+            return None
+        i, j, fx, fz = cell
+        heights = self.heights
+        k = j * self.columns + i
+        h00 = heights[k]
+        h10 = heights[k + 1]
+        h01 = heights[k + self.columns]
+        h11 = heights[k + self.columns + 1]
+        bottom = h00 + (h10 - h00) * fx
+        top = h01 + (h11 - h01) * fx
+        dx = ((h10 - h00) * (1 - fz) + (h11 - h01) * fz) / self.cell_x
+        dz = (top - bottom) / self.cell_z
+        length = math.sqrt(dx * dx + 1 + dz * dz)
+        return self.y + bottom + (top - bottom) * fz, -dx / length, 1 / length, -dz / length
+
+    def height(self, x, z):
+        """World y of the terrain at a point, or None outside the field"""
+        sample = self.sample(x, z)
+        return None if sample is None else sample[0]
+
+    def normal(self, x, z):
+        sample = self.sample(x, z)
+        return None if sample is None else sample[1:]
+
+    def cast_down(self, x, y, z, distance):
+        """Like a downward ray from (x, y, z): the sample if the terrain is at most distance below, else None"""
+        sample = self.sample(x, z)
+        if sample is None or not y - distance <= sample[0] <= y:
+            return None
+        return sample
+
+    # --- Props ---
+    def add_prop(self, min_x, min_z, max_x, max_z, margin=1.0):
+        """Mark the cells under an XZ rectangle (grown by margin) as needing a raycast"""
+        i0 = max(0, int((min_x - margin - self.min_x) // self.cell_x))
+        i1 = min(self.columns - 2, int((max_x + margin - self.min_x) // self.cell_x))
+        j0 = max(0, int((min_z - margin - self.min_z) // self.cell_z))
+        j1 = min(self.rows - 2, int((max_z + margin - self.min_z) // self.cell_z))
+        for j in range(j0, j1 + 1):
+            for i in range(i0, i1 + 1):
+                self.props[j * (self.columns - 1) + i] = 1
+
+    def add_props(self, entities, margin=1.0):
+        """Mark the cells under every entity (its world-space bounds, so call this while it is visible)"""
+        for e in entities:
+            bounds = e.getTightBounds(e.getTop())
+            if bounds is None:
+                # no geometry (model failed to load), fall back to a unit box under its transform
+                p = e.getPos(e.getTop())
+                half = e.getScale(e.getTop()) * 0.5
+                bounds = p - half, p + half
+            lo, hi = bounds
+            self.add_prop(lo[0], lo[2], hi[0], hi[2], margin)
+
+    def clear(self, x, z):
+        """True over terrain with no prop nearby, where a sample answers everything a ground ray would"""
+        cell = self._cell(x, z)
+        return cell is not None and not self.props[cell[1] * (self.columns - 1) + cell[0]]
+
+    def ground(self, x, y, z, distance, raycast_down):
+        """Ground within distance below (x, y, z) as (height, nx, ny, nz), or None.
+        raycast_down(x, y, z, distance) returns the same for props; it is only called where clear() is False."""
+        if self.clear(x, z):
+            return self.cast_down(x, y, z, distance)
+        terrain = self.cast_down(x, y, z, distance)
+        prop = raycast_down(x, y, z, distance)
+        if prop is None or (terrain is not None and terrain[0] >= prop[0]):
+            return terrain
+        return prop
+
+    # --- Rendering ---
+    def _grid_normal(self, i, j):
+        heights = self.heights
+        columns = self.columns
+        left = heights[j * columns + max(i - 1, 0)]
+        right = heights[j * columns + min(i + 1, columns - 1)]
+        back = heights[max(j - 1, 0) * columns + i]
+        front = heights[min(j + 1, self.rows - 1) * columns + i]
+        dx = (right - left) / ((min(i + 1, columns - 1) - max(i - 1, 0)) * self.cell_x)
+        dz = (front - back) / ((min(j + 1, self.rows - 1) - max(j - 1, 0)) * self.cell_z)
+        length = math.sqrt(dx * dx + 1 + dz * dz)
+        return (-dx / length, 1 / length, -dz / length)
+
+    def build(self, chunk_size=32, **kwargs):
+        """Make one Entity per chunk of cells, positioned at the field's position. Returns the chunks.
+        Extra keyword arguments (color, texture, texture_scale, shader...) go to every chunk."""
+        from ursina import Entity, Mesh
+        chunks = []
+        for j0 in range(0, self.rows - 1, chunk_size):
+            for i0 in range(0, self.columns - 1, chunk_size):
+                i1 = min(i0 + chunk_size, self.columns - 1)
+                j1 = min(j0 + chunk_size, self.rows - 1)
+                w = i1 - i0 + 1
+                vertices, uvs, normals, triangles = [], [], [], []
+                for j in range(j0, j1 + 1):
+                    for i in range(i0, i1 + 1):
+                        vertices.append((self.min_x - self.x + i * self.cell_x,
+                                         self.heights[j * self.columns + i],
+                                         self.min_z - self.z + j * self.cell_z))
+                        # uvs span the whole field, so textures line up across chunks
+                        uvs.append((i / (self.columns - 1), j / (self.rows - 1)))
+                        normals.append(self._grid_normal(i, j))
+                        n = len(vertices) - 1
+                        if i > i0 and j > j0:
+                            triangles.append((n, n - 1, n - w - 1, n - w))
+                chunks.append(Entity(model=Mesh(vertices=vertices, triangles=triangles, uvs=uvs, normals=normals),
+                                     position=(self.x, self.y, self.z), **kwargs))
+        return chunks
+
+
+def benchmark(queries=20000, seed=1):
+    import random
+    import time
+    import fangame_level
+    from ursina import Entity, Ursina, raycast
+    Ursina(window_type='none')
+    field = Heightfield(fangame_level.terrain_heights(), (fangame_level.GROUND_SIZE, fangame_level.GROUND_SIZE),
+                        position=(0, fangame_level.GROUND_Y, 0))
+    chunks = field.build(chunk_size=fangame_level.TERRAIN_CHUNK)
+    for chunk in chunks:
+        chunk.collider = 'mesh'
+    rng = random.Random(seed)
+    half = fangame_level.GROUND_SIZE / 2 - 1
+    points = [(rng.uniform(-half, half), rng.uniform(-half, half)) for _ in range(256)]
+    points = [(x, field.height(x, z) + 0.4, z) for x, z in points]
+
+    start = time.perf_counter()
+    for i in range(queries):
+        x, y, z = points[i & 255]
+        raycast((x, y, z), (0, -1, 0), distance=0.6)
+    ray = queries / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    for i in range(queries):
+        x, y, z = points[i & 255]
+        field.cast_down(x, y, z, 0.6)
+    sampled = queries / (time.perf_counter() - start)
+
+    print(f'{len(chunks)} chunks, {field.columns}x{field.rows} samples')
+    print(f"{'ground query':<24} {'queries/s':>12}")
+    print(f"{'raycast (mesh collider)':<24} {ray:>12,.0f}")
+    print(f"{'Heightfield.cast_down':<24} {sampled:>12,.0f} ({sampled / ray:.0f}x)")
+
+
+if __name__ == '__main__':
+    benchmark()
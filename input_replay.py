@@ -0,0 +1,196 @@
+# input_replay.py
+# Compact input recordings for SonicFangameWorld.
+#
+# A replay is the RNG seed, the fixed tick dt and one bitmask of held
+# controls per tick. Masks are delta-encoded: only ticks where the mask
+# changes are stored, as (ticks since last change, xor of the bits) varint
+# pairs, and the event stream is zlib'd when that is smaller. A minute of
+# normal play is a few hundred bytes.
+
+import hashlib
+import struct
+import zlib
+
+REPLAY_MAGIC = b'SRPL'
+REPLAY_VERSION = 1
+FLAG_ZLIB = 0x01
+HASH_SIZE = 16
+
+_HEADER = struct.Struct('<4sBBQdB')  # magic, version, flags, seed, dt, control count
+
+
+def _write_varint(out, value):
+    while True:
+        byte = value & 0x7f
+        value >>= 7
+        if value:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return
+
+
+def _read_varint(data, pos):
+    value = 0
+    shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7f) << shift
+        if not byte & 0x80:
+            return value, pos
+        shift += 7
+
+
+def pack_input(held_keys, controls, control_names):
+    """Pack the held state of each named control into a bitmask"""
+    mask = 0
+    for bit, name in enumerate(control_names):
+        if held_keys[controls[name]]:
+            mask |= 1 << bit
+    return mask
+
+
+def unpack_input(mask, held_keys, controls, control_names):
+    """Write a bitmask back into held_keys for each named control"""
+    for bit, name in enumerate(control_names):
+        held_keys[controls[name]] = (mask >> bit) & 1
+
+
+def hash_state(*values):
+    """Stable digest of a flat sequence of numbers and strings"""
+    h = hashlib.blake2b(digest_size=HASH_SIZE)
+    for value in values:
+        if isinstance(value, str):
+            h.update(value.encode('utf-8') + b'\0')
+        elif isinstance(value, int) and not isinstance(value, bool):
+            h.update(struct.pack('<q', value))
+        else:
+            h.update(struct.pack('<d', float(value)))
+    return h.digest()
+
+
+class InputRecorder:
+    def __init__(self, control_names, seed, dt):
+        self.control_names = tuple(control_names)
+        self.seed = seed
+        self.dt = dt
+        self.tick_count = 0
+        self._events = bytearray()
+        self._last_mask = 0
+        self._last_change = 0
+
+    def capture(self, mask):
+        """Record the input mask for the next tick"""
+        changed = mask ^ self._last_mask
+        if changed:
+            _write_varint(self._events, self.tick_count - self._last_change)
+            _write_varint(self._events, changed)
+            self._last_mask = mask
+            self._last_change = self.tick_count
+        self.tick_count += 1
+
+    def to_bytes(self, state_hash):
+        events = bytes(self._events)
+        flags = 0
+        packed = zlib.compress(events, 9)
+        if len(packed) < len(events):
+            events = packed
+            flags |= FLAG_ZLIB
+
+        out = bytearray(_HEADER.pack(REPLAY_MAGIC, REPLAY_VERSION, flags,
+                                     self.seed, self.dt, len(self.control_names)))
+        for name in self.control_names:
+            encoded = name.encode('utf-8')
+            out.append(len(encoded))
+            out += encoded
+        _write_varint(out, self.tick_count)
+        _write_varint(out, len(events))
+        out += events
+        out += state_hash
+        return bytes(out)
+
+    def save(self, path, state_hash):
+        data = self.to_bytes(state_hash)
+        with open(path, 'wb') as f:
+            f.write(data)
+        return len(data)
+
+
+class InputReplay:
+    def __init__(self, control_names, seed, dt, tick_count, events, state_hash):
+        self.control_names = control_names
+        self.seed = seed
+        self.dt = dt
+        self.tick_count = tick_count
+        self.events = events
+        self.state_hash = state_hash
+
+    @classmethod
+    def from_bytes(cls, data):
+        magic, version, flags, seed, dt, count = _HEADER.unpack_from(data, 0)
+        if magic != REPLAY_MAGIC:
+            raise ValueError('not a replay file')
+        if version != REPLAY_VERSION:
+            raise ValueError(f'unsupported replay version {version}')
+
+        pos = _HEADER.size
+        names = []
+        for _ in range(count):
+            length = data[pos]
+            names.append(data[pos + 1:pos + 1 + length].decode('utf-8'))
+            pos += 1 + length
+        tick_count, pos = _read_varint(data, pos)
+        size, pos = _read_varint(data, pos)
+        events = data[pos:pos + size]
+        pos += size
+        if flags & FLAG_ZLIB:
+            events = zlib.decompress(events)
+        state_hash = bytes(data[pos:pos + HASH_SIZE])
+        if len(state_hash) != HASH_SIZE:
+            raise ValueError('truncated replay file')
+        return cls(tuple(names), seed, dt, tick_count, bytes(events), state_hash)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as f:
+            return cls.from_bytes(f.read())
+
+    def masks(self):
+        """Yield the input mask of every tick in order"""
+        events = self.events
+        pos = 0
+        mask = 0
+        next_change = None
+        if events:
+            gap, pos = _read_varint(events, 0)
+            next_change = gap
+        for tick in range(self.tick_count):
+            while next_change == tick:
+                changed, pos = _read_varint(events, pos)
+                mask ^= changed
+                if pos < len(events):
+                    gap, pos = _read_varint(events, pos)
+                    next_change = tick + gap
+                else:
+                    next_change = None
+            yield mask
+
+
+class ReplayPlayer:
+    def __init__(self, replay):
+        self.replay = replay
+        self.tick = 0
+        self._masks = replay.masks()
+
+    @property
+    def done(self):
+        return self.tick >= self.replay.tick_count
+
+    def apply(self, held_keys, controls):
+        """Feed the next tick's inputs into held_keys. Returns False once the replay is over"""
+        if self.done:
+            return False
+        unpack_input(next(self._masks), held_keys, controls, self.replay.control_names)
+        self.tick += 1
+        return True
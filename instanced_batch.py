@@ -0,0 +1,118 @@
+# instanced_batch.py
+# Draw many copies of one model with a single instanced draw call.
+#
+# InstancedBatch bakes a template's transform and colors into a private copy
+# of its vertices, then draws it once per position. Each instance reads its
+# offset and uniform scale (x, y, z, s) from a buffer texture indexed by
+# gl_InstanceID, so a hundred rings cost one draw call and one render state
+# instead of a hundred nodes. hide(i) writes a zero scale into that
+# instance's texel, which collapses it to a point. The buffer is 16 bytes
+# per instance, so re-uploading it after a pickup is nothing.
+#
+# The shader does the same grey world-normal shading as Ursina's
+# basic_lighting_shader. Because the offsets are applied on the GPU the node
+# gets explicit bounds around all instances, so culling still works.
+
+
+_VERTEX = '''
+#version 140
+uniform mat4 p3d_ModelViewProjectionMatrix;
+uniform mat4 p3d_ModelMatrix;
+uniform samplerBuffer instances;
+
+in vec4 p3d_Vertex;
+in vec3 p3d_Normal;
+in vec4 p3d_Color;
+in vec2 p3d_MultiTexCoord0;
+out vec2 texcoord;
+out vec3 world_normal;
+out vec4 vertex_color;
+
+void main() {
+    vec4 instance = texelFetch(instances, gl_InstanceID);
+    gl_Position = p3d_ModelViewProjectionMatrix * vec4(p3d_Vertex.xyz * instance.w + instance.xyz, 1);
+    texcoord = p3d_MultiTexCoord0;
+    vertex_color = p3d_Color;
+    world_normal = normalize(mat3(p3d_ModelMatrix) * p3d_Normal);
+}
+'''
+
+_FRAGMENT = '''
+#version 140
+uniform sampler2D p3d_Texture0;
+uniform vec4 p3d_ColorScale;
+in vec2 texcoord;
+in vec3 world_normal;
+in vec4 vertex_color;
+out vec4 fragColor;
+
+void main() {
+    vec3 norm = world_normal * 0.5 + 0.5;
+    float grey = 0.21 * norm.r + 0.71 * norm.g + 0.07 * norm.b;
+    fragColor = texture(p3d_Texture0, texcoord) * vertex_color * p3d_ColorScale * vec4(grey, grey, grey, 1);
+}
+'''
+
+
+class InstancedBatch:
+    def __init__(self, template, positions, color=None, parent=None, name='instanced_batch'):
+        """template: a NodePath to copy (an Entity at the origin with the model, rotation, scale and color
+        every instance should have), or None for an empty batch. Its transform relative to parent is baked in."""
+        from array import array
+        from panda3d.core import BoundingBox, GeomEnums, Point3, Shader, Texture
+        from ursina import scene
+        parent = parent if parent is not None else scene
+        self.positions = [tuple(p) for p in positions]
+        self.count = len(self.positions)
+        self.node = parent.attachNewNode(name)
+
+        if template is not None and self.count:
+            copy = template.copyTo(self.node)
+            copy.setTransform(template.getTransform(parent))
+            self.node.flattenStrong()
+            lo, hi = self.node.getTightBounds() or (Point3(0), Point3(0))
+        else:
+            lo = hi = Point3(0)
+
+        data = array('f')
+        for x, y, z in self.positions:
+            data.extend((x, y, z, 1.0))
+        self.buffer = Texture(name)
+        self.buffer.setupBufferTexture(max(1, self.count), Texture.T_float, Texture.F_rgba32, GeomEnums.UH_dynamic)
+        if self.count:
+            self.buffer.setRamImage(data.tobytes())
+
+        self.node.setInstanceCount(self.count)
+        # priority over whatever shader the template carried
+        self.node.setShader(Shader.make(Shader.SL_GLSL, _VERTEX, _FRAGMENT), 10)
+        self.node.setShaderInput('instances', self.buffer)
+        if color is not None:
+            self.node.setColorScale(color, 10)
+        if self.count:
+            xs, ys, zs = zip(*self.positions)
+            bounds = BoundingBox(Point3(min(xs) + lo[0], min(ys) + lo[1], min(zs) + lo[2]),
+                                 Point3(max(xs) + hi[0], max(ys) + hi[1], max(zs) + hi[2]))
+            self.node.node().setBounds(bounds)
+            self.node.node().setFinal(True)
+        self.visible = bytearray(b'\x01') * self.count
+
+    def _set_scale(self, i, scale):
+        memoryview(self.buffer.modifyRamImage()).cast('f')[i * 4 + 3] = scale
+
+    def instances(self):
+        """Writable (count, 4) float32 numpy view of the (x, y, z, scale) rows, for moving many instances at once"""
+        import numpy as np
+        return np.frombuffer(self.buffer.modifyRamImage(), np.float32).reshape(-1, 4)
+
+    def hide(self, i):
+        if self.visible[i]:
+            self.visible[i] = 0
+            self._set_scale(i, 0.0)
+
+    def show(self, i):
+        if not self.visible[i]:
+            self.visible[i] = 1
+            self._set_scale(i, 1.0)
+
+    def remove(self):
+        self.node.removeNode()
@@ -0,0 +1,351 @@
+# microbench.py
+# Microbenchmarks for the engine hot paths, with per-commit baselines.
+#
+# Each case times one hot function on its own, at a few scene sizes, in a
+# headless Ursina app (no window, no GPU needed): homing target searches,
+# the two marching raycasts, particle updates, both ways rings get
+# collected and the 2D Astra controller. A measurement is `repeat` samples
+# of the mean time per call, each sample long enough (min_time) to swamp
+# timer noise, taken after a warm-up.
+#
+# Results are saved as microbench_results/<commit>.json (with '-dirty'
+# when the work tree has uncommitted changes) and compared with a baseline,
+# by default the most recent other results file. A case is flagged when its
+# median moved by more than `threshold` and a Mann-Whitney U test on the two
+# sets of samples says the shift is real (p < alpha). Any regression makes
+# the run exit with status 1, so a hook or CI job can fail on it.
+#
+# Scripts that build their app at import time (robo2d.py, enginedeepseek
+# +4.1.py) are run only up to the statement that creates the Ursina app, so
+# their classes can be benchmarked without it.
+#
+# Usage: python microbench.py [--quick] [--only NAME[,NAME]] [--baseline COMMIT|FILE] [--no-save]
+
+import ast
+import json
+import math
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import types
+from pathlib import Path
+
+import numpy as np
+
+HERE = Path(__file__).resolve().parent
+RESULTS = HERE / 'microbench_results'
+_loaded = {}
+
+
+def load_definitions(filename):
+    """Run a script up to the statement that creates the Ursina app and return it as a module"""
+    if filename in _loaded:
+        return _loaded[filename]
+    path = HERE / filename
+    tree = ast.parse(path.read_text(encoding='utf-8'), str(path))
+    body = []
+    for node in tree.body:
+        if not isinstance(node, (ast.FunctionDef, ast.ClassDef)) and any(
+                isinstance(n, ast.Call) and isinstance(n.func, ast.Name) and n.func.id == 'Ursina'
+                for n in ast.walk(node)):
+            break
+        body.append(node)
+    tree.body = body
+    module = types.ModuleType(path.stem.replace('.', '_'))
+    module.__file__ = str(path)
+    if str(HERE) not in sys.path:
+        sys.path.insert(0, str(HERE))
+    exec(compile(tree, str(path), 'exec'), module.__dict__)
+    _loaded[filename] = module
+    return module
+
+
+class _Box:
+    """Axis-aligned box with the intersects_point() the marching raycasts expect of a collider"""
+    def __init__(self, center, half):
+        self.lo = tuple(c - half for c in center)
+        self.hi = tuple(c + half for c in center)
+
+    def intersects_point(self, p):
+        lo, hi = self.lo, self.hi
+        return lo[0] <= p[0] <= hi[0] and lo[1] <= p[1] <= hi[1] and lo[2] <= p[2] <= hi[2]
+
+
+def _scatter(rng, count, area, y=1.0):
+    return [(rng.uniform(-area, area), y, rng.uniform(-area, area)) for _ in range(count)]
+
+
+# Every case: setup(size, rng) -> (run, cleanup). run() is the call being timed.
+
+def homing_target(size, rng):
+    from ursina import Entity, destroy
+    world = load_definitions('Sonic4k-4.20.25$1.0.py')
+    player = world.FangameCharacter(position=(0, 1, 0))
+    targets = [Entity(model='sphere', position=p, collider='sphere') for p in _scatter(rng, size, 30)]
+    player.potential_targets = targets
+
+    def cleanup():
+        for e in targets + [player]:
+            destroy(e)
+    return player._find_homing_target, cleanup
+
+
+def homing_target_los(size, rng):
+    from ursina import Entity, destroy
+    toon = load_definitions('T00nEnginev0.py')
+    player = Entity(model='sphere', position=(0, 1, 0), collider='sphere')
+    player.homing_range = 20
+    player.homing_angle_limit = 70
+    # half the targets in front of the player, so the cone test passes and line of sight gets checked
+    targets = [Entity(model='sphere', position=(x, y, abs(z)), collider='sphere') for x, y, z in _scatter(rng, size, 25)]
+    player.potential_targets = targets
+
+    def cleanup():
+        for e in targets + [player]:
+            destroy(e)
+    return lambda: toon._find_homing_target(player), cleanup
+
+
+def _raycast_case(physics, size, rng):
+    from ursina import Vec3
+    physics.colliders = [_Box(p, 1.0) for p in _scatter(rng, size, 40)]
+    origin = Vec3(0, 30, 0)  # above everything: every step checks every collider, the worst case
+    direction = Vec3(1, 0, 0.3)
+    return lambda: physics.raycast(origin, direction, distance=10), lambda: None
+
+
+def physics_raycast(size, rng):
+    return _raycast_case(load_definitions('deepseek_ai_sonic.a.py').PhysicsSystem(), size, rng)
+
+
+def adventure_raycast(size, rng):
+    return _raycast_case(load_definitions('TeamFlamesEZSonicengine4k.py').AdventurePhysicsSystem(), size, rng)
+
+
+def particle_update(size, rng):
+    from ursina import Vec3
+    engine = load_definitions('deepseek_ai_sonic.a.py')
+    system = engine.ParticleSystem(Vec3(0, 0, 0), count=size, lifetime=1e9)
+    return lambda: system.update(1 / 60), lambda: None
+
+
+def ring_collect_sweep(size, rng):
+    # SonicFangameWorld._tick: every train sweeps the kitty's path this tick
+    import ring_train
+    trains = []
+    for _ in range(max(1, size // 20)):
+        x, z = rng.uniform(-100, 100), rng.uniform(-100, 100)
+        a = rng.uniform(0, math.tau)
+        trains.append(ring_train.RingTrain([(x, 1, z), (x + math.cos(a) * 38, 1, z + math.sin(a) * 38)], spacing=2))
+    path = _scatter(rng, 512, 100)
+    ticks = iter(range(1 << 62))
+
+    def run():
+        i = next(ticks) % (len(path) - 1)
+        start, end = path[i], path[i + 1]
+        for train in trains:
+            for k in train.collect(start, end, 0.65):
+                train.collected[k] = 0  # put it back, so every call does the same work
+                train.remaining += 1
+    return run, lambda: None
+
+
+def ring_collect_intersects(size, rng):
+    # the older worlds' _game_update: one intersects() per ring per frame
+    from ursina import Entity, destroy
+    character = Entity(model='sphere', scale=0.8, position=(0, 3, 0), collider='sphere')
+    rings = [Entity(model='sphere', scale=0.5, position=p, collider='sphere') for p in _scatter(rng, size, 30, y=1)]
+
+    def run():
+        for ring in rings:
+            if character.intersects(ring).hit:
+                pass
+
+    def cleanup():
+        for e in rings + [character]:
+            destroy(e)
+    return run, cleanup
+
+
+def astra_update(size, rng):
+    # Astra collides with the stage's solid tiles, size is the stage width in columns
+    from ursina import Vec3, destroy, time as utime
+    from sprite_atlas import SpriteBatch, astra_atlas
+    from tilemap import Tilemap, placeholder_tileset, sample_stage
+    robo = load_definitions('robo2d.py')
+    stage = Tilemap(sample_stage(size, 64, seed=rng.randrange(1 << 30)), placeholder_tileset())
+    column = size // 2
+    row = int(stage.layers['foreground'].tiles[:, column].nonzero()[0].max()) + 1
+    folder = tempfile.mkdtemp()
+    sprites = SpriteBatch(astra_atlas(folder), capacity=1)
+    astra = robo.Astra(sprites, stage)
+    astra.position = astra.spawn = Vec3(column + 0.5, row + 1, 0)
+    utime.dt = 1 / 60
+
+    def cleanup():
+        destroy(astra)
+        stage.root.removeNode()
+        sprites.node.removeNode()
+        shutil.rmtree(folder, ignore_errors=True)
+    return astra.update, cleanup
+
+
+CASES = {
+    'homing_target': (homing_target, (10, 100, 1000)),
+    'homing_target_los': (homing_target_los, (10, 100, 1000)),
+    'physics_raycast': (physics_raycast, (1, 10, 100)),
+    'adventure_raycast': (adventure_raycast, (1, 10, 100)),
+    'particle_update': (particle_update, (50, 500, 5000)),
+    'ring_collect_sweep': (ring_collect_sweep, (100, 1000, 10000)),
+    'ring_collect_intersects': (ring_collect_intersects, (10, 100, 1000)),
+    'astra_update': (astra_update, (100, 1000, 10000)),
+}
+
+
+def measure(run, repeat=15, min_time=0.02, warmup=0.05):
+    """Mean seconds per call, `repeat` times"""
+    start = time.perf_counter()
+    calls = 0
+    while time.perf_counter() - start < warmup or calls < 1:
+        run()
+        calls += 1
+    number = max(1, math.ceil(min_time / ((time.perf_counter() - start) / calls)))
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            run()
+        samples.append((time.perf_counter() - start) / number)
+    return samples
+
+
+def mann_whitney(a, b):
+    """Two-sided p-value that a and b come from the same distribution (normal approximation, tie-corrected)"""
+    a, b = np.asarray(a, float), np.asarray(b, float)
+    n1, n2 = len(a), len(b)
+    values = np.concatenate([a, b])
+    order = np.argsort(values, kind='mergesort')
+    ranks = np.empty(len(values))
+    ranks[order] = np.arange(1, len(values) + 1)
+    _, inverse, counts = np.unique(values, return_inverse=True, return_counts=True)
+    ranks = np.bincount(inverse, ranks)[inverse] / counts[inverse]  # ties share their average rank
+    u = ranks[:n1].sum() - n1 * (n1 + 1) / 2
+    n = n1 + n2
+    tie = (counts ** 3 - counts).sum() / (n * (n - 1))
+    sigma = math.sqrt(n1 * n2 / 12 * (n + 1 - tie))
+    if sigma == 0:
+        return 1.0
+    z = (abs(u - n1 * n2 / 2) - 0.5) / sigma
+    return math.erfc(max(z, 0.0) / math.sqrt(2))
+
+
+def _git(*args):
+    try:
+        return subprocess.run(('git',) + args, cwd=HERE, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def current_commit():
+    commit = _git('rev-parse', 'HEAD')
+    if commit is None:
+        return 'unversioned', False
+    return commit, bool(_git('status', '--porcelain', '--untracked-files=no'))
+
+
+def find_baseline(reference, exclude):
+    """Results of a commit (prefix) or file, or the newest saved results other than `exclude`"""
+    if reference:
+        path = Path(reference)
+        if path.is_file():
+            return json.loads(path.read_text())
+        matches = sorted(RESULTS.glob(f'{reference}*.json'), key=lambda p: p.stat().st_mtime)
+        if not matches:
+            raise SystemExit(f"no saved microbenchmark results for '{reference}'")
+        return json.loads(matches[-1].read_text())
+    files = sorted((p for p in RESULTS.glob('*.json') if p.name != exclude), key=lambda p: p.stat().st_mtime)
+    return json.loads(files[-1].read_text()) if files else None
+
+
+def compare(results, baseline, threshold=0.10, alpha=0.01):
+    """Rows of (key, median, base median, change, p, verdict). verdict is '', 'REGRESSION' or 'faster'"""
+    rows = []
+    for key, entry in results.items():
+        base = baseline['results'].get(key) if baseline else None
+        if base is None:
+            rows.append((key, entry['median'], None, None, None, 'new'))
+            continue
+        change = entry['median'] / base['median'] - 1
+        p = mann_whitney(entry['samples'], base['samples'])
+        verdict = ''
+        if p < alpha and abs(change) > threshold:
+            verdict = 'REGRESSION' if change > 0 else 'faster'
+        rows.append((key, entry['median'], base['median'], change, p, verdict))
+    return rows
+
+
+def run_suite(names=None, quick=False, seed=1):
+    from ursina import Ursina
+    Ursina(window_type='none')
+    repeat, min_time = (7, 0.005) if quick else (15, 0.02)
+    results = {}
+    for name, (setup, sizes) in CASES.items():
+        if names and name not in names:
+            continue
+        for size in sizes:
+            run, cleanup = setup(size, random.Random(seed))
+            try:
+                samples = measure(run, repeat, min_time)
+            finally:
+                cleanup()
+            key = f'{name}[{size}]'
+            results[key] = dict(samples=samples, median=float(np.median(samples)),
+                                iqr=float(np.subtract(*np.percentile(samples, [75, 25]))))
+            print(f'  {key:<32} {results[key]["median"] * 1e6:>12.2f} us', flush=True)
+    return results
+
+
+def main(args):
+    quick = '--quick' in args
+    names = set(args[args.index('--only') + 1].split(',')) if '--only' in args else None
+    reference = args[args.index('--baseline') + 1] if '--baseline' in args else None
+    unknown = (names or set()) - set(CASES)
+    if unknown:
+        raise SystemExit(f"unknown case(s): {', '.join(sorted(unknown))} (have: {', '.join(CASES)})")
+
+    commit, dirty = current_commit()
+    filename = f"{commit[:12]}{'-dirty' if dirty else ''}.json"
+    print(f"microbenchmarks at {commit[:12]}{' (uncommitted changes)' if dirty else ''}")
+    results = run_suite(names, quick)
+    baseline = find_baseline(reference, filename)
+
+    print()
+    if baseline:
+        print(f"against {baseline['commit'][:12]}{' (dirty)' if baseline['dirty'] else ''} from {baseline['date']}")
+    print(f"{'case':<32} {'median us':>12} {'baseline us':>12} {'change':>8} {'p':>8}")
+    rows = compare(results, baseline)
+    for key, median, base, change, p, verdict in rows:
+        if base is None:
+            print(f'{key:<32} {median * 1e6:>12.2f} {"-":>12} {"-":>8} {"-":>8}  {verdict}')
+        else:
+            print(f'{key:<32} {median * 1e6:>12.2f} {base * 1e6:>12.2f} {change * 100:>+7.1f}% {p:>8.4f}  {verdict}')
+
+    if '--no-save' not in args:
+        RESULTS.mkdir(exist_ok=True)
+        record = dict(commit=commit, dirty=dirty, date=time.strftime('%Y-%m-%d %H:%M:%S'),
+                      python=platform.python_version(), machine=platform.platform(), quick=quick, results=results)
+        (RESULTS / filename).write_text(json.dumps(record, indent=1))
+        print(f'saved {RESULTS.name}/{filename}')
+
+    regressions = [row[0] for row in rows if row[5] == 'REGRESSION']
+    if regressions:
+        print(f"{len(regressions)} regression(s): {', '.join(regressions)}")
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
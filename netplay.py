@@ -0,0 +1,606 @@
+# netplay.py
+# Local-loopback multiplayer for SonicFangameWorld.
+#
+# One world is the server: it simulates everything, the host's own kitty
+# included, and every client that says hello gets a Racer (an extra kitty
+# steered by the keys it sends). Clients run the same level but simulate
+# nothing, they only draw what the server tells them. All traffic is UDP on
+# 127.0.0.1 and every message is a single datagram:
+#
+#     HELLO     client -> server   'H'
+#     WELCOME   server -> client   'W' slot, max players, ring count, enemy count, flag count, tick rate
+#     INPUT     client -> server   'I' input seq, control bitmask, camera yaw, newest snapshot seq it has
+#     SNAPSHOT  server -> client   'S' snapshot seq, base seq, varint payload
+#     BYE       client -> server   'B'
+#
+# A snapshot is one int64 vector in the fixed SnapshotLayout: the tick,
+# then per player slot (active, x, y, z, yaw, state, rings, score) with
+# positions in 1/64 units and yaw in 1/65536 turns, the collected bits of
+# every ring packed 32 to a word, (alive, x, z) per badnik, and the monitor
+# and checkpoint bits. It is sent snapshot_rate times a second as a delta
+# against the newest snapshot that client acknowledged (or against zeros if
+# that one fell out of the history): the indices and values that differ,
+# as one varint stream [count, index gaps..., zigzagged differences...].
+# Standing kitties, rings nobody touched and dead badniks cost nothing, so a
+# typical delta is a few dozen bytes where the full vector is a few KiB.
+# Varints are packed and unpacked with NumPy a byte column at a time, and
+# clients acking the same base share one encoding.
+#
+# Clients keep their own history of decoded snapshots and draw a little in
+# the past (`delay`), blending positions between the two snapshots around
+# the render tick, so 20 snapshots a second still move smoothly.
+#
+# Usage: python netplay.py server [port] | client [host] port | bench [clients]
+
+import socket
+import struct
+import time
+
+import numpy as np
+
+from input_replay import pack_input, unpack_input
+
+CHARACTER_STATES = ('idle', 'walking', 'running', 'rolling', 'boosting', 'jumping', 'spinning', 'stomping', 'homing')
+POSITION_SCALE = 64.0
+YAW_SCALE = 65536 / 360
+
+HELLO = b'H'
+WELCOME = b'W'
+INPUT = b'I'
+SNAPSHOT = b'S'
+BYE = b'B'
+
+_WELCOME = struct.Struct('<cBBIHHH')  # type, slot, max players, rings, enemies, flags, tick rate
+_INPUT = struct.Struct('<cIHHi')      # type, input seq, control mask, yaw, acked snapshot seq (-1 none)
+_SNAPSHOT = struct.Struct('<cIi')     # type, seq, base seq (-1 means against zeros)
+MAX_DATAGRAM = 65507
+
+
+def encode_varints(values):
+    """Unsigned LEB128 of a uint64 array, as bytes"""
+    values = np.asarray(values, np.uint64)
+    if not len(values):
+        return b''
+    sizes = np.ones(len(values), np.int64)
+    for bits in range(7, 64, 7):
+        sizes += values >= np.uint64(1 << bits)
+    ends = np.cumsum(sizes)
+    starts = ends - sizes
+    out = np.zeros(int(ends[-1]), np.uint8)
+    for j in range(int(sizes.max())):
+        more = sizes > j
+        chunk = (values[more] >> np.uint64(7 * j)) & np.uint64(0x7f)
+        out[starts[more] + j] = chunk.astype(np.uint8) | np.where(sizes[more] > j + 1, 0x80, 0).astype(np.uint8)
+    return out.tobytes()
+
+
+def decode_varints(data):
+    """uint64 array back from encode_varints()"""
+    data = np.frombuffer(data, np.uint8)
+    ends = np.flatnonzero(data < 0x80)
+    if not len(ends):
+        return np.zeros(0, np.uint64)
+    starts = np.concatenate(([0], ends[:-1] + 1))
+    sizes = ends - starts + 1
+    values = np.zeros(len(ends), np.uint64)
+    for j in range(int(sizes.max())):
+        more = sizes > j
+        values[more] |= (data[starts[more] + j] & 0x7f).astype(np.uint64) << np.uint64(7 * j)
+    return values
+
+
+def encode_delta(state, base):
+    """The entries of state that differ from base, as a varint stream"""
+    diff = state - base
+    index = np.flatnonzero(diff)
+    gaps = np.diff(index, prepend=-1) - 1
+    zigzag = (diff[index] << 1) ^ (diff[index] >> 63)
+    return encode_varints(np.concatenate(([len(index)], gaps, zigzag)).astype(np.uint64))
+
+
+def decode_delta(payload, base):
+    """base with the differences from encode_delta() applied, as a new array"""
+    values = decode_varints(payload)
+    count = int(values[0]) if len(values) else 0
+    index = np.cumsum(values[1:1 + count].astype(np.int64) + 1) - 1
+    zigzag = values[1 + count:1 + 2 * count]
+    diff = (zigzag >> np.uint64(1)).astype(np.int64) ^ -(zigzag & np.uint64(1)).astype(np.int64)
+    state = base.copy()
+    state[index] += diff
+    return state
+
+
+def pack_bits(bits, words):
+    """A 0/1 uint8 array as `words` 32-bit words (in an int64 array)"""
+    packed = np.zeros(words * 4, np.uint8)
+    data = np.packbits(bits, bitorder='little')
+    packed[:len(data)] = data
+    return packed.view('<u4').astype(np.int64)
+
+
+def unpack_bits(words, count):
+    return np.unpackbits(words.astype('<u4').view(np.uint8), bitorder='little')[:count]
+
+
+class SnapshotLayout:
+    PLAYER = 8  # active, x, y, z, yaw, state, rings, score
+    ENEMY = 3   # alive, x, z
+
+    def __init__(self, max_players, ring_count, enemy_count, flag_count):
+        self.max_players = max_players
+        self.ring_count = ring_count
+        self.enemy_count = enemy_count
+        self.flag_count = flag_count
+        self.players = 1
+        self.rings = self.players + max_players * self.PLAYER
+        self.enemies = self.rings + (ring_count + 31) // 32
+        self.flags = self.enemies + enemy_count * self.ENEMY
+        self.width = self.flags + (flag_count + 31) // 32
+
+    def player_rows(self, state):
+        return state[self.players:self.rings].reshape(self.max_players, self.PLAYER)
+
+    def enemy_rows(self, state):
+        return state[self.enemies:self.flags].reshape(self.enemy_count, self.ENEMY)
+
+    def ring_bits(self, state):
+        return unpack_bits(state[self.rings:self.enemies], self.ring_count)
+
+    def flag_bits(self, state):
+        return unpack_bits(state[self.flags:self.width], self.flag_count)
+
+
+class Peer:
+    __slots__ = ('address', 'slot', 'racer', 'input_seq', 'ack', 'last_seen')
+
+    def __init__(self, address, slot, racer):
+        self.address = address
+        self.slot = slot
+        self.racer = racer
+        self.input_seq = -1
+        self.ack = -1
+        self.last_seen = time.monotonic()
+
+
+class NetServer:
+    def __init__(self, world, port=0, snapshot_rate=20, max_players=16, history=64, timeout=5.0):
+        self.world = world
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind(('127.0.0.1', port))
+        self.sock.setblocking(False)
+        self.address = self.sock.getsockname()
+        self.control_names = sorted(world.controls)
+        self.timeout = timeout
+        self.interval = max(1, round(world.clock.rate / snapshot_rate))
+
+        self.rings = [(train, k) for train in world.ring_trains for k in range(len(train.collected))]
+        flags = len(world.monitor_roster) + len(world.checkpoints)
+        # slot 0 is the host's own kitty, clients get the rest
+        self.layout = SnapshotLayout(max_players, len(self.rings), len(world.enemy_roster), flags)
+        self.peers = {}
+        self.free_slots = list(range(1, max_players))
+
+        self.history = np.zeros((history, self.layout.width), np.int64)
+        self.history_seq = np.full(history, -1, np.int64)
+        self.zeros = np.zeros(self.layout.width, np.int64)
+        self.seq = -1
+        self.next_tick = 0
+
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.snapshots_sent = 0
+        self.encodes = 0
+        self.encode_time = 0.0
+        self.capture_time = 0.0
+
+    def _send(self, data, address):
+        self.sock.sendto(data, address)
+        self.bytes_sent += len(data)
+
+    def _welcome(self, peer):
+        layout = self.layout
+        self._send(_WELCOME.pack(WELCOME, peer.slot, layout.max_players, layout.ring_count, layout.enemy_count,
+                                 layout.flag_count, round(self.world.clock.rate)), peer.address)
+
+    def poll(self):
+        """Read every waiting datagram: joins, inputs and leaves"""
+        now = time.monotonic()
+        while True:
+            try:
+                data, address = self.sock.recvfrom(MAX_DATAGRAM)
+            except (BlockingIOError, ConnectionResetError):
+                break
+            self.bytes_received += len(data)
+            kind = data[:1]
+            peer = self.peers.get(address)
+            if kind == HELLO:
+                if peer is None:
+                    if not self.free_slots:
+                        continue  # full, they can keep knocking
+                    slot = self.free_slots.pop(0)
+                    x, y, z = self._spawn_point(slot)
+                    peer = self.peers[address] = Peer(address, slot, self.world.add_racer((x, y, z)))
+                peer.last_seen = now
+                self._welcome(peer)
+            elif peer is None:
+                continue
+            elif kind == INPUT and len(data) == _INPUT.size:
+                _, seq, mask, yaw, ack = _INPUT.unpack(data)
+                peer.last_seen = now
+                if seq > peer.input_seq:
+                    peer.input_seq = seq
+                    unpack_input(mask, peer.racer.keys, self.world.controls, self.control_names)
+                    peer.racer.view.yaw = yaw / YAW_SCALE
+                if ack > peer.ack:
+                    peer.ack = ack
+            elif kind == BYE:
+                self._drop(peer)
+        for peer in [p for p in self.peers.values() if now - p.last_seen > self.timeout]:
+            self._drop(peer)
+
+    def _spawn_point(self, slot):
+        x, y, z = self.world.character.spawn_point
+        return x + (slot % 4) * 2.0, y, z + (slot // 4) * 2.0
+
+    def _drop(self, peer):
+        del self.peers[peer.address]
+        self.world.remove_racer(peer.racer)
+        self.free_slots.append(peer.slot)
+        self.free_slots.sort()
+
+    def capture(self, out):
+        """Quantise the world's simulated state into out"""
+        from ursina import color
+        world = self.world
+        layout = self.layout
+        out[0] = world.tick
+        players = layout.player_rows(out)
+        players[:] = 0
+        entries = [(0, world.character, world.ring_count, world.score)]
+        entries += [(p.slot, p.racer.character, p.racer.ring_count, p.racer.score) for p in self.peers.values()]
+        for slot, c, rings, score in entries:
+            x, y, z, h, _, _ = world.interpolation.current(c)
+            state = c.body.state
+            players[slot] = (1, round(x * POSITION_SCALE), round(y * POSITION_SCALE), round(z * POSITION_SCALE),
+                             round(h * YAW_SCALE) % 65536,
+                             CHARACTER_STATES.index(state) if state in CHARACTER_STATES else 0, rings, score)
+        collected = np.concatenate([np.frombuffer(train.collected, np.uint8) for train in world.ring_trains]) \
+            if world.ring_trains else np.zeros(0, np.uint8)
+        out[layout.rings:layout.enemies] = pack_bits(collected, layout.enemies - layout.rings)
+        enemies = layout.enemy_rows(out)
+        for i, enemy in enumerate(world.enemy_roster):
+            badnik = world.badniks.badniks.get(id(enemy))
+            if badnik is None:
+                enemies[i] = 0
+            else:
+                enemies[i] = (1, round(badnik.x * POSITION_SCALE), round(badnik.z * POSITION_SCALE))
+        flags = [monitor.enabled for monitor in world.monitor_roster]
+        flags += [cp.color == color.lime for cp in world.checkpoints]
+        out[layout.flags:layout.width] = pack_bits(np.array(flags, np.uint8), layout.width - layout.flags)
+        return out
+
+    def update(self):
+        """Send a snapshot to every client if the world has ticked far enough since the last one"""
+        if self.world.tick < self.next_tick:
+            return False
+        self.next_tick = self.world.tick + self.interval
+        start = time.perf_counter()
+        self.seq += 1
+        slot = self.seq % len(self.history)
+        state = self.capture(self.history[slot])
+        self.history_seq[slot] = self.seq
+        self.capture_time += time.perf_counter() - start
+
+        encoded = {}
+        for peer in list(self.peers.values()):
+            base_seq = peer.ack
+            if base_seq < 0 or self.history_seq[base_seq % len(self.history)] != base_seq:
+                base_seq = -1
+            data = encoded.get(base_seq)
+            if data is None:
+                start = time.perf_counter()
+                base = self.zeros if base_seq < 0 else self.history[base_seq % len(self.history)]
+                data = encoded[base_seq] = _SNAPSHOT.pack(SNAPSHOT, self.seq, base_seq) + encode_delta(state, base)
+                self.encode_time += time.perf_counter() - start
+                self.encodes += 1
+            self._send(data, peer.address)
+            self.snapshots_sent += 1
+        return True
+
+    def frame(self):
+        """Once a frame, after the world's update: read inputs, send snapshots"""
+        self.poll()
+        self.update()
+
+    def stats(self):
+        return dict(peers=len(self.peers), snapshots=self.seq + 1, sent=self.snapshots_sent, encodes=self.encodes,
+                    bytes_sent=self.bytes_sent, bytes_received=self.bytes_received,
+                    full_bytes=self.layout.width * 8,
+                    encode_us=self.encode_time / self.encodes * 1e6 if self.encodes else 0.0,
+                    capture_us=self.capture_time / (self.seq + 1) * 1e6 if self.seq >= 0 else 0.0)
+
+    def close(self):
+        self.sock.close()
+
+
+class NetClient:
+    def __init__(self, address, history=64, hello_interval=0.5):
+        self.server = tuple(address)
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind(('127.0.0.1', 0))
+        self.sock.setblocking(False)
+        self.hello_interval = hello_interval
+        self.last_hello = -hello_interval
+        self.slot = None
+        self.layout = None
+        self.tick_rate = 60
+        self.history_size = history
+        self.input_seq = 0
+        self.latest = -1
+        self.render_tick = None
+        self.bytes_received = 0
+        self.bytes_sent = 0
+        self.snapshots = 0
+        self.dropped = 0
+
+    @property
+    def connected(self):
+        return self.layout is not None
+
+    def _send(self, data):
+        try:
+            self.sock.sendto(data, self.server)
+            self.bytes_sent += len(data)
+        except ConnectionRefusedError:
+            pass  # server not up yet, keep saying hello
+
+    def poll(self):
+        """Read every waiting datagram. Keeps saying hello until welcomed"""
+        if not self.connected and time.monotonic() - self.last_hello >= self.hello_interval:
+            self.last_hello = time.monotonic()
+            self._send(HELLO)
+        while True:
+            try:
+                data, _ = self.sock.recvfrom(MAX_DATAGRAM)
+            except (BlockingIOError, ConnectionRefusedError, ConnectionResetError):
+                break
+            self.bytes_received += len(data)
+            kind = data[:1]
+            if kind == WELCOME and not self.connected:
+                _, slot, max_players, rings, enemies, flags, rate = _WELCOME.unpack(data)
+                self.slot = slot
+                self.tick_rate = rate
+                self.layout = SnapshotLayout(max_players, rings, enemies, flags)
+                self.history = np.zeros((self.history_size, self.layout.width), np.int64)
+                self.history_seq = np.full(self.history_size, -1, np.int64)
+            elif kind == SNAPSHOT and self.connected:
+                self._receive(data)
+
+    def _receive(self, data):
+        _, seq, base_seq = _SNAPSHOT.unpack_from(data)
+        if seq <= self.latest:
+            return  # late or duplicate
+        size = self.history_size
+        if base_seq < 0:
+            base = np.zeros(self.layout.width, np.int64)
+        elif self.history_seq[base_seq % size] == base_seq:
+            base = self.history[base_seq % size]
+        else:
+            self.dropped += 1  # we never had its base, the next one will be against what we ack
+            return
+        self.history[seq % size] = decode_delta(data[_SNAPSHOT.size:], base)
+        self.history_seq[seq % size] = seq
+        self.latest = seq
+        self.snapshots += 1
+
+    def send_input(self, mask, yaw):
+        """Send the held controls and camera yaw (degrees), acknowledging the newest snapshot"""
+        if not self.connected:
+            return
+        self.input_seq += 1
+        self._send(_INPUT.pack(INPUT, self.input_seq, mask, round(yaw * YAW_SCALE) % 65536, self.latest))
+
+    def sample(self, dt, delay=0.1):
+        """The world state as a float64 vector, `delay` seconds behind the newest snapshot and blended between
+        the two snapshots around that moment. None before the first snapshot"""
+        if self.latest < 0:
+            return None
+        size = self.history_size
+        have = self.history_seq >= max(0, self.latest - size + 1)
+        slots = np.flatnonzero(have)
+        ticks = self.history[slots, 0]
+        order = np.argsort(ticks)
+        slots, ticks = slots[order], ticks[order]
+
+        target = ticks[-1] - delay * self.tick_rate
+        if self.render_tick is None or abs(self.render_tick - target) > self.tick_rate * 0.5:
+            self.render_tick = target
+        else:
+            # run at real time, drifting gently toward the target so jitter doesn't show
+            self.render_tick += dt * self.tick_rate
+            self.render_tick += (target - self.render_tick) * min(1.0, dt * 2)
+        r = min(max(self.render_tick, ticks[0]), ticks[-1])
+        i = int(np.searchsorted(ticks, r, side='right'))
+        a = self.history[slots[max(0, i - 1)]]
+        b = self.history[slots[min(i, len(slots) - 1)]]
+        t0, t1 = a[0], b[0]
+        t = (r - t0) / (t1 - t0) if t1 > t0 else 1.0
+
+        state = (b if t >= 1.0 else a).astype(np.float64)
+        layout = self.layout
+        pa, pb, out = layout.player_rows(a), layout.player_rows(b), layout.player_rows(state)
+        both = (pa[:, 0] == 1) & (pb[:, 0] == 1)
+        out[both, 1:4] = pa[both, 1:4] + (pb[both, 1:4] - pa[both, 1:4]) * t
+        turn = (pb[both, 4] - pa[both, 4] + 32768) % 65536 - 32768
+        out[both, 4] = (pa[both, 4] + turn * t) % 65536
+        ea, eb, out = layout.enemy_rows(a), layout.enemy_rows(b), layout.enemy_rows(state)
+        both = (ea[:, 0] == 1) & (eb[:, 0] == 1)
+        out[both, 1:] = ea[both, 1:] + (eb[both, 1:] - ea[both, 1:]) * t
+        return state
+
+    def close(self):
+        if self.connected:
+            self._send(BYE)
+        self.sock.close()
+
+    def stats(self):
+        return dict(slot=self.slot, snapshots=self.snapshots, dropped=self.dropped,
+                    bytes_received=self.bytes_received, bytes_sent=self.bytes_sent)
+
+
+class ClientView:
+    """Shows a NetClient's snapshots in a local world that simulates nothing itself"""
+    def __init__(self, world, client, delay=0.1):
+        from ursina import color
+        self.world = world
+        self.client = client
+        self.delay = delay
+        world.game_loop.update = self.update  # the server plays, we only watch and steer
+        world.interpolation.tracks.clear()
+        self.rings = [(train, k) for train in world.ring_trains for k in range(len(train.collected))]
+        self.bits = np.zeros(len(self.rings), np.uint8)
+        self.others = []
+        self.colors = [color.azure, color.orange, color.lime, color.magenta, color.yellow, color.cyan, color.red]
+        self.control_names = sorted(world.controls)
+
+    def update(self):
+        from ursina import Entity, Vec3, camera, held_keys, lerp, time
+        world = self.world
+        client = self.client
+        dt = time.dt
+        client.poll()
+        if held_keys[world.controls['camera_left']]:
+            world.camera_rig.rotation_y += 100 * dt
+        if held_keys[world.controls['camera_right']]:
+            world.camera_rig.rotation_y -= 100 * dt
+        client.send_input(pack_input(held_keys, world.controls, self.control_names), world.camera_rig.rotation_y)
+        state = client.sample(dt, self.delay)
+        if state is None:
+            return
+        layout = client.layout
+
+        players = layout.player_rows(state)
+        while len(self.others) < layout.max_players:
+            self.others.append(Entity(model='sphere', scale=(1, 2, 1), enabled=False,
+                                      color=self.colors[len(self.others) % len(self.colors)]))
+        for slot, (active, x, y, z, yaw, _, rings, score) in enumerate(players):
+            node = world.character if slot == client.slot else self.others[slot]
+            node.enabled = bool(active)
+            if active:
+                node.position = Vec3(x, y, z) / POSITION_SCALE
+                node.rotation_y = yaw / YAW_SCALE
+        me = players[client.slot]
+        world.ring_count, world.score = int(me[6]), int(me[7])
+
+        bits = layout.ring_bits(state.astype(np.int64))
+        batch = world.ring_trains[0].batch if world.ring_trains else None
+        for i in np.flatnonzero(bits != self.bits):
+            train, k = self.rings[i]
+            train.collected[k] = bits[i]
+            if batch is not None:
+                (batch.hide if bits[i] else batch.show)(train.first + k)
+        self.bits = bits
+
+        for enemy, (alive, x, z) in zip(world.enemy_roster, layout.enemy_rows(state)):
+            enemy.enabled = bool(alive)
+            if alive:
+                enemy.x, enemy.z = x / POSITION_SCALE, z / POSITION_SCALE
+        flags = layout.flag_bits(state.astype(np.int64))
+        for monitor, bit in zip(world.monitor_roster, flags):
+            monitor.enabled = bool(bit)
+
+        target = world.character.world_position + Vec3(0, 2, 0)
+        world.camera_rig.position = lerp(world.camera_rig.position, target, min(1, dt * 4))
+        camera.z = -15
+
+
+def _load_world_module():
+    import importlib.util
+    import sys
+    from pathlib import Path
+    here = Path(__file__).resolve().parent
+    sys.path.insert(0, str(here))
+    spec = importlib.util.spec_from_file_location('fangame_world', here / 'Sonic4k-4.20.25$1.0.py')
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def benchmark(clients=16, seconds=10, snapshot_rate=20, seed=1):
+    import random
+    module = _load_world_module()
+    world = module.SonicFangameWorld(headless=True)
+    world._use_fixed_dt(seed, 1 / 60)
+    server = NetServer(world, snapshot_rate=snapshot_rate, max_players=clients + 1)
+    bots = [NetClient(server.address) for _ in range(clients)]
+    for _ in range(50):
+        for bot in bots:
+            bot.poll()
+        server.poll()
+        if all(bot.connected for bot in bots):
+            break
+        time.sleep(0.01)
+    rng = random.Random(seed)
+    names = server.control_names
+    moves = [names.index(name) for name in ('left', 'right', 'up', 'down', 'jump', 'boost', 'spin_dash')]
+    masks = [0] * clients
+    yaws = [rng.uniform(0, 360) for _ in range(clients)]
+
+    ticks = int(seconds * 60)
+    sim = net = 0.0
+    worst = 0.0
+    for tick in range(ticks):
+        for i, bot in enumerate(bots):
+            bot.poll()
+            if tick % 30 == i % 30:
+                masks[i] = sum(1 << bit for bit in rng.sample(moves, 2))
+            bot.send_input(masks[i], yaws[i])
+            bot.sample(1 / 60)
+        start = time.perf_counter()
+        server.poll()
+        world.app.step()
+        middle = time.perf_counter()
+        server.update()
+        end = time.perf_counter()
+        sim += middle - start
+        net += end - middle
+        worst = max(worst, end - start)
+
+    stats = server.stats()
+    per_client = stats['bytes_sent'] / clients / seconds
+    snapshots = stats['sent'] / clients
+    sim_ms, net_ms = sim / ticks * 1000, net / ticks * 1000
+    received = sum(bot.snapshots for bot in bots)
+    print(f"{clients} clients, {seconds} s at 60 Hz, {snapshot_rate} snapshots/s, "
+          f"full snapshot {stats['full_bytes']} bytes ({server.layout.width} fields)")
+    print(f"down {per_client / 1024:.2f} KiB/s per client, {stats['bytes_sent'] / max(1, stats['sent']):.0f} bytes "
+          f"per snapshot on average, {received} of {stats['sent']} received, {snapshots:.0f} each")
+    print(f"capture {stats['capture_us']:.0f} us per snapshot, encode {stats['encode_us']:.0f} us per encoding, "
+          f"{stats['encodes']} encodings for {stats['sent']} sends "
+          f"({stats['encode_us'] * stats['encodes'] / max(1, stats['sent']):.1f} us per client)")
+    print(f"server: simulation {sim_ms:.2f} ms + network {net_ms:.2f} ms per tick (worst {worst * 1000:.2f} ms), "
+          f"{(sim_ms + net_ms) / (1000 / 60) * 100:.0f}% of a 60 Hz tick on one core")
+    for bot in bots:
+        bot.close()
+    server.close()
+
+
+if __name__ == '__main__':
+    import sys
+    args = sys.argv[1:]
+    mode = args[0] if args else 'bench'
+    if mode == 'server':
+        module = _load_world_module()
+        world = module.SonicFangameWorld()
+        server = NetServer(world, port=int(args[1]) if len(args) > 1 else 4711)
+        print(f'Serving on {server.address[0]}:{server.address[1]}, nya!')
+        module.Entity(update=server.frame)
+        world.run()
+    elif mode == 'client':
+        host, port = (args[1], int(args[2])) if len(args) > 2 else ('127.0.0.1', int(args[1]) if len(args) > 1 else 4711)
+        module = _load_world_module()
+        world = module.SonicFangameWorld()
+        ClientView(world, NetClient((host, port)))
+        world.run()
+    else:
+        benchmark(clients=int(args[1]) if len(args) > 1 else 16)
@@ -0,0 +1,189 @@
+# rewind_buffer.py
+# Last few seconds of gameplay state, restorable at any tick.
+#
+# The world flattens its gameplay state (not render nodes) into one float64
+# vector of fixed width every tick and hands it to RewindBuffer.record().
+# Every keyframe_interval ticks the whole vector is stored as a keyframe;
+# the ticks in between only store the entries that differ from their
+# keyframe, as (index, value) pairs. A tick therefore costs one vectorised
+# compare plus a copy of whatever changed. A delta with more than
+# max_changes entries is stored as a new keyframe instead.
+#
+# Everything lives in arrays allocated up front: a ring of `capacity` tick
+# slots (capacity = seconds * rate) and a smaller ring of keyframes, so
+# recording never allocates and the oldest ticks fall off by being
+# overwritten. Every delta is against its keyframe, never against the
+# previous tick, so restore(tick) is one keyframe copy plus one scatter,
+# however far back the tick is. Recording a tick at or before the newest one
+# (after a rewind) drops the ticks that came after it.
+#
+# Run this file to measure the snapshot cost on the fangame world.
+
+import time
+
+import numpy as np
+
+
+class RewindBuffer:
+    def __init__(self, width, seconds=5.0, rate=60, keyframe_interval=30, max_changes=None, keyframes=None):
+        self.width = width
+        self.rate = rate
+        self.capacity = max(1, int(seconds * rate))
+        self.keyframe_interval = keyframe_interval
+        self.max_changes = max_changes if max_changes is not None else max(1, width // 8)
+        # room for the regular keyframes of a full buffer, plus as many again for forced ones
+        key_count = keyframes if keyframes is not None else 2 * (self.capacity // keyframe_interval + 2)
+
+        self.keyframes = np.zeros((key_count, width), np.float64)
+        self.key_serials = np.full(key_count, -1, np.int64)
+        self.ticks = np.full(self.capacity, -1, np.int64)
+        self.key_of = np.zeros(self.capacity, np.int64)
+        self.counts = np.zeros(self.capacity, np.int32)
+        self.indices = np.zeros((self.capacity, self.max_changes), np.int32)
+        self.values = np.zeros((self.capacity, self.max_changes), np.float64)
+        self.state = np.zeros(width, np.float64)
+
+        self.newest = -1
+        self.key_serial = -1
+        self._since_key = 0
+        self.keyframe_count = 0
+        self.record_time = 0.0
+        self.record_max = 0.0
+        self.recorded = 0
+
+    @property
+    def nbytes(self):
+        return (self.keyframes.nbytes + self.key_serials.nbytes + self.ticks.nbytes + self.key_of.nbytes +
+                self.counts.nbytes + self.indices.nbytes + self.values.nbytes + self.state.nbytes)
+
+    def _new_keyframe(self, state):
+        self.key_serial += 1
+        slot = self.key_serial % len(self.keyframes)
+        self.keyframes[slot] = state
+        self.key_serials[slot] = self.key_serial
+        self._since_key = 0
+        self.keyframe_count += 1
+
+    def record(self, tick, state):
+        """Store state (a width-long float64 array) as tick"""
+        start = time.perf_counter()
+        keyframe = self.keyframes[self.key_serial % len(self.keyframes)]
+        if tick != self.newest + 1 or self.key_serial < 0 or self._since_key >= self.keyframe_interval:
+            changed = None
+        else:
+            changed = np.flatnonzero(state != keyframe)
+            if len(changed) > self.max_changes:
+                changed = None
+        if changed is None:
+            self._new_keyframe(state)
+            changed = ()
+        slot = tick % self.capacity
+        count = len(changed)
+        if count:
+            self.indices[slot, :count] = changed
+            self.values[slot, :count] = state[changed]
+        self.counts[slot] = count
+        self.key_of[slot] = self.key_serial
+        self.ticks[slot] = tick
+        self.newest = tick
+        self._since_key += 1
+
+        elapsed = time.perf_counter() - start
+        self.record_time += elapsed
+        self.record_max = max(self.record_max, elapsed)
+        self.recorded += 1
+
+    def available(self, tick):
+        if tick < 0 or tick > self.newest or tick <= self.newest - self.capacity:
+            return False
+        slot = tick % self.capacity
+        if self.ticks[slot] != tick:
+            return False
+        serial = self.key_of[slot]
+        return self.key_serials[serial % len(self.keyframes)] == serial
+
+    @property
+    def oldest(self):
+        """Oldest tick that can still be restored, or -1 when empty"""
+        tick = max(0, self.newest - self.capacity + 1)
+        while tick <= self.newest and not self.available(tick):
+            tick += 1
+        return tick if tick <= self.newest else -1
+
+    def restore(self, tick):
+        """The state recorded at tick, in a buffer reused by the next restore. Raises KeyError if it is gone"""
+        if not self.available(tick):
+            raise KeyError(f'tick {tick} is not in the rewind buffer')
+        slot = tick % self.capacity
+        state = self.state
+        state[:] = self.keyframes[self.key_of[slot] % len(self.keyframes)]
+        count = self.counts[slot]
+        if count:
+            state[self.indices[slot, :count]] = self.values[slot, :count]
+        return state
+
+    def clear(self):
+        self.ticks[:] = -1
+        self.key_serials[:] = -1
+        self.newest = -1
+        self.key_serial = -1
+        self._since_key = 0
+
+    def stats(self):
+        mean = self.record_time / self.recorded if self.recorded else 0.0
+        return dict(ticks=self.newest - self.oldest + 1 if self.newest >= 0 else 0, keyframes=self.keyframe_count,
+                    bytes=self.nbytes, record_ms=mean * 1000, record_max_ms=self.record_max * 1000,
+                    frame_fraction=mean * self.rate)
+
+
+def benchmark(ticks=1200, seed=1):
+    import importlib.util
+    import random
+    import sys
+    from pathlib import Path
+
+    here = Path(__file__).resolve().parent
+    sys.path.insert(0, str(here))
+    spec = importlib.util.spec_from_file_location('fangame_world', here / 'Sonic4k-4.20.25$1.0.py')
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+
+    world = module.SonicFangameWorld(headless=True)
+    world._use_fixed_dt(seed, 1 / 60)
+    rng = random.Random(seed)
+    keys = [world.controls[name] for name in ('left', 'right', 'up', 'down', 'jump', 'boost', 'spin_dash')]
+    capture = 0.0
+    for i in range(ticks):
+        if i % 20 == 0:
+            for k in keys:
+                module.held_keys[k] = 0
+            for k in rng.sample(keys, 2):
+                module.held_keys[k] = 1
+        world.app.step()
+        start = time.perf_counter()
+        world.capture_state()
+        capture += time.perf_counter() - start
+
+    rewind = world.rewind
+    stats = rewind.stats()
+    capture_ms = capture / ticks * 1000
+    total_ms = capture_ms + stats['record_ms']
+    print(f"state vector: {rewind.width} floats, {rewind.capacity} ticks ({rewind.capacity / rewind.rate:.0f} s) "
+          f"in {stats['bytes'] / 1024:.0f} KiB preallocated, {stats['keyframes']} keyframes written")
+    print(f"capture {capture_ms:.3f} ms + record {stats['record_ms']:.3f} ms (max {stats['record_max_ms']:.3f}) "
+          f"per tick = {total_ms / (1000 / rewind.rate) * 100:.1f}% of a {1000 / rewind.rate:.1f} ms frame")
+
+    # restore every tick from the oldest forward, then check the oldest round-trips through capture_state()
+    oldest = rewind.oldest
+    start = time.perf_counter()
+    for tick in range(oldest, rewind.newest + 1):
+        world.rewind_to(tick)
+    restore_ms = (time.perf_counter() - start) / (rewind.newest - oldest + 1) * 1000
+    world.rewind_to(oldest)
+    exact = np.array_equal(world.capture_state(), rewind.restore(oldest))
+    print(f"restore {restore_ms:.3f} ms per tick, rewinding to tick {oldest} of {rewind.newest} "
+          f"{'round-trips exactly' if exact else 'DOES NOT ROUND-TRIP'}")
+
+
+if __name__ == '__main__':
+    benchmark()
@@ -0,0 +1,201 @@
+# ring_magnet.py
+# Lightning-shield ring magnet: nearby rings fly to the player.
+#
+# Every ring of every RingTrain goes into a SpatialHash once. While the
+# shield is up, update() asks the hash for the rings within `radius` of the
+# player, so the per-frame cost follows the rings near the player and stays
+# flat with 10k rings in the level. Each ring it finds is taken off its
+# train (its collected bit is set, so the train's own sweep skips it) and
+# moves into the homing arrays: NumPy position and velocity rows that are
+# integrated together. A ring accelerates toward the player, turns harder
+# when it is moving away (the classic overshoot-and-swing), loses the part of
+# its velocity that is sideways to the player at `damping` per second (or it
+# could settle into an orbit) and is capped at max_speed. Once it is within
+# pickup_radius, update() reports it and the world pays it out exactly like
+# a normal pickup. Homing rings write their
+# positions straight into the trains' InstancedBatch (the one build_batch()
+# gave them all), if they have one.
+#
+# Run this file for a 10k ring benchmark.
+
+import numpy as np
+
+from spatial_hash import SpatialHash
+
+
+class RingMagnet:
+    def __init__(self, trains, radius=8.0, pickup_radius=0.65, accel=60.0, turn_boost=2.0, damping=3.0,
+                 max_speed=40.0, cell_size=8.0):
+        self.trains = trains
+        self.radius = radius
+        self.pickup_radius = pickup_radius
+        self.accel = accel
+        self.turn_boost = turn_boost
+        self.damping = damping
+        self.max_speed = max_speed
+        self.active = False
+
+        self.hash = SpatialHash(cell_size)
+        self.owners = []
+        for train in trains:
+            for k, (x, y, z) in enumerate(train.positions):
+                if not train.collected[k]:
+                    self.hash.insert(len(self.owners), x, y, z)
+                self.owners.append((train, k))
+
+        # rings currently homing in: ring key, batch row, position, velocity
+        self.keys = np.zeros(0, np.int64)
+        self.rows = np.zeros(0, np.int64)
+        self.pos = np.zeros((0, 3), np.float64)
+        self.vel = np.zeros((0, 3), np.float64)
+        self.attracted = 0
+        self.picked_up = 0
+
+    @property
+    def homing(self):
+        return len(self.keys)
+
+    def _attract(self, x, y, z):
+        new = []
+        for key in self.hash.query(x, y, z, self.radius):
+            self.hash.remove(key)
+            train, k = self.owners[key]
+            if train.collected[k]:
+                continue  # already swept up by the train itself
+            train.collected[k] = 1
+            train.remaining -= 1
+            new.append(key)
+        if new:
+            owners = [self.owners[key] for key in new]
+            self.keys = np.concatenate([self.keys, np.array(new, np.int64)])
+            self.rows = np.concatenate([self.rows, np.array([train.first + k for train, k in owners], np.int64)])
+            self.pos = np.concatenate([self.pos, np.array([train.positions[k] for train, k in owners])])
+            self.vel = np.concatenate([self.vel, np.zeros((len(new), 3))])
+            self.attracted += len(new)
+
+    def update(self, player_position, dt):
+        """Pull rings toward the player. Returns how many reached the player this tick"""
+        x, y, z = player_position[0], player_position[1], player_position[2]
+        if self.active:
+            self._attract(x, y, z)
+        if not len(self.keys):
+            return 0
+
+        to_player = np.array((x, y, z)) - self.pos
+        dist = np.sqrt((to_player * to_player).sum(axis=1))
+        direction = to_player / np.maximum(dist, 1e-6)[:, None]
+        # turn harder while flying away from the player and bleed off sideways speed, so rings swing back in
+        radial = (self.vel * direction).sum(axis=1)
+        accel = np.where(radial < 0, self.accel * self.turn_boost, self.accel)
+        sideways = self.vel - direction * radial[:, None]
+        self.vel -= sideways * min(1.0, self.damping * dt)
+        self.vel += direction * (accel * dt)[:, None]
+        speed = np.sqrt((self.vel * self.vel).sum(axis=1))
+        too_fast = speed > self.max_speed
+        if too_fast.any():
+            self.vel[too_fast] *= (self.max_speed / speed[too_fast])[:, None]
+        self.pos += self.vel * dt
+
+        to_player = np.array((x, y, z)) - self.pos
+        reached = (to_player * to_player).sum(axis=1) <= self.pickup_radius * self.pickup_radius
+        count = int(reached.sum())
+        batch = self.trains[0].batch if self.trains else None
+        if count:
+            if batch is not None:
+                for row in self.rows[reached]:
+                    batch.hide(int(row))
+            keep = ~reached
+            self.keys = self.keys[keep]
+            self.rows = self.rows[keep]
+            self.pos = self.pos[keep]
+            self.vel = self.vel[keep]
+            self.picked_up += count
+        if batch is not None and len(self.rows):
+            batch.instances()[self.rows, :3] = self.pos
+        return count
+
+    def reset(self):
+        """Put every ring back on its train (and in the index) and drop the ones in flight"""
+        for train in self.trains:
+            if train.batch is not None:
+                train.batch.instances()[train.first:train.first + len(train.positions), :3] = train.positions
+            train.reset()
+        for key, (train, k) in enumerate(self.owners):
+            self.hash.insert(key, *train.positions[k])
+        self.keys = self.keys[:0]
+        self.rows = self.rows[:0]
+        self.pos = self.pos[:0]
+        self.vel = self.vel[:0]
+
+    def restore(self, keys, pos, vel):
+        """Put back a set of rings in flight after the trains' collected bits were restored (a rewind):
+        uncollected rings return to the index, and the batch shows exactly the rings on trains or in flight"""
+        for key, (train, k) in enumerate(self.owners):
+            if not train.collected[k] and key not in self.hash:
+                self.hash.insert(key, *train.positions[k])
+        self.keys = np.array(keys, np.int64)
+        self.rows = np.array([self.owners[key][0].first + self.owners[key][1] for key in self.keys], np.int64)
+        self.pos = np.array(pos, np.float64).reshape(-1, 3)
+        self.vel = np.array(vel, np.float64).reshape(-1, 3)
+        for train in self.trains:
+            batch = train.batch
+            if batch is None:
+                continue
+            batch.instances()[train.first:train.first + len(train.positions), :3] = train.positions
+            for k, bit in enumerate(train.collected):
+                if bit:
+                    batch.hide(train.first + k)
+                else:
+                    batch.show(train.first + k)
+        batch = self.trains[0].batch if self.trains else None
+        if batch is not None and len(self.rows):
+            for row in self.rows:
+                batch.show(int(row))
+            batch.instances()[self.rows, :3] = self.pos
+
+    def stats(self):
+        return dict(active=self.active, indexed=len(self.hash), homing=len(self.keys),
+                    attracted=self.attracted, picked_up=self.picked_up)
+
+
+def benchmark(count=10000, ticks=600, area=400.0, seed=1):
+    import math
+    import random
+    import time
+    from ring_train import RingTrain
+    rng = random.Random(seed)
+    # 10k rings in trains of 20 scattered over the level
+    trains = []
+    for _ in range(count // 20):
+        x, z = rng.uniform(-area / 2, area / 2), rng.uniform(-area / 2, area / 2)
+        a = rng.uniform(0, math.tau)
+        trains.append(RingTrain([(x, 1, z), (x + math.cos(a) * 38, 1, z + math.sin(a) * 38)], spacing=2))
+    path = [(math.cos(t / ticks * math.tau) * area / 3, 1.0, math.sin(t / ticks * math.tau) * area / 3)
+            for t in range(ticks)]
+
+    positions = [p for train in trains for p in train.positions]
+    radius_sq = 8.0 * 8.0
+    start = time.perf_counter()
+    for x, y, z in path:
+        [p for p in positions if (p[0] - x) ** 2 + (p[1] - y) ** 2 + (p[2] - z) ** 2 <= radius_sq]
+    brute = (time.perf_counter() - start) / ticks * 1000
+
+    start = time.perf_counter()
+    magnet = RingMagnet(trains)
+    build = (time.perf_counter() - start) * 1000
+    magnet.active = True
+    times = []
+    for p in path:
+        start = time.perf_counter()
+        magnet.update(p, 1 / 60)
+        times.append(time.perf_counter() - start)
+    times.sort()
+    stats = magnet.stats()
+    print(f'{len(positions)} rings, {ticks} ticks, hash built in {build:.1f} ms')
+    print(f'distance check per ring: {brute:.3f} ms/tick')
+    print(f'magnet: mean {sum(times) / ticks * 1000:.3f} ms/tick, max {times[-1] * 1000:.3f} ms, '
+          f'{stats["attracted"]} attracted, {stats["picked_up"]} picked up')
+
+
+if __name__ == '__main__':
+    benchmark()
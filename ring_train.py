@@ -0,0 +1,246 @@
+# ring_train.py
+# Rings laid out along a path, collected by sweeping the player over it.
+#
+# A RingTrain is a polyline (or a Catmull-Rom spline through control points,
+# sampled into one) plus a spacing: rings sit every `spacing` units of arc
+# length from the start, or on the control points themselves when spacing is
+# None. Each ring is a bit in `collected`, not an entity.
+#
+# collect(start, end, radius) finds the rings the player's sphere touched on
+# its way from start to end this tick. It rejects the whole train on its
+# bounding box, then for each path segment the swept path comes within
+# radius of, projects the swept path onto the segment to get a window of arc
+# length, and only tests the rings whose parameter falls in that window (a
+# bisect into the sorted ring parameters). The cost follows the number of
+# segments in the train's path, not the number of rings, and a fast player
+# cannot skip a ring between two ticks.
+#
+# to_data() / from_data() give a plain dict (points, spacing, spline, closed
+# and, once anything is picked up, the collected bits as an int), which is
+# what fangame_level stores. build_batch() draws every ring of a list of
+# trains as one InstancedBatch.
+#
+# Run this file to compare pickup cost against one sphere test per ring.
+
+import math
+from bisect import bisect_left, bisect_right
+
+
+def _catmull_rom(points, closed, samples):
+    n = len(points)
+    out = []
+    last = n if closed else n - 1
+    for i in range(last):
+        p0 = points[(i - 1) % n] if closed or i > 0 else points[0]
+        p1 = points[i]
+        p2 = points[(i + 1) % n]
+        p3 = points[(i + 2) % n] if closed or i + 2 < n else points[-1]
+        for k in range(samples):
+            t = k / samples
+            t2 = t * t
+            t3 = t2 * t
+            out.append(tuple(0.5 * (2 * p1[a] + (p2[a] - p0[a]) * t + (2 * p0[a] - 5 * p1[a] + 4 * p2[a] - p3[a]) * t2
+                                    + (3 * p1[a] - p0[a] - 3 * p2[a] + p3[a]) * t3) for a in range(3)))
+    if not closed:
+        out.append(tuple(points[-1]))
+    return out
+
+
+def _segment_distance_sq(p, q, a, b):
+    """Squared distance between segments pq and ab, and the parameter on ab of the closest point"""
+    dx, dy, dz = q[0] - p[0], q[1] - p[1], q[2] - p[2]
+    ex, ey, ez = b[0] - a[0], b[1] - a[1], b[2] - a[2]
+    rx, ry, rz = p[0] - a[0], p[1] - a[1], p[2] - a[2]
+    dd = dx * dx + dy * dy + dz * dz
+    ee = ex * ex + ey * ey + ez * ez
+    de = dx * ex + dy * ey + dz * ez
+    dr = dx * rx + dy * ry + dz * rz
+    er = ex * rx + ey * ry + ez * rz
+    if dd <= 1e-12:
+        s = 0.0
+        t = min(1.0, max(0.0, er / ee)) if ee > 1e-12 else 0.0
+    else:
+        denom = dd * ee - de * de
+        s = min(1.0, max(0.0, (de * er - dr * ee) / denom)) if denom > 1e-12 else 0.0
+        t = (de * s + er) / ee if ee > 1e-12 else 0.0
+        if t < 0.0:
+            t = 0.0
+            s = min(1.0, max(0.0, -dr / dd))
+        elif t > 1.0:
+            t = 1.0
+            s = min(1.0, max(0.0, (de - dr) / dd))
+    cx = p[0] + dx * s - a[0] - ex * t
+    cy = p[1] + dy * s - a[1] - ey * t
+    cz = p[2] + dz * s - a[2] - ez * t
+    return cx * cx + cy * cy + cz * cz, t
+
+
+def _point_segment_distance_sq(c, p, q):
+    dx, dy, dz = q[0] - p[0], q[1] - p[1], q[2] - p[2]
+    rx, ry, rz = c[0] - p[0], c[1] - p[1], c[2] - p[2]
+    dd = dx * dx + dy * dy + dz * dz
+    s = min(1.0, max(0.0, (rx * dx + ry * dy + rz * dz) / dd)) if dd > 1e-12 else 0.0
+    rx -= dx * s
+    ry -= dy * s
+    rz -= dz * s
+    return rx * rx + ry * ry + rz * rz
+
+
+class RingTrain:
+    def __init__(self, points, spacing=None, spline=False, closed=False, samples=8):
+        self.points = [tuple(float(v) for v in p) for p in points]
+        self.spacing = spacing
+        self.spline = spline
+        self.closed = closed
+        self.samples = samples
+        if len(self.points) < 2:
+            raise ValueError('a ring train needs at least 2 points')
+
+        path = _catmull_rom(self.points, closed, samples) if spline else list(self.points)
+        if closed:
+            path.append(path[0])
+        self.path = path
+        self.lengths = [0.0]
+        for a, b in zip(path, path[1:]):
+            self.lengths.append(self.lengths[-1] + math.dist(a, b))
+        self.length = self.lengths[-1]
+
+        if spacing is None:
+            # rings on the control points, which are every `samples`-th path point of a spline
+            step = samples if spline else 1
+            count = len(self.points)
+            self.ring_s = [self.lengths[i * step] for i in range(count)]
+        else:
+            count = int(self.length / spacing + 1e-9) + 1
+            if closed and (count - 1) * spacing > self.length - spacing * 0.5:
+                count -= 1  # the last ring would sit on top of the first
+            self.ring_s = [i * spacing for i in range(count)]
+        self.positions = [self.point_at(s) for s in self.ring_s]
+        self.collected = bytearray(len(self.positions))
+        self.remaining = len(self.positions)
+
+        xs, ys, zs = zip(*path)
+        self.bounds = (min(xs), min(ys), min(zs), max(xs), max(ys), max(zs))
+        self.batch = None
+        self.first = 0
+
+    def point_at(self, s):
+        """Position at arc length s along the path"""
+        i = min(max(bisect_right(self.lengths, s) - 1, 0), len(self.path) - 2)
+        span = self.lengths[i + 1] - self.lengths[i]
+        t = (s - self.lengths[i]) / span if span else 0.0
+        a, b = self.path[i], self.path[i + 1]
+        return (a[0] + (b[0] - a[0]) * t, a[1] + (b[1] - a[1]) * t, a[2] + (b[2] - a[2]) * t)
+
+    def collect(self, start, end, radius):
+        """Indices of the rings a sphere of radius touched moving from start to end. They are marked collected"""
+        b = self.bounds
+        if (max(start[0], end[0]) + radius < b[0] or min(start[0], end[0]) - radius > b[3] or
+                max(start[1], end[1]) + radius < b[1] or min(start[1], end[1]) - radius > b[4] or
+                max(start[2], end[2]) + radius < b[2] or min(start[2], end[2]) - radius > b[5]):
+            return ()
+        radius_sq = radius * radius
+        reach = radius + math.dist(start, end)
+        path = self.path
+        lengths = self.lengths
+        ring_s = self.ring_s
+        got = []
+        for i in range(len(path) - 1):
+            d_sq, t = _segment_distance_sq(start, end, path[i], path[i + 1])
+            if d_sq > radius_sq:
+                continue
+            s = lengths[i] + (lengths[i + 1] - lengths[i]) * t
+            lo = bisect_left(ring_s, max(lengths[i], s - reach) - 1e-9)
+            hi = bisect_right(ring_s, min(lengths[i + 1], s + reach) + 1e-9)
+            for k in range(lo, hi):
+                if not self.collected[k] and \
+                        _point_segment_distance_sq(self.positions[k], start, end) <= radius_sq:
+                    self.collected[k] = 1
+                    self.remaining -= 1
+                    got.append(k)
+                    if self.batch is not None:
+                        self.batch.hide(self.first + k)
+        return got
+
+    def reset(self):
+        for k in range(len(self.collected)):
+            if self.collected[k]:
+                self.collected[k] = 0
+                if self.batch is not None:
+                    self.batch.show(self.first + k)
+        self.remaining = len(self.positions)
+
+    # --- Level data ---
+    def to_data(self):
+        data = dict(points=[list(p) for p in self.points], spacing=self.spacing)
+        if self.spline:
+            data.update(spline=True, samples=self.samples)
+        if self.closed:
+            data['closed'] = True
+        if self.remaining < len(self.positions):
+            data['collected'] = sum(1 << k for k, bit in enumerate(self.collected) if bit)
+        return data
+
+    @classmethod
+    def from_data(cls, data):
+        train = cls(data['points'], spacing=data.get('spacing'), spline=data.get('spline', False),
+                    closed=data.get('closed', False), samples=data.get('samples', 8))
+        bits = data.get('collected', 0)
+        for k in range(len(train.positions)):
+            if bits >> k & 1:
+                train.collected[k] = 1
+                train.remaining -= 1
+        return train
+
+
+def build_batch(trains, template, **kwargs):
+    """One InstancedBatch for every ring of every train; collecting a ring hides its instance"""
+    from instanced_batch import InstancedBatch
+    positions = []
+    for train in trains:
+        train.first = len(positions)
+        positions.extend(train.positions)
+    batch = InstancedBatch(template, positions, **kwargs)
+    for train in trains:
+        train.batch = batch
+        for k, bit in enumerate(train.collected):
+            if bit:
+                batch.hide(train.first + k)
+    return batch
+
+
+def benchmark(ticks=3000, seed=1):
+    import random
+    import time
+    rng = random.Random(seed)
+    print(f"{'rings':>6} {'sphere per ring us/tick':>24} {'ring train us/tick':>19}")
+    for count in (50, 500, 5000):
+        width = count * 0.5
+        train = RingTrain([(0, 1, 0), (width, 1, 0), (width, 1, 40), (0, 1, 40)], closed=True,
+                          spacing=(2 * width + 80) / count)
+        # a player running around near the track, 30 units/s at 60 fps
+        path = [(0.0, 1.0, 0.0)]
+        heading = 0.0
+        for _ in range(ticks):
+            heading += rng.uniform(-0.3, 0.3)
+            x, y, z = path[-1]
+            path.append((min(max(x + math.cos(heading) * 0.5, -5), width + 5), 1.0,
+                         min(max(z + math.sin(heading) * 0.5, -5), 45)))
+        radius_sq = 0.65 * 0.65
+
+        alive = list(train.positions)
+        start = time.perf_counter()
+        for i in range(ticks):
+            x, y, z = path[i + 1]
+            alive = [p for p in alive if (p[0] - x) ** 2 + (p[1] - y) ** 2 + (p[2] - z) ** 2 > radius_sq]
+        spheres = (time.perf_counter() - start) / ticks * 1e6
+
+        start = time.perf_counter()
+        for i in range(ticks):
+            train.collect(path[i], path[i + 1], 0.65)
+        swept = (time.perf_counter() - start) / ticks * 1e6
+        print(f'{len(train.positions):>6} {spheres:>24.1f} {swept:>19.1f}')
+
+
+if __name__ == '__main__':
+    benchmark()
@@ -1,19 +1,23 @@
 from ursina import *
-from ursina.shaders import basic_lighting_shader
 import random
+import asset_cache
+import telemetry
+from sprite_atlas import SpriteBatch, astra_atlas
+from tilemap import Tilemap, placeholder_tileset, sample_stage
 
 class Astra(Entity):
-    def __init__(self, **kwargs):
+    def __init__(self, sprites, level, **kwargs):
         super().__init__(
             model='quad',
-            texture='astro_fox',
-            color=color.hex("#6A5ACD"),
             scale=(1,2,1),
-            shader=basic_lighting_shader,
             position=(0,1,0),
             collider='box',
+            visible_self=False,  # drawn by the sprite batch, the quad is only the collider's shape
             **kwargs
         )
+        self.sprites = sprites
+        self.level = level
+        self.sprite = sprites.add(self.world_position, 'idle', height=self.scale_y)
         self.max_speed = 18
         self.acceleration = 60
         self.deceleration = 40
@@ -77,60 +81,73 @@ class Astra(Entity):
                     self.x_velocity = 0
         # Gravity
         self.y_velocity -= self.gravity * dt
-        # Horizontal move and collision
+        # Horizontal move and collision: walls are solid tiles at body height, one tile steps are walked up
+        level = self.level
+        half_w, half_h = self.scale_x / 2, self.scale_y / 2
         self.x += self.x_velocity * dt
+        if self.x_velocity and level.solid(self.x + half_w * (1 if self.x_velocity > 0 else -1), self.y):
+            self.x -= self.x_velocity * dt
+            self.x_velocity = 0
+        elif level.solid(self.x, self.y - half_h):
+            self.y = level.tile_top(self.x, self.y - half_h) + half_h
         # Vertical move and collision (step by step for better collision)
         step = self.y_velocity * dt
         steps = max(1, int(abs(step) // 0.1))
         collided = False
         for i in range(steps):
             self.y += step / steps
-            hit = self.intersects()
-            if hit.hit:
-                if self.y_velocity < 0 and self.y > hit.entity.y:
-                    self.y = hit.entity.world_y + self.scale_y/2
-                    self.y_velocity = 0
-                    self.grounded = True
-                    collided = True
-                    break
-                else:
-                    self.grounded = False
+            if self.y_velocity < 0 and level.solid(self.x, self.y - half_h):
+                self.y = level.tile_top(self.x, self.y - half_h) + half_h
+                self.y_velocity = 0
+                self.grounded = True
+                collided = True
+                break
+            if self.y_velocity > 0 and level.solid(self.x, self.y + half_h):
+                self.y -= step / steps
+                self.y_velocity = 0
+                break
         if not collided:
             self.grounded = False
-        # Animation (optional): flip sprite
-        self.scale_x = abs(self.scale_x) * self.facing
+        if self.y < level.y - 20:
+            self.position = self.spawn
+            self.x_velocity = self.y_velocity = 0
+        # Animation: the sprite batch plays frames on the GPU, only a change of state is written
+        if self.spindash_ready:
+            animation = 'spindash'
+        elif self.rolling:
+            animation = 'roll'
+        elif not self.grounded:
+            animation = 'jump'
+        elif abs(self.x_velocity) > 0.5:
+            animation = 'run'
+        else:
+            animation = 'idle'
+        self.sprites.play(self.sprite, animation)
+        self.sprites.move(self.sprite, self.world_position, facing=self.facing)
 
 app = Ursina()
+asset_cache.install()
+telemetry.install(path='robo2d_telemetry.tlm')
 window.color = color.black
 
-# World setup
-ground = Entity(
-    model='cube', 
-    scale=(50,1,50),
-    texture='grass',
-    collider='box',
-    position=(0, -1, 0)
-)
-for i in range(20):
-    Entity(
-        model='cube',
-        position=(random.randint(-20,20), 0.5, random.randint(-20,20)),
-        scale=(2,2,2),
-        texture='brick',
-        collider='box'
-    )
+# World setup: a 10000 x 200 tile stage, drawn a chunk at a time
+stage = Tilemap(sample_stage(10000, 200, seed=random.randrange(1 << 30)), placeholder_tileset())
+start_column = 20
+start_row = int(stage.layers['foreground'].tiles[:, start_column].nonzero()[0].max()) + 1
 
-astra = Astra()
-camera_rig = Entity()
+sprites = SpriteBatch(astra_atlas(), capacity=64)
+astra = Astra(sprites, stage)
+astra.position = astra.spawn = Vec3(start_column + 0.5, start_row + 1, 0)
+camera_rig = Entity(position=astra.position)
 camera.parent = camera_rig
-camera.position = (0,15,-20)
-camera.rotation_x = 30
+camera.position = (0,2,-25)
 
 def update():
     camera_rig.position = lerp(
         camera_rig.position,
-        (astra.x, astra.y + 5, astra.z),
+        (astra.x, astra.y + 2, astra.z),
         time.dt * 8
     )
+    stage.update()
 
 app.run()
@@ -0,0 +1,232 @@
+# rollout_farm.py
+# Spread FangameVecEnv rollouts over worker processes.
+#
+# Each worker owns a contiguous block of environments. Actions, observations,
+# rewards and done flags live in shared memory; the pipes only carry one-byte
+# commands, so nothing is pickled per step. A worker that dies is restarted
+# on its own block (those envs come back freshly reset and flagged done)
+# while the rest of the batch carries on.
+
+import multiprocessing as mp
+import os
+import sys
+import time
+from multiprocessing import connection, shared_memory
+
+import numpy as np
+
+from fangame_vec_env import FangameVecEnv, OBS_SIZE
+
+CMD_STEP = b's'
+CMD_RESET = b'r'
+CMD_CLOSE = b'q'
+REPLY_DONE = b'd'
+
+
+def _views(buffers, total):
+    return (np.ndarray((total,), np.int32, buffers['actions'].buf),
+            np.ndarray((total, OBS_SIZE), np.float32, buffers['obs'].buf),
+            np.ndarray((total,), np.float32, buffers['rewards'].buf),
+            np.ndarray((total,), np.bool_, buffers['dones'].buf))
+
+
+def _worker_main(conn, names, total, lo, hi, env_kwargs):
+    # workers share the parent's resource tracker, so attaching here never unlinks
+    buffers = {key: shared_memory.SharedMemory(name=name) for key, name in names.items()}
+    actions, obs, rewards, dones = (view[lo:hi] for view in _views(buffers, total))
+    env = FangameVecEnv(hi - lo, **env_kwargs)
+    obs[:] = env.obs
+    conn.send_bytes(REPLY_DONE)
+    try:
+        while True:
+            cmd = conn.recv_bytes()
+            if cmd == CMD_STEP:
+                o, r, d = env.step(actions)
+                obs[:] = o
+                rewards[:] = r
+                dones[:] = d
+            elif cmd == CMD_RESET:
+                obs[:] = env.reset()
+                rewards[:] = 0
+                dones[:] = False
+            elif cmd == CMD_CLOSE:
+                break
+            conn.send_bytes(REPLY_DONE)
+    except (EOFError, KeyboardInterrupt):
+        pass
+    finally:
+        del actions, obs, rewards, dones
+        for shm in buffers.values():
+            shm.close()
+
+
+class RolloutFarm:
+    def __init__(self, num_workers, envs_per_worker, start_method=None, **env_kwargs):
+        self.num_workers = num_workers
+        self.envs_per_worker = envs_per_worker
+        self.num_envs = num_workers * envs_per_worker
+        self.env_kwargs = env_kwargs
+        self.restarts = 0
+        self._ctx = mp.get_context(start_method)
+
+        n = self.num_envs
+        sizes = {
+            'actions': n * 4,
+            'obs': n * OBS_SIZE * 4,
+            'rewards': n * 4,
+            'dones': n,
+        }
+        self._buffers = {key: shared_memory.SharedMemory(create=True, size=size) for key, size in sizes.items()}
+        self._names = {key: shm.name for key, shm in self._buffers.items()}
+        self.actions, self.obs, self.rewards, self.dones = _views(self._buffers, n)
+        self.dones[:] = False
+        self.rewards[:] = 0
+
+        self._procs = [None] * num_workers
+        self._conns = [None] * num_workers
+        self._pending = set()
+        for w in range(num_workers):
+            self._start_worker(w)
+        for w in range(num_workers):
+            self._recv(w)
+
+    def _block(self, w):
+        lo = w * self.envs_per_worker
+        return lo, lo + self.envs_per_worker
+
+    def _start_worker(self, w):
+        parent, child = self._ctx.Pipe()
+        lo, hi = self._block(w)
+        proc = self._ctx.Process(target=_worker_main, args=(child, self._names, self.num_envs, lo, hi, self.env_kwargs),
+                                 daemon=True, name=f'rollout-worker-{w}')
+        proc.start()
+        child.close()
+        self._procs[w] = proc
+        self._conns[w] = parent
+
+    def _restart_worker(self, w):
+        proc = self._procs[w]
+        if proc.is_alive():
+            proc.kill()
+        proc.join()
+        self._conns[w].close()
+        self.restarts += 1
+        self._start_worker(w)
+        self._recv(w)
+        # the block's episodes were lost with the worker; report them as finished
+        lo, hi = self._block(w)
+        self.rewards[lo:hi] = 0
+        self.dones[lo:hi] = True
+
+    def _recv(self, w):
+        try:
+            self._conns[w].recv_bytes()
+            return True
+        except (EOFError, OSError):
+            return False
+
+    def _send(self, w, cmd):
+        try:
+            self._conns[w].send_bytes(cmd)
+            self._pending.add(w)
+        except (BrokenPipeError, OSError):
+            self._restart_worker(w)
+
+    # --- Public API ---
+    def reset(self):
+        for w in range(self.num_workers):
+            self._send(w, CMD_RESET)
+        self.step_wait()
+        return self.obs
+
+    def step_async(self, actions, workers=None):
+        """Write actions and start the given workers (default all) stepping"""
+        if actions is not None:
+            self.actions[:] = actions
+        for w in range(self.num_workers) if workers is None else workers:
+            self._send(w, CMD_STEP)
+
+    def step_wait(self, timeout=None):
+        """Block until every pending worker has finished. Returns (obs, rewards, dones)"""
+        for _ in self.iter_ready(timeout):
+            pass
+        return self.obs, self.rewards, self.dones
+
+    def iter_ready(self, timeout=None):
+        """Yield (worker, env slice) for pending workers in completion order"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self._pending:
+            waitables = {}
+            for w in self._pending:
+                waitables[self._conns[w]] = w
+                waitables[self._procs[w].sentinel] = w
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            ready = connection.wait(list(waitables), remaining)
+            if not ready:
+                return
+            for w in {waitables[obj] for obj in ready}:
+                if w not in self._pending:
+                    continue
+                self._pending.discard(w)
+                if not self._recv(w):
+                    self._restart_worker(w)
+                lo, hi = self._block(w)
+                yield w, slice(lo, hi)
+
+    def step(self, actions):
+        self.step_async(actions)
+        return self.step_wait()
+
+    def kill_worker(self, w):
+        """Hard-kill a worker, for crash-recovery drills"""
+        self._procs[w].kill()
+
+    def close(self):
+        for w in range(self.num_workers):
+            try:
+                self._conns[w].send_bytes(CMD_CLOSE)
+            except (BrokenPipeError, OSError):
+                pass
+        for proc in self._procs:
+            proc.join(timeout=1)
+            if proc.is_alive():
+                proc.kill()
+        for conn in self._conns:
+            conn.close()
+        del self.actions, self.obs, self.rewards, self.dones
+        for shm in self._buffers.values():
+            shm.close()
+            shm.unlink()
+        self._buffers = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def benchmark(worker_counts, envs_per_worker=1024, steps=200):
+    rng = np.random.default_rng(0)
+    base = None
+    print(f"{'workers':>8} {'env-steps/s':>14} {'speedup':>8} {'efficiency':>10}")
+    for workers in worker_counts:
+        with RolloutFarm(workers, envs_per_worker) as farm:
+            actions = rng.integers(0, 1 << 10, size=farm.num_envs, dtype=np.int32)
+            farm.step(actions)
+            start = time.perf_counter()
+            for _ in range(steps):
+                farm.step(actions)
+            rate = farm.num_envs * steps / (time.perf_counter() - start)
+        base = base or rate
+        print(f"{workers:>8} {rate:>14,.0f} {rate / base:>7.2f}x {rate / base / workers:>9.0%}")
+
+
+if __name__ == '__main__':
+    # Usage: python rollout_farm.py [max_workers] [envs_per_worker]
+    cores = len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else os.cpu_count()
+    max_workers = int(sys.argv[1]) if len(sys.argv) > 1 else min(32, cores)
+    per_worker = int(sys.argv[2]) if len(sys.argv) > 2 else 1024
+    counts = [c for c in (1, 2, 4, 8, 16, 32) if c <= max_workers]
+    print(f"{cores} cores available")
+    benchmark(counts, per_worker)
@@ -0,0 +1,72 @@
+# scene_optimizer.py
+# Merge static level geometry into a few combined nodes after world build.
+#
+# Every Entity is its own node with its own color scale and shader input
+# state, so Panda3D issues one draw call per entity and switches render
+# state between most of them. flatten_static() takes entities that never
+# move or change look (ground, springs, platforms, ramps), groups them by
+# their render state with the per-entity color taken out, copies their
+# geometry under one node per group and flattens it: transforms and colors
+# are baked into the vertices and each group collapses into as few geoms as
+# its vertex formats allow. The original entities stay in place with their
+# colliders and custom attributes but no longer draw their models.
+#
+# Anything that moves, gets collected, is destroyed or recolored (rings,
+# enemies, checkpoints, the character) must be left out.
+
+
+def render_stats(root):
+    """Visible geoms (draw calls), distinct render states and state changes in scene order under root"""
+    from panda3d.core import GeomNode
+    draw_calls = 0
+    changes = 0
+    states = set()
+    previous = None
+    for np in root.findAllMatches('**/+GeomNode'):
+        if np.isHidden():
+            continue
+        node = np.node()
+        net = np.getNetState()
+        for i in range(node.getNumGeoms()):
+            state = net.compose(node.getGeomState(i))
+            draw_calls += 1
+            states.add(state)
+            if state != previous:
+                changes += 1
+                previous = state
+    return dict(draw_calls=draw_calls, states=len(states), state_changes=changes)
+
+
+def flatten_static(entities, parent=None, name='static_batch'):
+    """Draw the given static entities as merged geometry. Returns the batch node"""
+    from panda3d.core import ColorScaleAttrib, RenderState
+    from ursina import scene
+    parent = parent if parent is not None else scene
+    batch = parent.attachNewNode(name)
+
+    groups = {}
+    for e in entities:
+        if not e.model or e.model.isHidden():
+            continue
+        state = e.model.getNetState()
+        color_scale = state.getAttrib(ColorScaleAttrib)
+        key = state.removeAttrib(ColorScaleAttrib.getClassSlot())
+        group = groups.get(key)
+        if group is None:
+            group = groups[key] = batch.attachNewNode(f'group{len(groups)}')
+            group.setState(key)
+        copy = e.model.copyTo(group)
+        copy.setTransform(e.model.getTransform(batch))
+        copy.setState(RenderState.make(color_scale) if color_scale else RenderState.makeEmpty())
+        e.model.hide()
+
+    for group in batch.getChildren():
+        group.flattenStrong()
+    return batch
+
+
+def optimize(root, entities, parent=None):
+    """flatten_static() with render_stats() of root taken before and after"""
+    before = render_stats(root)
+    batch = flatten_static(entities, parent)
+    return batch, before, render_stats(root)
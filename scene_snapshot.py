@@ -0,0 +1,148 @@
+# scene_snapshot.py
+# Save a fully built level and load it back in one read on the next launch.
+#
+# capture() copies every plain Entity a world keeps in its lists (and any
+# named attributes) under one node: transform and render state (color,
+# shader, two-sidedness), the model geometry and the collision solids, plus
+# a small record per entity with its Ursina color and custom attributes
+# such as spring_power or points. It is all written as one file holding a
+# bam stream. restore() reads that file in one go, decodes the bam and
+# rebuilds bare Entities around the decoded nodes, without loading models,
+# fitting colliders or compiling anything per object.
+#
+# The snapshot is keyed by the source of the level-building code and data
+# and the Panda3D and Ursina versions, so editing either or upgrading makes
+# the next launch rebuild and re-capture.
+
+import hashlib
+import inspect
+import os
+import pickle
+from pathlib import Path
+
+SNAPSHOT_VERSION = 1
+_SIMPLE_TYPES = (bool, int, float, str, tuple)
+
+
+def _ursina_version():
+    # Ursina 7 has no __version__, the installed distribution knows it
+    from importlib import metadata
+    try:
+        return metadata.version('ursina')
+    except metadata.PackageNotFoundError:
+        import ursina
+        return getattr(ursina, '__version__', 'unknown')
+
+
+def _source_key(sources):
+    from panda3d.core import PandaSystem
+    h = hashlib.blake2b(digest_size=16)
+    h.update(f'{SNAPSHOT_VERSION}/{PandaSystem.getVersionString()}/{_ursina_version()}'.encode())
+    for source in sources:
+        if inspect.ismodule(source):
+            h.update(Path(source.__file__).read_bytes())
+        else:
+            h.update(inspect.getsource(source).encode('utf-8'))
+    return h.hexdigest()
+
+
+class SceneSnapshot:
+    def __init__(self, name, sources, lists=('entities', 'rings', 'enemies', 'checkpoints'), attrs=(), folder=None):
+        from ursina import application
+        self.folder = Path(folder or os.environ.get('SCENE_SNAPSHOT_DIR') or application.asset_folder / 'scene_cache')
+        self.path = self.folder / f'{name}.snap'
+        self.key = _source_key(sources)
+        self.lists = lists
+        self.attrs = attrs
+
+    def _entities(self, owner):
+        from ursina import Entity
+        seen = set()
+        for attr in self.attrs:
+            e = getattr(owner, attr, None)
+            if type(e) is Entity and id(e) not in seen:
+                seen.add(id(e))
+                yield attr, None, e
+        for name in self.lists:
+            for i, e in enumerate(getattr(owner, name, ())):
+                # subclasses carry behaviour, so only plain scenery is snapshotted
+                if type(e) is Entity and id(e) not in seen:
+                    seen.add(id(e))
+                    yield name, i, e
+
+    def capture(self, owner):
+        """Write the owner's current scene to the snapshot file"""
+        from panda3d.core import NodePath
+        from ursina import Entity
+
+        blank = Entity(add_to_scene_entities=False)
+        baseline = set(vars(blank))
+        blank.removeNode()
+        root = NodePath('scene_snapshot')
+        records = []
+        for group, index, e in self._entities(owner):
+            holder = root.attachNewNode(str(len(records)))
+            holder.setTransform(e.getTransform())
+            holder.setState(e.getState())
+            if e.model:
+                e.model.copyTo(holder).setName('model')
+            if e.collider:
+                e.collider.node_path.copyTo(holder).setName('collider')
+            custom = {k: v for k, v in vars(e).items()
+                      if k not in baseline and not k.startswith('_') and isinstance(v, _SIMPLE_TYPES)}
+            records.append(dict(group=group, index=index, name=e.name, color=tuple(e.color),
+                                collider=getattr(e.collider, 'name', None), attrs=custom))
+
+        data = pickle.dumps(dict(key=self.key, records=records, bam=root.encodeToBamStream()),
+                            protocol=pickle.HIGHEST_PROTOCOL)
+        root.removeNode()
+        self.folder.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix('.tmp')
+        tmp.write_bytes(data)
+        os.replace(tmp, self.path)
+        return len(data)
+
+    def restore(self, owner):
+        """Rebuild the scene from the snapshot. Returns False if there is no valid one"""
+        try:
+            data = pickle.loads(self.path.read_bytes())
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return False
+        if data.get('key') != self.key:
+            return False
+
+        from panda3d.core import NodePath
+        from ursina import Entity, color
+        from ursina.collider import Collider
+
+        root = NodePath.decodeFromBamStream(data['bam'])
+        if root.isEmpty():
+            return False
+
+        placed = {}
+        for i, record in enumerate(data['records']):
+            holder = root.find(str(i))
+            e = Entity(name=record['name'])
+            e.setTransform(holder.getTransform())
+            e.setState(holder.getState())
+            model = holder.find('model')
+            if not model.isEmpty():
+                e.model = model
+            e.color = color.Color(*record['color'])
+            solids = holder.find('collider')
+            if not solids.isEmpty():
+                node = solids.node()
+                e.collider = Collider(e, [node.getSolid(j) for j in range(node.getNumSolids())])
+                e.collider.name = record['collider']
+            for k, v in record['attrs'].items():
+                setattr(e, k, v)
+            placed.setdefault(record['group'], []).append((record['index'], e))
+        root.removeNode()
+
+        for group, items in placed.items():
+            if group in self.attrs:
+                setattr(owner, group, items[0][1])
+            else:
+                target = getattr(owner, group)
+                target.extend(e for _, e in sorted(items, key=lambda item: item[0]))
+        return True
@@ -0,0 +1,75 @@
+# spatial_hash.py
+# Uniform-grid spatial hash for radius queries over many small objects.
+#
+# Keys (any hashable) are bucketed by the cubic cell their point falls in. A
+# radius query only visits the cells the query sphere overlaps and checks
+# the exact distance of what it finds there, so its cost depends on how
+# crowded the neighbourhood is, not on how many objects the level holds.
+# Pick cell_size around the typical query radius: much smaller and a query
+# walks many empty cells, much larger and it checks many far objects.
+
+
+class SpatialHash:
+    def __init__(self, cell_size=4.0):
+        self.cell_size = cell_size
+        self.cells = {}
+        self.points = {}
+
+    def _cell(self, x, y, z):
+        s = self.cell_size
+        return (int(x // s), int(y // s), int(z // s))
+
+    def insert(self, key, x, y, z):
+        if key in self.points:
+            self.remove(key)
+        self.points[key] = (x, y, z)
+        self.cells.setdefault(self._cell(x, y, z), []).append(key)
+
+    def remove(self, key):
+        point = self.points.pop(key, None)
+        if point is None:
+            return False
+        cell = self._cell(*point)
+        bucket = self.cells[cell]
+        bucket.remove(key)
+        if not bucket:
+            del self.cells[cell]
+        return True
+
+    def move(self, key, x, y, z):
+        old = self.points.get(key)
+        if old is not None and self._cell(*old) == self._cell(x, y, z):
+            self.points[key] = (x, y, z)
+        else:
+            self.insert(key, x, y, z)
+
+    def query(self, x, y, z, radius):
+        """Keys whose point lies within radius of (x, y, z)"""
+        s = self.cell_size
+        r_sq = radius * radius
+        x0, x1 = int((x - radius) // s), int((x + radius) // s)
+        y0, y1 = int((y - radius) // s), int((y + radius) // s)
+        z0, z1 = int((z - radius) // s), int((z + radius) // s)
+        cells = self.cells
+        points = self.points
+        found = []
+        for cx in range(x0, x1 + 1):
+            for cy in range(y0, y1 + 1):
+                for cz in range(z0, z1 + 1):
+                    bucket = cells.get((cx, cy, cz))
+                    if not bucket:
+                        continue
+                    for key in bucket:
+                        px, py, pz = points[key]
+                        dx = px - x
+                        dy = py - y
+                        dz = pz - z
+                        if dx * dx + dy * dy + dz * dz <= r_sq:
+                            found.append(key)
+        return found
+
+    def __len__(self):
+        return len(self.points)
+
+    def __contains__(self, key):
+        return key in self.points
@@ -0,0 +1,262 @@
+# telemetry.py
+# Always-on frame telemetry in a fixed-size ring buffer.
+#
+# FrameTelemetry keeps the last `capacity` frames in one preallocated NumPy
+# record array: frame time, time spent in the update phase (all the game
+# logic, Ursina's entity updates included), garbage collector pauses, and
+# whatever counts the game reports (entities, rings, enemies, particles, pool
+# occupancy, audio voices). Recording a frame is a single row assignment, a
+# few microseconds, and never allocates. GC pauses come from gc.callbacks, so
+# they are measured rather than guessed from long frames.
+#
+# Nothing touches the disk during play. flush() copies the frames recorded
+# since the last flush out of the ring and hands them to a writer thread,
+# which writes them to a compact binary file: 'STLM', a version, the JSON
+# column layout, then raw little-endian records (56 bytes a frame, about
+# 12 MiB an hour at 60 fps). A file holds one run: the first flush of a
+# FrameTelemetry starts it afresh, so each game should use its own path. Flushes happen on demand, when a frame is
+# longer than hitch_ms (at most once per hitch_cooldown seconds, with the
+# frames leading up to it) and at exit. read() loads a file back into a
+# record array and to_csv() converts one.
+#
+# install() hooks a FrameTelemetry into Ursina's task manager around the
+# update phase, the same way dynamic_resolution.py watches the render, so an
+# engine only passes a function returning its counts.
+#
+# Usage: python telemetry.py file.tlm [out.csv] | bench
+
+import atexit
+import gc
+import json
+import queue
+import struct
+import threading
+import time
+
+import numpy as np
+
+TELEMETRY_MAGIC = b'STLM'
+TELEMETRY_VERSION = 1
+_HEADER = struct.Struct('<4sHI')  # magic, version, layout length
+
+FRAME = np.dtype([
+    ('frame', '<u4'), ('time', '<f8'), ('frame_ms', '<f4'), ('update_ms', '<f4'), ('gc_ms', '<f4'),
+    ('gc_count', '<u2'), ('gc_full', '<u2'), ('entities', '<u4'), ('rings', '<u4'), ('enemies', '<u4'),
+    ('particles', '<u4'), ('pool_used', '<u4'), ('pool_size', '<u4'), ('voices', '<u2'), ('pad', '<u2'),
+])
+
+
+class FrameTelemetry:
+    def __init__(self, path='telemetry.tlm', capacity=3600, hitch_ms=50.0, hitch_cooldown=1.0):
+        self.path = path
+        self.capacity = capacity
+        self.hitch_ms = hitch_ms
+        self.hitch_cooldown = hitch_cooldown
+        self.rows = np.zeros(capacity, FRAME)
+        self.frame = 0
+        self.flushed = 0
+        self.hitches = 0
+        self.lost = 0
+        self.start = time.perf_counter()
+        self._last_hitch_flush = -hitch_cooldown
+        self._update_start = None
+        self._update_time = 0.0
+        self._gc_start = 0.0
+        self._gc_time = 0.0
+        self._gc_count = 0
+        self._gc_full = 0
+        self._queue = None
+        self._writer = None
+        self._mode = 'wb'  # a run starts its own file, later writers of the same run append
+        self.bytes_written = 0
+        gc.callbacks.append(self._on_gc)
+
+    def _on_gc(self, phase, info):
+        if phase == 'start':
+            self._gc_start = time.perf_counter()
+        else:
+            self._gc_time += time.perf_counter() - self._gc_start
+            self._gc_count += 1
+            self._gc_full += info['generation'] == 2
+
+    def begin_update(self):
+        self._update_start = time.perf_counter()
+
+    def end_update(self):
+        if self._update_start is not None:
+            self._update_time += time.perf_counter() - self._update_start
+            self._update_start = None
+
+    def record(self, frame_time, entities=0, rings=0, enemies=0, particles=0, pool_used=0, pool_size=0, voices=0):
+        """Close a frame that took frame_time seconds, with the game's counts"""
+        frame_ms = frame_time * 1000
+        self.rows[self.frame % self.capacity] = (
+            self.frame, time.perf_counter() - self.start, frame_ms, self._update_time * 1000, self._gc_time * 1000,
+            self._gc_count, self._gc_full, entities, rings, enemies, particles, pool_used, pool_size, voices, 0)
+        self.frame += 1
+        self._update_time = self._gc_time = 0.0
+        self._gc_count = self._gc_full = 0
+        if frame_ms > self.hitch_ms:
+            self.hitches += 1
+            now = time.perf_counter()
+            if now - self._last_hitch_flush >= self.hitch_cooldown:
+                self._last_hitch_flush = now
+                self.flush()
+
+    def recent(self, count=None):
+        """The last `count` recorded frames (all that are kept by default), oldest first, as a copy"""
+        count = min(self.frame, self.capacity, count if count is not None else self.capacity)
+        return self.rows[np.arange(self.frame - count, self.frame) % self.capacity]
+
+    def flush(self):
+        """Write the frames recorded since the last flush, on the writer thread. Returns how many"""
+        pending = self.frame - self.flushed
+        if pending > self.capacity:
+            self.lost += pending - self.capacity  # overwritten before anyone asked for them
+        rows = self.recent(pending)
+        self.flushed = self.frame
+        if not len(rows):
+            return 0
+        if self._writer is None:
+            self._queue = queue.Queue()
+            self._writer = threading.Thread(target=self._write_loop, name='telemetry-writer', daemon=True)
+            self._writer.start()
+        self._queue.put(rows)
+        return len(rows)
+
+    def _write_loop(self):
+        with open(self.path, self._mode) as f:
+            self._mode = 'ab'
+            if f.tell() == 0:
+                layout = json.dumps(FRAME.descr).encode('utf-8')
+                f.write(_HEADER.pack(TELEMETRY_MAGIC, TELEMETRY_VERSION, len(layout)) + layout)
+            while True:
+                rows = self._queue.get()
+                if rows is None:
+                    break
+                f.write(rows.tobytes())
+                f.flush()
+                self.bytes_written += rows.nbytes
+
+    def close(self):
+        """Flush what is left and wait for the writer"""
+        self.flush()
+        if self._writer is not None:
+            self._queue.put(None)
+            self._writer.join()
+            self._writer = None
+        if self._on_gc in gc.callbacks:
+            gc.callbacks.remove(self._on_gc)
+
+    def stats(self):
+        rows = self.recent()
+        if not len(rows):
+            return dict(frames=0, hitches=0)
+        frame_ms = np.sort(rows['frame_ms'])
+        return dict(frames=self.frame, hitches=self.hitches, lost=self.lost, flushed=self.flushed,
+                    frame_ms=float(frame_ms.mean()), p99_ms=float(frame_ms[int(len(frame_ms) * 0.99)]),
+                    update_ms=float(rows['update_ms'].mean()), gc_ms=float(rows['gc_ms'].sum()),
+                    bytes=self.rows.nbytes)
+
+
+def read(path):
+    """All frames in a telemetry file, as a record array"""
+    with open(path, 'rb') as f:
+        magic, version, length = _HEADER.unpack(f.read(_HEADER.size))
+        if magic != TELEMETRY_MAGIC:
+            raise ValueError(f"'{path}' is not a telemetry file")
+        if version != TELEMETRY_VERSION:
+            raise ValueError(f"'{path}' is telemetry version {version}, expected {TELEMETRY_VERSION}")
+        dtype = np.dtype([tuple(field) for field in json.loads(f.read(length))])
+        data = f.read()
+    return np.frombuffer(data[:len(data) // dtype.itemsize * dtype.itemsize], dtype)
+
+
+def to_csv(path, out):
+    """Convert a telemetry file to CSV. Returns the number of frames"""
+    import csv
+    rows = read(path)
+    names = [name for name in rows.dtype.names if name != 'pad']
+    with open(out, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(names)
+        for row in rows[names].tolist():
+            writer.writerow([f'{v:.3f}' if isinstance(v, float) else v for v in row])
+    return len(rows)
+
+
+def playing_voices(sounds):
+    """How many of an audio system's sounds are playing right now"""
+    return sum(1 for sound in sounds if sound is not None and getattr(sound, 'playing', False))
+
+
+class TelemetryHook:
+    """Records one FrameTelemetry row per Ursina frame"""
+    def __init__(self, telemetry, counts=None):
+        from ursina import application, scene
+        self.telemetry = telemetry
+        self.counts = counts
+        self.base = application.base
+        self.scene = scene
+        # Ursina's update task runs at sort 0 and the render at 50: time everything in between
+        self.base.taskMgr.add(self._before_update, 'telemetry-begin', sort=-100)
+        self.base.taskMgr.add(self._after_update, 'telemetry-end', sort=48)
+        atexit.register(telemetry.close)
+
+    def _before_update(self, task):
+        self.telemetry.begin_update()
+        return task.cont
+
+    def _after_update(self, task):
+        t = self.telemetry
+        t.end_update()
+        counts = self.counts() if self.counts else {}
+        counts.setdefault('entities', len(self.scene.entities))
+        t.record(self.base.clock.getDt(), **counts)
+        return task.cont
+
+
+def install(counts=None, path='telemetry.tlm', **kwargs):
+    """Record telemetry for every frame of the running Ursina app.
+    counts: optional function returning a dict of record() counts for the frame. Returns the FrameTelemetry"""
+    telemetry = FrameTelemetry(path, **kwargs)
+    TelemetryHook(telemetry, counts)
+    return telemetry
+
+
+def benchmark(frames=100000):
+    import os
+    import tempfile
+    path = os.path.join(tempfile.mkdtemp(), 'bench.tlm')
+    telemetry = FrameTelemetry(path, hitch_ms=float('inf'))
+    start = time.perf_counter()
+    for i in range(frames):
+        telemetry.begin_update()
+        telemetry.end_update()
+        telemetry.record(1 / 60, entities=500, rings=120, enemies=8, particles=i % 300, pool_used=i % 64,
+                         pool_size=64, voices=3)
+    record_us = (time.perf_counter() - start) / frames * 1e6
+    start = time.perf_counter()
+    flushed = telemetry.flush()
+    flush_ms = (time.perf_counter() - start) * 1000
+    telemetry.close()
+    rows = read(path)
+    print(f'record {record_us:.2f} us/frame ({record_us / (1e6 / 60) * 100:.3f}% of a 60 Hz frame), '
+          f'ring of {telemetry.capacity} frames in {telemetry.rows.nbytes / 1024:.0f} KiB')
+    print(f'flush of {flushed} frames took {flush_ms:.2f} ms on the game thread, '
+          f'{os.path.getsize(path)} bytes on disk, {len(rows)} frames read back, '
+          f'{frames - telemetry.capacity} dropped by the ring')
+    to_csv(path, path + '.csv')
+    print(f'csv: {os.path.getsize(path + ".csv")} bytes')
+    os.remove(path)
+    os.remove(path + '.csv')
+
+
+if __name__ == '__main__':
+    import sys
+    args = sys.argv[1:]
+    if not args or args[0] == 'bench':
+        benchmark()
+    else:
+        out = args[1] if len(args) > 1 else args[0].rsplit('.', 1)[0] + '.csv'
+        print(f'{to_csv(args[0], out)} frames written to {out}')
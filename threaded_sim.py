@@ -0,0 +1,197 @@
+# threaded_sim.py
+# Run fixed-step kinematics on a worker thread, double-buffered.
+#
+# The worker owns a SimWorld: plain-float bodies (position, velocity,
+# gravity, friction, an optional floor) and particle systems. It advances
+# the world in fixed steps against the wall clock, then writes every body's
+# position and velocity into the back buffer and swaps it with the front one
+# under a lock. The render thread calls sync() once per frame. That is the
+# only sync point: sync() hands over the newest front buffer plus the events
+# the worker posted since the last frame (a body landing, a particle system
+# finishing), and queues render-thread commands (add or remove a body, set
+# a velocity after a jump or a hit) to run on the worker before its next
+# step. Neither thread ever touches the other's objects directly; the worker
+# never reads or writes the scene graph.
+#
+# CPython's GIL means the two threads do not run Python code at the same
+# time. What this buys is decoupling: a slow simulation step no longer holds
+# up a frame, because the render thread applies whatever buffer is ready,
+# and the worker gets to run while the render thread is inside Panda3D's
+# draw and flip calls, which release the GIL.
+
+import threading
+import time
+from collections import deque
+
+
+class Body:
+    __slots__ = ('x', 'y', 'z', 'vx', 'vy', 'vz', 'ax', 'ay', 'az',
+                 'gravity', 'friction', 'max_speed', 'grounded', 'floor')
+
+    def __init__(self, position, velocity=(0, 0, 0), acceleration=(0, 0, 0), gravity=0.0,
+                 friction=1.0, max_speed=None, grounded=False, floor=None):
+        self.x, self.y, self.z = position
+        self.vx, self.vy, self.vz = velocity
+        self.ax, self.ay, self.az = acceleration
+        self.gravity = gravity
+        self.friction = friction
+        self.max_speed = max_speed
+        self.grounded = grounded
+        self.floor = floor
+
+
+class SimWorld:
+    """Everything the worker thread simulates. Only touched from the worker"""
+    def __init__(self):
+        self.bodies = {}
+        self.particle_systems = []
+
+    # --- Commands (queued by the render thread) ---
+    def add_body(self, key, **kwargs):
+        self.bodies[key] = Body(**kwargs)
+
+    def remove_body(self, key):
+        self.bodies.pop(key, None)
+
+    def set_velocity(self, key, velocity):
+        body = self.bodies.get(key)
+        if body is not None:
+            body.vx, body.vy, body.vz = velocity
+
+    def set_grounded(self, key, grounded):
+        body = self.bodies.get(key)
+        if body is not None:
+            body.grounded = grounded
+
+    def add_particles(self, system):
+        self.particle_systems.append(system)
+
+    # --- Worker side ---
+    def step(self, dt, post):
+        for key, b in self.bodies.items():
+            b.vx += b.ax * dt
+            b.vy += b.ay * dt
+            b.vz += b.az * dt
+            b.vx *= b.friction
+            b.vz *= b.friction
+            if b.max_speed is not None:
+                speed_sq = b.vx * b.vx + b.vy * b.vy + b.vz * b.vz
+                if speed_sq > b.max_speed * b.max_speed:
+                    k = b.max_speed / speed_sq ** 0.5
+                    b.vx *= k
+                    b.vy *= k
+                    b.vz *= k
+            b.x += b.vx * dt
+            b.y += b.vy * dt
+            b.z += b.vz * dt
+            if b.grounded:
+                b.vy = 0.0
+            else:
+                b.vy -= b.gravity * dt
+            if b.floor is not None and b.y < b.floor:
+                b.y = b.floor
+                b.vx = b.vy = b.vz = 0.0
+                b.grounded = True
+                post(('landed', key))
+
+        if self.particle_systems:
+            alive = []
+            for system in self.particle_systems:
+                system.update(dt)
+                if system.dead:
+                    post(('particles_done', system))
+                else:
+                    alive.append(system)
+            self.particle_systems = alive
+
+    def write(self, buffer):
+        buffer.clear()
+        for key, b in self.bodies.items():
+            buffer[key] = (b.x, b.y, b.z, b.vx, b.vy, b.vz)
+
+
+class ThreadedSimulation:
+    def __init__(self, world=None, dt=1/60, max_steps=5):
+        self.world = world or SimWorld()
+        self.dt = dt
+        self.max_steps = max_steps
+        self.steps = 0
+        self.dropped_steps = 0
+
+        self._lock = threading.Lock()
+        self._front = {}
+        self._back = {}
+        self._fresh = False
+        self._commands = deque()
+        self._events = []
+        self._stop = threading.Event()
+        self._thread = None
+
+    # --- Render thread ---
+    def start(self):
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='threaded-sim', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+
+    def submit(self, fn, *args, **kwargs):
+        """Run fn(*args, **kwargs) on the worker before its next step"""
+        self._commands.append((fn, args, kwargs))
+
+    def sync(self):
+        """Take the newest transforms and the pending events. Returns (buffer, events)
+
+        The buffer maps body key -> (x, y, z, vx, vy, vz) and stays valid until the next sync().
+        """
+        with self._lock:
+            events, self._events = self._events, []
+            if self._fresh:
+                self._front, self._back = self._back, self._front
+                self._fresh = False
+                return self._front, events
+        return None, events
+
+    # --- Worker thread ---
+    def _post(self, event):
+        with self._lock:
+            self._events.append(event)
+
+    def _run(self):
+        last = time.perf_counter()
+        accumulator = 0.0
+        while not self._stop.is_set():
+            while self._commands:
+                fn, args, kwargs = self._commands.popleft()
+                fn(*args, **kwargs)
+
+            now = time.perf_counter()
+            accumulator += now - last
+            last = now
+            steps = int(accumulator / self.dt)
+            if steps > self.max_steps:
+                # too far behind to catch up, drop the backlog rather than spiral
+                self.dropped_steps += steps - self.max_steps
+                steps = self.max_steps
+                accumulator = steps * self.dt
+            if not steps:
+                time.sleep(max(0.0, self.dt - accumulator))
+                continue
+            for _ in range(steps):
+                self.world.step(self.dt, self._post)
+                self.steps += 1
+            accumulator -= steps * self.dt
+
+            # the back buffer is the render thread's old front, free to overwrite until we swap
+            with self._lock:
+                back = self._back
+                self._fresh = False
+            self.world.write(back)
+            with self._lock:
+                self._fresh = True
@@ -0,0 +1,366 @@
+# voxel_terrain.py
+# Chunked voxel terrain that can be carved and built on at runtime.
+#
+# VoxelTerrain keeps voxels in chunk_size^3 NumPy blocks (uint8, 0 is air)
+# and draws each chunk as one Entity: a single mesh of the voxel faces that
+# touch air, and a collider of box runs (solid voxels merged along x). A
+# 20 x 20 floor is a handful of nodes instead of four hundred cube entities,
+# each with its own collider.
+#
+# Editing is cheap on purpose. set(), carve() and fill() only write into the
+# blocks and mark the chunks they touched dirty (plus the neighbour across a
+# face, whose border faces may change). update(), once a frame, hands every
+# dirty chunk to a worker thread as a copy of the chunk with a one voxel
+# border from its neighbours, and the worker builds the mesh and the
+# collision boxes from that copy alone. Only one batch is in flight at a
+# time: edits made while it is being built just mark chunks dirty again and
+# go out together in the next batch, so a burst of edits to the same chunk
+# is meshed once, not once per edit. A finished batch is swapped in on the
+# main thread in one go, every chunk's geometry and collider in the same
+# frame, so the world never shows half an edit.
+#
+# Voxels at or below `floor` are bedrock and can't be removed, so carving
+# never opens a hole to the void.
+#
+# Run this file for a 1000 edit burst benchmark.
+
+import math
+import queue
+import threading
+
+import numpy as np
+
+AIR = 0
+
+# Each face: the direction it faces and its four corners, counter-clockwise
+# seen from outside in Ursina's y-up left-handed space
+_FACES = []
+for _normal, _a, _b in (((1, 0, 0), (0, 0, 1), (0, 1, 0)), ((-1, 0, 0), (0, 1, 0), (0, 0, 1)),
+                        ((0, 1, 0), (1, 0, 0), (0, 0, 1)), ((0, -1, 0), (0, 0, 1), (1, 0, 0)),
+                        ((0, 0, 1), (0, 1, 0), (1, 0, 0)), ((0, 0, -1), (1, 0, 0), (0, 1, 0))):
+    n, a, b = np.array(_normal), np.array(_a), np.array(_b)
+    origin = n * 0.5 - (a + b) * 0.5
+    _FACES.append((_normal, np.array([origin, origin + a, origin + a + b, origin + b], np.float32)))
+
+
+def mesh_chunk(padded):
+    """Vertex rows (x, y, z, nx, ny, nz) and triangle indices for the inner voxels of a bordered block"""
+    solid = padded[1:-1, 1:-1, 1:-1] != AIR
+    vertices = []
+    for (dx, dy, dz), corners in _FACES:
+        s = padded.shape
+        neighbour = padded[1 + dx:s[0] - 1 + dx, 1 + dy:s[1] - 1 + dy, 1 + dz:s[2] - 1 + dz]
+        cells = np.argwhere(solid & (neighbour == AIR)).astype(np.float32)
+        if not len(cells):
+            continue
+        face = np.empty((len(cells), 4, 6), np.float32)
+        face[:, :, :3] = cells[:, None, :] + corners[None, :, :]
+        face[:, :, 3:] = (dx, dy, dz)
+        vertices.append(face.reshape(-1, 6))
+    if not vertices:
+        return None, None
+    vertices = np.concatenate(vertices)
+    base = np.arange(len(vertices) // 4, dtype=np.uint32)[:, None] * 4
+    return vertices, (base + np.array([0, 1, 2, 0, 2, 3], np.uint32)).ravel()
+
+
+def box_runs(block):
+    """(x0, x1, y, z) runs of solid voxels along x, x1 exclusive"""
+    solid = (block != AIR).transpose(1, 2, 0)  # y, z, x so runs lie along the last axis
+    edges = np.diff(np.pad(solid, ((0, 0), (0, 0), (1, 1))).astype(np.int8), axis=-1)
+    starts = np.argwhere(edges == 1)
+    ends = np.argwhere(edges == -1)
+    return np.column_stack([starts[:, 2], ends[:, 2], starts[:, 0], starts[:, 1]])
+
+
+def _build_chunk(key, padded):
+    """Geom and CollisionBoxes for one chunk, from data nothing else touches. Runs on the worker"""
+    from panda3d.core import Geom, GeomEnums, GeomTriangles, GeomVertexData, GeomVertexFormat, CollisionBox, Point3
+    vertices, indices = mesh_chunk(padded)
+    geom = None
+    if vertices is not None:
+        vdata = GeomVertexData('voxel_chunk', GeomVertexFormat.getV3n3(), Geom.UH_static)
+        vdata.uncleanSetNumRows(len(vertices))
+        memoryview(vdata.modifyArray(0)).cast('B')[:] = vertices.tobytes()
+        triangles = GeomTriangles(Geom.UH_static)
+        triangles.setIndexType(GeomEnums.NT_uint32)
+        array = triangles.modifyVertices()
+        array.uncleanSetNumRows(len(indices))
+        memoryview(array).cast('B')[:] = indices.tobytes()
+        geom = Geom(vdata)
+        geom.addPrimitive(triangles)
+    boxes = [CollisionBox(Point3((x0 + x1 - 1) / 2, y, z), (x1 - x0) / 2, 0.5, 0.5)
+             for x0, x1, y, z in box_runs(padded[1:-1, 1:-1, 1:-1]).tolist()]
+    return key, geom, boxes
+
+
+class VoxelTerrain:
+    def __init__(self, chunk_size=16, floor=None, parent=None, **entity_kwargs):
+        """entity_kwargs (color, shader, texture...) go to every chunk Entity"""
+        self.chunk_size = chunk_size
+        self.floor = floor
+        self.parent = parent
+        self.entity_kwargs = entity_kwargs
+        self.blocks = {}  # (cx, cy, cz) -> uint8 array indexed [x, y, z]
+        self.entities = {}
+        self.dirty = set()
+        self.edits = 0
+        self.batches = 0
+        self.rebuilt = 0
+        self._busy = False
+        self._jobs = None
+        self._results = queue.Queue()
+        self._worker = None
+
+    # voxels
+
+    def _block(self, key, create=False):
+        block = self.blocks.get(key)
+        if block is None and create:
+            c = self.chunk_size
+            block = self.blocks[key] = np.zeros((c, c, c), np.uint8)
+        return block
+
+    def get(self, x, y, z):
+        c = self.chunk_size
+        block = self.blocks.get((x // c, y // c, z // c))
+        return int(block[x % c, y % c, z % c]) if block is not None else AIR
+
+    def set(self, x, y, z, value=1):
+        """Set voxel (x, y, z) (integer coordinates) to value, 0 for air. Returns whether it changed"""
+        if value == AIR and self.floor is not None and y <= self.floor:
+            return False
+        c = self.chunk_size
+        key = (x // c, y // c, z // c)
+        block = self._block(key, create=value != AIR)
+        if block is None:
+            return False
+        i, j, k = x % c, y % c, z % c
+        if block[i, j, k] == value:
+            return False
+        block[i, j, k] = value
+        self.edits += 1
+        self._mark(key, (i, j, k), (i, j, k))
+        return True
+
+    def add(self, position, value=1):
+        return self.set(*(round(v) for v in position), value)
+
+    def remove(self, position):
+        return self.set(*(round(v) for v in position), AIR)
+
+    def fill(self, start, end, value=1):
+        """Set every voxel from start to end (integer corners, both included)"""
+        lo = [min(a, b) for a, b in zip(start, end)]
+        hi = [max(a, b) for a, b in zip(start, end)]
+        if value == AIR and self.floor is not None:
+            lo[1] = max(lo[1], self.floor + 1)
+        for key, local_lo, local_hi in self._spans(lo, hi):
+            block = self._block(key, create=value != AIR)
+            if block is None:
+                continue
+            region = block[local_lo[0]:local_hi[0] + 1, local_lo[1]:local_hi[1] + 1, local_lo[2]:local_hi[2] + 1]
+            if (region != value).any():
+                region[...] = value
+                self.edits += 1
+                self._mark(key, local_lo, local_hi)
+
+    def carve(self, center, radius, min_y=None):
+        """Remove every voxel whose center is within radius of center (and at or above min_y). Returns how many"""
+        cx, cy, cz = center
+        lo = [math.ceil(v - radius) for v in center]
+        hi = [math.floor(v + radius) for v in center]
+        if min_y is not None:
+            lo[1] = max(lo[1], math.ceil(min_y))
+        if self.floor is not None:
+            lo[1] = max(lo[1], self.floor + 1)
+        removed = 0
+        c = self.chunk_size
+        for key, local_lo, local_hi in self._spans(lo, hi):
+            block = self.blocks.get(key)
+            if block is None:
+                continue
+            sl = tuple(slice(a, b + 1) for a, b in zip(local_lo, local_hi))
+            x = np.arange(local_lo[0], local_hi[0] + 1) + key[0] * c - cx
+            y = np.arange(local_lo[1], local_hi[1] + 1) + key[1] * c - cy
+            z = np.arange(local_lo[2], local_hi[2] + 1) + key[2] * c - cz
+            inside = x[:, None, None] ** 2 + y[None, :, None] ** 2 + z[None, None, :] ** 2 <= radius * radius
+            region = block[sl]
+            hit = inside & (region != AIR)
+            count = int(hit.sum())
+            if count:
+                region[hit] = AIR
+                removed += count
+                self.edits += 1
+                self._mark(key, local_lo, local_hi)
+        return removed
+
+    def _spans(self, lo, hi):
+        """(chunk key, local lo, local hi) for every chunk the voxel box lo..hi overlaps"""
+        c = self.chunk_size
+        for kx in range(lo[0] // c, hi[0] // c + 1):
+            for ky in range(lo[1] // c, hi[1] // c + 1):
+                for kz in range(lo[2] // c, hi[2] // c + 1):
+                    key = (kx, ky, kz)
+                    local_lo = [max(l - k * c, 0) for l, k in zip(lo, key)]
+                    local_hi = [min(h - k * c, c - 1) for h, k in zip(hi, key)]
+                    yield key, local_lo, local_hi
+
+    def _mark(self, key, local_lo, local_hi):
+        """Chunk key changed between local_lo and local_hi: it and any neighbour sharing a touched face are dirty"""
+        self.dirty.add(key)
+        last = self.chunk_size - 1
+        for axis in range(3):
+            for edge, step in ((0, -1), (last, 1)):
+                if local_lo[axis] <= edge <= local_hi[axis]:
+                    neighbour = list(key)
+                    neighbour[axis] += step
+                    neighbour = tuple(neighbour)
+                    if neighbour in self.blocks:
+                        self.dirty.add(neighbour)
+
+    def _padded(self, key):
+        """Copy of a chunk with a one voxel border from its face neighbours"""
+        c = self.chunk_size
+        padded = np.zeros((c + 2, c + 2, c + 2), np.uint8)
+        block = self.blocks.get(key)
+        if block is not None:
+            padded[1:-1, 1:-1, 1:-1] = block
+        kx, ky, kz = key
+        for axis in range(3):
+            for step, src, dst in ((-1, c - 1, 0), (1, 0, c + 1)):
+                neighbour = list(key)
+                neighbour[axis] += step
+                block = self.blocks.get(tuple(neighbour))
+                if block is None:
+                    continue
+                inner = [slice(1, -1)] * 3
+                inner[axis] = dst
+                taken = [slice(None)] * 3
+                taken[axis] = src
+                padded[tuple(inner)] = block[tuple(taken)]
+        return padded
+
+    # meshing
+
+    def build(self):
+        """Mesh every dirty chunk right now, on this thread. For the initial world, before the game starts"""
+        results = [_build_chunk(key, self._padded(key)) for key in self.dirty]
+        self.dirty.clear()
+        self._apply(results)
+
+    def update(self):
+        """Swap in the batch the worker finished, if any, and hand it the next. Call once a frame"""
+        try:
+            results = self._results.get_nowait()
+        except queue.Empty:
+            results = None
+        if results is not None:
+            self._apply(results)
+            self._busy = False
+        if self.dirty and not self._busy:
+            if self._worker is None:
+                self._jobs = queue.Queue()
+                self._worker = threading.Thread(target=self._work, name='voxel-mesher', daemon=True)
+                self._worker.start()
+            job = [(key, self._padded(key)) for key in self.dirty]
+            self.dirty.clear()
+            self._busy = True
+            self.batches += 1
+            self._jobs.put(job)
+
+    def _work(self):
+        while True:
+            job = self._jobs.get()
+            if job is None:
+                break
+            self._results.put([_build_chunk(key, padded) for key, padded in job])
+
+    def _apply(self, results):
+        from panda3d.core import GeomNode, NodePath
+        from ursina import Entity
+        from ursina.collider import Collider
+        c = self.chunk_size
+        for key, geom, boxes in results:
+            entity = self.entities.get(key)
+            if entity is None:
+                if geom is None and not boxes:
+                    continue
+                kwargs = dict(self.entity_kwargs)
+                if self.parent is not None:
+                    kwargs['parent'] = self.parent
+                entity = self.entities[key] = Entity(model=NodePath(GeomNode('voxel_chunk')),
+                                                     position=(key[0] * c, key[1] * c, key[2] * c), **kwargs)
+            node = entity.model.node()
+            node.removeAllGeoms()
+            if geom is not None:
+                node.addGeom(geom)
+            entity.collider = Collider(entity, boxes) if boxes else None
+            self.rebuilt += 1
+
+    @property
+    def busy(self):
+        """Whether a batch is being built, or edits are waiting for one"""
+        return self._busy or bool(self.dirty)
+
+    def close(self):
+        if self._worker is not None:
+            self._jobs.put(None)
+            self._worker.join()
+            self._worker = None
+
+    def stats(self):
+        return dict(chunks=len(self.blocks), entities=len(self.entities), edits=self.edits, batches=self.batches,
+                    rebuilt=self.rebuilt, solids=int(sum((b != AIR).sum() for b in self.blocks.values())))
+
+
+def benchmark(size=64, depth=8, edits=1000, seed=1):
+    import random
+    import time
+    from panda3d.core import RenderState, TransformState
+    from ursina import Ursina
+    Ursina(window_type='none')
+    rng = random.Random(seed)
+    terrain = VoxelTerrain(floor=-depth)
+    start = time.perf_counter()
+    terrain.fill((-size // 2, -depth, -size // 2), (size // 2 - 1, 0, size // 2 - 1))
+    terrain.build()
+    build = (time.perf_counter() - start) * 1000
+    stats = terrain.stats()
+    print(f'{stats["solids"]} voxels in {stats["entities"]} chunk entities, built in {build:.0f} ms')
+
+    def frame():
+        start = time.perf_counter()
+        terrain.update()
+        TransformState.garbageCollect()
+        RenderState.garbageCollect()
+        return time.perf_counter() - start
+
+    # the burst: 1000 single-voxel edits in one frame, half removals and half additions
+    start = time.perf_counter()
+    for _ in range(edits):
+        x, z = rng.randrange(-size // 2, size // 2), rng.randrange(-size // 2, size // 2)
+        if rng.random() < 0.5:
+            terrain.set(x, rng.randrange(-depth + 1, 1), z, AIR)
+        else:
+            terrain.set(x, rng.randrange(1, 4), z)
+    burst = time.perf_counter() - start
+    dirty = len(terrain.dirty)
+    frames = [burst + frame()]
+    # and a stomp's worth of carving every few frames while the worker is still busy
+    while terrain.busy or len(frames) < 120:
+        if len(frames) % 10 == 0 and len(frames) < 120:
+            terrain.carve((rng.uniform(-size / 2, size / 2), 0, rng.uniform(-size / 2, size / 2)), 1.6)
+        time.sleep(max(0.0, 1 / 60 - frames[-1]))  # the rest of a 60 Hz frame
+        frames.append(frame())
+    stats = terrain.stats()
+    terrain.close()
+    times = sorted(frames)
+    print(f'{edits} edits in {burst * 1000:.2f} ms dirtied {dirty} chunks; '
+          f'{stats["batches"]} batches rebuilt {stats["rebuilt"]} chunk meshes on the worker')
+    print(f'main thread per frame: mean {sum(times) / len(times) * 1000:.3f} ms, '
+          f'max {times[-1] * 1000:.3f} ms (burst frame {frames[0] * 1000:.3f} ms)')
+
+
+if __name__ == '__main__':
+    benchmark()